@@ -0,0 +1,62 @@
+"""Compare the throughput of the multipass token generation paths.
+
+Run from the repository root with `python -m scripts.benchmark_multipass`.
+"""
+
+import datetime
+import json
+from base64 import urlsafe_b64encode
+from os import cpu_count
+from time import perf_counter
+
+from Crypto.Cipher import AES
+from Crypto.Hash import HMAC, SHA256
+from Crypto.Random import get_random_bytes
+
+from spylib.multipass import MultipassGenerator
+
+SECRET = 'MULTIPASS_SECRET'
+CUSTOMERS = 50_000
+
+
+def previous_generate_token(secret, customer_data):
+    """The implementation before MultipassGenerator, deriving the keys on every call."""
+    key = SHA256.new(secret.encode('utf-8')).digest()
+    encryption_key = key[0:16]
+    signature_key = key[16:32]
+    customer_data['created_at'] = datetime.datetime.utcnow().isoformat()
+    plain_text = json.dumps(customer_data)
+    padding = AES.block_size - len(plain_text) % AES.block_size
+    plain_text += padding * chr(padding)
+    iv = get_random_bytes(AES.block_size)
+    cypher_text = iv + AES.new(encryption_key, AES.MODE_CBC, iv).encrypt(plain_text.encode())
+    signature = HMAC.new(signature_key, cypher_text, SHA256).digest()
+    return urlsafe_b64encode(cypher_text + signature)
+
+
+def customers():
+    for i in range(CUSTOMERS):
+        yield {'email': f'customer{i}@example.com', 'first_name': 'John', 'tag_string': 'vip'}
+
+
+def main():
+    generator = MultipassGenerator(SECRET)
+    processes = cpu_count() or 1
+    paths = {
+        'generate_token': lambda: [previous_generate_token(SECRET, c) for c in customers()],
+        'MultipassGenerator.generate_many': lambda: list(generator.generate_many(customers())),
+        f'MultipassGenerator.generate_many ({processes} processes)': lambda: list(
+            generator.generate_many(customers(), processes=processes)
+        ),
+    }
+    baseline = None
+    for name, generate in paths.items():
+        start = perf_counter()
+        generate()
+        per_second = CUSTOMERS / (perf_counter() - start)
+        baseline = baseline or per_second
+        print(f'{name:<50} {per_second:10,.0f} tokens/s  x{per_second / baseline:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Compare the session token verification paths.
+
+Run from the repository root with `python -m scripts.benchmark_session_token`.
+"""
+from time import perf_counter, time
+
+import jwt
+
+from spylib.session_token import SessionToken, SessionTokenCache, SessionTokenVerifier
+
+API_KEY = 'API_KEY'
+API_SECRET = 'API_SECRET_LONG_ENOUGH_FOR_HS256_KEYS'
+ITERATIONS = 20_000
+
+
+def main():
+    now = time()
+    token = jwt.encode(
+        {
+            'iss': 'https://test.myshopify.com/admin',
+            'dest': 'https://test.myshopify.com',
+            'aud': API_KEY,
+            'sub': '1',
+            'exp': now + 60,
+            'nbf': now - 60,
+            'iat': now,
+            'jti': '3512a085-ee9a-4914-b252-3aabcd1ada14',
+            'sid': 'abc123',
+        },
+        API_SECRET,
+        algorithm='HS256',
+    )
+    header = f'Bearer {token}'
+    verifier = SessionTokenVerifier(API_KEY, API_SECRET)
+    cached_verifier = SessionTokenVerifier(API_KEY, API_SECRET, cache=SessionTokenCache())
+    cache = SessionTokenCache()
+
+    paths = {
+        'SessionToken.from_header': lambda: SessionToken.from_header(header, API_KEY, API_SECRET),
+        'SessionToken.from_header (cached)': lambda: SessionToken.from_header(
+            header, API_KEY, API_SECRET, cache=cache
+        ),
+        'SessionTokenVerifier.from_header': lambda: verifier.from_header(header),
+        'SessionTokenVerifier.from_header (cached)': lambda: cached_verifier.from_header(header),
+    }
+    baseline = None
+    for name, verify in paths.items():
+        verify()
+        start = perf_counter()
+        for _ in range(ITERATIONS):
+            verify()
+        per_call = (perf_counter() - start) / ITERATIONS * 1e6
+        baseline = baseline or per_call
+        print(f'{name:<45} {per_call:8.2f} µs/call  x{baseline / per_call:.1f}')
+
+
+if __name__ == '__main__':
+    main()
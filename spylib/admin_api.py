@@ -2,13 +2,26 @@ import logging
 from abc import ABC, abstractmethod
 from asyncio import sleep
 from datetime import datetime, timedelta
+from gzip import compress
+from json import dumps
 from json.decoder import JSONDecodeError
 from math import ceil, floor
 from time import monotonic
-from typing import Annotated, Any, ClassVar, Dict, List, Optional
+from typing import (
+    Annotated,
+    Any,
+    ClassVar,
+    Dict,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+    overload,
+)
 
 from httpx import AsyncClient, Response
-from pydantic import BaseModel, BeforeValidator, ConfigDict
+from pydantic import BaseModel, BeforeValidator, ConfigDict, ValidationError
 from starlette import status
 from tenacity import retry
 from tenacity.retry import retry_if_exception, retry_if_exception_type
@@ -17,9 +30,11 @@ from tenacity.wait import wait_random
 
 from spylib.constants import (
     API_CALL_NUMBER_RETRY_ATTEMPTS,
+    GZIP_COMPRESS_LEVEL,
     MAX_COST_EXCEEDED_ERROR_CODE,
     OPERATION_NAME_REQUIRED_ERROR_MESSAGE,
     THROTTLED_ERROR_CODE,
+    UTF8ENCODING,
     WRONG_OPERATION_NAME_ERROR_MESSAGE,
 )
 from spylib.exceptions import (
@@ -32,9 +47,23 @@ from spylib.exceptions import (
     ShopifyThrottledError,
     not_our_fault,
 )
+from spylib.utils.cost_ledger import CostLedger
+from spylib.utils.domain import Shop
+from spylib.utils.graphql import (
+    document_operation_name,
+    elide_nulls,
+    minify_document,
+    prune_document,
+    response_adapter,
+    result_adapter,
+)
+from spylib.utils.httpclient import ACCEPT_ENCODING, read_limited
+from spylib.utils.limiter import UNLIMITED, ConcurrencyLimiter
 from spylib.utils.misc import TimedResult, elapsed_time, parse_scope
 from spylib.utils.rest import Request
 
+T = TypeVar('T')
+
 
 class Token(ABC, BaseModel):
     """Abstract class for token objects.
@@ -62,15 +91,31 @@ class Token(ABC, BaseModel):
 
     client: ClassVar[AsyncClient] = AsyncClient()
 
+    # Outbound GraphQL payload optimizations, disabled by default
+    gql_minify: ClassVar[bool] = False
+    gql_elide_null_variables: ClassVar[bool] = False
+    gql_compression_threshold: ClassVar[Optional[int]] = None
+
+    # Maximum size in bytes of a decompressed response, larger responses raise an error
+    max_response_size: ClassVar[Optional[int]] = None
+
+    # Limit of the calls in flight per store, shared by all the tokens using the same limiter
+    concurrency_limiter: ClassVar[Optional[ConcurrencyLimiter]] = None
+
+    # Aggregate of the GraphQL cost per store and operation, shared by the tokens using it
+    cost_ledger: ClassVar[Optional[CostLedger]] = None
+
+    @property
+    def shop(self) -> Shop:
+        return Shop.from_storename(self.store_name)
+
     @property
     def oauth_url(self) -> str:
-        return f'https://{self.store_name}.myshopify.com/admin/oauth/access_token'
+        return self.shop.oauth_url
 
     @property
     def api_url(self) -> str:
-        if not self.api_version:
-            return f'https://{self.store_name}.myshopify.com/admin'
-        return f'https://{self.store_name}.myshopify.com/admin/api/{self.api_version}'
+        return self.shop.api_url(self.api_version or None)
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
@@ -91,6 +136,41 @@ class Token(ABC, BaseModel):
             self.rest_bucket = min(self.rest_bucket + new_tokens, self.rest_bucket_max)
             self.updated_at = now
 
+    def _record_cost(
+        self, query: str, operation_name: Optional[str], extensions: Optional[Dict[str, Any]]
+    ):
+        """Record the cost of a successful GraphQL call in the cost ledger, if any."""
+        if self.cost_ledger is None or not extensions or not extensions.get('cost'):
+            return
+        cost = extensions['cost']
+        self.cost_ledger.record(
+            self.store_name,
+            operation_name or document_operation_name(query),
+            requested_cost=cost.get('requestedQueryCost'),
+            actual_cost=cost.get('actualQueryCost'),
+        )
+
+    async def _send(self, method: str, url: str, headers: Dict[str, str], **kwargs) -> Response:
+        """Send the request to Shopify through the concurrency limiter, if any.
+
+        The response is read as a stream when `max_response_size` is set, and the call is
+        aborted as soon as the response is known to be too large.
+        """
+        headers = {'Accept-Encoding': ACCEPT_ENCODING, **headers}
+        async with self._concurrency_slot():
+            if self.max_response_size is None:
+                return await self.client.request(method=method, url=url, headers=headers, **kwargs)
+            async with self.client.stream(
+                method=method, url=url, headers=headers, **kwargs
+            ) as response:
+                return await read_limited(response, self.max_response_size)
+
+    def _concurrency_slot(self):
+        """Slot of the store in the concurrency limiter, waiting for one to be free if needed."""
+        if self.concurrency_limiter is None:
+            return UNLIMITED
+        return self.concurrency_limiter.acquire(self.store_name)
+
     async def __handle_error(self, debug: str, endpoint: str, response: Response):
         """Handle any error that occured when calling Shopify.
 
@@ -133,7 +213,7 @@ class Token(ABC, BaseModel):
             if not self.access_token:
                 raise ValueError('You have not initialized the token for this store. ')
 
-            response = await self.client.request(
+            response = await self._send(
                 method=request.method.value,
                 url=f'{self.api_url}{endpoint}',
                 headers={'X-Shopify-Access-Token': self.access_token},
@@ -157,6 +237,27 @@ class Token(ABC, BaseModel):
 
             return jresp
 
+    @overload
+    async def execute_gql(
+        self,
+        query: str,
+        variables: Dict[str, Any] = ...,
+        operation_name: Optional[str] = ...,
+        suppress_errors: bool = ...,
+        result_type: None = ...,
+    ) -> Dict[str, Any]: ...
+
+    @overload
+    async def execute_gql(
+        self,
+        query: str,
+        variables: Dict[str, Any] = ...,
+        operation_name: Optional[str] = ...,
+        suppress_errors: bool = ...,
+        *,
+        result_type: Type[T],
+    ) -> T: ...
+
     @retry(
         reraise=True,
         stop=stop_after_attempt(API_CALL_NUMBER_RETRY_ATTEMPTS),
@@ -170,24 +271,48 @@ class Token(ABC, BaseModel):
         variables: Dict[str, Any] = {},
         operation_name: Optional[str] = None,
         suppress_errors: bool = False,
-    ) -> Dict[str, Any]:
+        result_type: Optional[Type[T]] = None,
+    ) -> Union[Dict[str, Any], T]:
+        """Run a GraphQL query or mutation against the Admin API.
+
+        When `operation_name` selects one of several operations in the query, only that operation
+        and the fragments it uses are sent.
+
+        With a `result_type` (a pydantic model, a TypedDict or any type supported by pydantic),
+        the `data` of the response is returned validated as that type. It is validated directly
+        from the raw JSON of the response, with a validator built once per type.
+
+        The payload can be reduced further with the class variables:
+        - `gql_minify`: remove the comments and insignificant whitespace from the query
+        - `gql_elide_null_variables`: remove the null input fields from the variables
+        - `gql_compression_threshold`: gzip the request body when it's at least that many bytes
+        """
         if not self.access_token:
             raise ValueError('Token Undefined')
 
-        url = f'{self.api_url}/graphql.json'
+        url = self.shop.graphql_url(self.api_version or None)
 
         headers = {
             'Content-type': 'application/json',
             'X-Shopify-Access-Token': self.access_token,
         }
 
+        if operation_name:
+            query = prune_document(query, operation_name)
+        if self.gql_minify:
+            query = minify_document(query)
+        if self.gql_elide_null_variables:
+            variables = elide_nulls(variables)
         body = {'query': query, 'variables': variables, 'operationName': operation_name}
 
-        resp = await self.client.post(
-            url=url,
-            json=body,
-            headers=headers,
-        )
+        if self.gql_compression_threshold is None:
+            resp = await self._send(method='POST', url=url, json=body, headers=headers)
+        else:
+            content = dumps(body, separators=(',', ':')).encode(UTF8ENCODING)
+            if len(content) >= self.gql_compression_threshold:
+                content = compress(content, compresslevel=GZIP_COMPRESS_LEVEL)
+                headers['Content-Encoding'] = 'gzip'
+            resp = await self._send(method='POST', url=url, content=content, headers=headers)
 
         # Handle any response that is not 200, which will return with error message
         # https://shopify.dev/api/admin-graphql#status_and_error_codes
@@ -205,6 +330,20 @@ class Token(ABC, BaseModel):
 
             raise ShopifyGQLError(f'GQL query failed, status code: {error_msg}')
 
+        if result_type is not None:
+            try:
+                typed_response = response_adapter(result_type).validate_json(resp.content)
+            except ValidationError:
+                # Errors or unexpected data, handled and reported by the dict path below
+                typed_response = None
+            if (
+                typed_response is not None
+                and typed_response.data is not None
+                and not typed_response.errors
+            ):
+                self._record_cost(query, operation_name, typed_response.extensions)
+                return typed_response.data
+
         try:
             jsondata = resp.json()
         except JSONDecodeError as exc:
@@ -243,6 +382,12 @@ class Token(ABC, BaseModel):
                 available = jsondata['extensions']['cost']['throttleStatus']['currentlyAvailable']
                 rate = jsondata['extensions']['cost']['throttleStatus']['restoreRate']
                 sleep_time = ceil((query_cost - available) / rate)
+                if self.cost_ledger is not None:
+                    self.cost_ledger.record_throttle(
+                        self.store_name,
+                        operation_name or document_operation_name(query),
+                        sleep_time,
+                    )
                 await sleep(sleep_time)
                 raise ShopifyThrottledError
             elif OPERATION_NAME_REQUIRED_ERROR_MESSAGE in errorlist:
@@ -262,6 +407,9 @@ class Token(ABC, BaseModel):
         if not suppress_errors and len(jsondata.get('errors', [])) >= 1:
             raise ShopifyGQLError(jsondata)
 
+        self._record_cost(query, operation_name, jsondata.get('extensions'))
+        if result_type is not None:
+            return result_adapter(result_type).validate_python(jsondata['data'])
         return jsondata['data']
 
     @elapsed_time(data_type=TimedResult)
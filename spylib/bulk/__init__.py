@@ -0,0 +1,35 @@
+from spylib.bulk.mutation import (
+    BulkMutationResult,
+    BulkOperation,
+    bulk_mutation,
+    get_bulk_operation,
+    stage_upload,
+    start_bulk_mutation,
+    stream_results,
+    wait_for_bulk_operation,
+    write_variables,
+)
+from spylib.bulk.reassembly import (
+    BulkResultReassembler,
+    areassemble,
+    reassemble,
+    reassemble_file,
+    stream_objects,
+)
+
+__all__ = [
+    'BulkOperation',
+    'BulkMutationResult',
+    'bulk_mutation',
+    'write_variables',
+    'stage_upload',
+    'start_bulk_mutation',
+    'get_bulk_operation',
+    'wait_for_bulk_operation',
+    'stream_results',
+    'BulkResultReassembler',
+    'reassemble',
+    'areassemble',
+    'reassemble_file',
+    'stream_objects',
+]
@@ -0,0 +1,16 @@
+from typing import AsyncIterator
+
+from spylib.admin_api import Token
+from spylib.exceptions import ShopifyIntermittentError
+
+
+async def stream_lines(token: Token, url: str) -> AsyncIterator[str]:
+    """Download the JSONL file of a bulk operation and yield its non-empty lines."""
+    async with token.client.stream('GET', url) as response:
+        if response.status_code != 200:
+            raise ShopifyIntermittentError(
+                f'Failed to download the bulk operation results: {response.status_code}.'
+            )
+        async for line in response.aiter_lines():
+            if line.strip():
+                yield line
@@ -0,0 +1,58 @@
+STAGED_UPLOADS_CREATE_GQL = """
+mutation stagedUploadsCreate($input: [StagedUploadInput!]!) {
+  stagedUploadsCreate(input: $input) {
+    stagedTargets {
+      url
+      resourceUrl
+      parameters {
+        name
+        value
+      }
+    }
+    userErrors {
+      field
+      message
+    }
+  }
+}
+"""
+
+BULK_OPERATION_RUN_MUTATION_GQL = """
+mutation bulkOperationRunMutation($mutation: String!, $stagedUploadPath: String!, $clientIdentifier: String) {
+  bulkOperationRunMutation(mutation: $mutation, stagedUploadPath: $stagedUploadPath, clientIdentifier: $clientIdentifier) {
+    bulkOperation {
+      ...BulkOperation
+    }
+    userErrors {
+      field
+      message
+    }
+  }
+}
+
+fragment BulkOperation on BulkOperation {
+  id
+  status
+  errorCode
+  objectCount
+  url
+  partialDataUrl
+}
+"""
+
+BULK_OPERATION_GQL = """
+query bulkOperation($id: ID!) {
+  node(id: $id) {
+    ...BulkOperation
+  }
+}
+
+fragment BulkOperation on BulkOperation {
+  id
+  status
+  errorCode
+  objectCount
+  url
+  partialDataUrl
+}
+"""
@@ -0,0 +1,256 @@
+"""Bulk mutations: run a mutation once per line of variables, asynchronously on Shopify's side.
+
+The variables are written to a JSONL file on disk, uploaded to a staged upload target, then
+`bulkOperationRunMutation` runs the mutation for each line. Once the operation completes, its
+result JSONL is streamed back line by line, so neither the variables nor the results are ever
+fully held in memory.
+"""
+
+from __future__ import annotations
+
+from asyncio import sleep, to_thread
+from json import dumps, loads
+from tempfile import TemporaryFile
+from time import monotonic
+from typing import IO, Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+from spylib.admin_api import Token
+from spylib.bulk.download import stream_lines
+from spylib.bulk.graphql_queries import (
+    BULK_OPERATION_GQL,
+    BULK_OPERATION_RUN_MUTATION_GQL,
+    STAGED_UPLOADS_CREATE_GQL,
+)
+from spylib.constants import UTF8ENCODING
+from spylib.exceptions import (
+    ShopifyBulkOperationError,
+    ShopifyCallInvalidError,
+    ShopifyGQLError,
+    ShopifyGQLUserError,
+    ShopifyIntermittentError,
+)
+
+DEFAULT_POLL_INTERVAL = 5
+UPLOAD_FILENAME = 'bulk_op_vars.jsonl'
+UPLOAD_MIME_TYPE = 'text/jsonl'
+
+TERMINAL_STATUSES = frozenset(('COMPLETED', 'FAILED', 'CANCELED', 'EXPIRED'))
+
+
+class BulkOperation(BaseModel):
+    """State of a bulk operation, as returned by the Admin API."""
+
+    id: str
+    status: str
+    error_code: Optional[str] = None
+    object_count: int = 0
+    url: Optional[str] = None
+    partial_data_url: Optional[str] = None
+
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+
+class BulkMutationResult(BaseModel):
+    """Result of the mutation run for one line of variables."""
+
+    line_number: int
+    """Line of the variables file, starting at 0."""
+
+    data: Optional[Dict[str, Any]] = None
+    errors: List[Any] = []
+    """GraphQL errors, e.g. invalid variables."""
+
+    user_errors: List[Dict[str, Any]] = []
+    """User errors returned by the mutation, e.g. a validation failure."""
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.user_errors
+
+    @classmethod
+    def from_line(cls, line: Dict[str, Any]) -> BulkMutationResult:
+        data = line.get('data')
+        user_errors: List[Dict[str, Any]] = []
+        for field in (data or {}).values():
+            if isinstance(field, dict):
+                user_errors.extend(field.get('userErrors') or ())
+        return cls(
+            line_number=line['__lineNumber'],
+            data=data,
+            errors=line.get('errors') or [],
+            user_errors=user_errors,
+        )
+
+
+def write_variables(variables: Iterable[Dict[str, Any]], file: IO[bytes]) -> int:
+    """Write the variables to the file, one JSON object per line, and return the line count."""
+    count = 0
+    for line in variables:
+        file.write(dumps(line, separators=(',', ':')).encode(UTF8ENCODING))
+        file.write(b'\n')
+        count += 1
+    return count
+
+
+async def stage_upload(token: Token, file: IO[bytes]) -> str:
+    """Upload the variables file to a staged upload target and return its path.
+
+    The file is streamed from its current position.
+    """
+    res = await token.execute_gql(
+        query=STAGED_UPLOADS_CREATE_GQL,
+        variables={
+            'input': [
+                {
+                    'resource': 'BULK_MUTATION_VARIABLES',
+                    'filename': UPLOAD_FILENAME,
+                    'mimeType': UPLOAD_MIME_TYPE,
+                    'httpMethod': 'POST',
+                }
+            ]
+        },
+        operation_name='stagedUploadsCreate',
+    )
+    staged_uploads = res.get('stagedUploadsCreate')
+    if staged_uploads and staged_uploads.get('userErrors'):
+        raise ShopifyGQLUserError(res)
+    if not staged_uploads or not staged_uploads.get('stagedTargets'):
+        raise ShopifyGQLError(res)
+
+    target = staged_uploads['stagedTargets'][0]
+    parameters = {parameter['name']: parameter['value'] for parameter in target['parameters']}
+    response = await token.client.post(
+        target['url'],
+        data=parameters,
+        files={'file': (UPLOAD_FILENAME, file, UPLOAD_MIME_TYPE)},
+    )
+    if response.status_code >= 500:
+        raise ShopifyIntermittentError(
+            f'The staged upload target returned an intermittent error: {response.status_code}.'
+        )
+    if response.status_code >= 400:
+        raise ShopifyCallInvalidError(
+            f'The staged upload target rejected the upload: {response.status_code}.'
+        )
+    return parameters['key']
+
+
+async def start_bulk_mutation(
+    token: Token,
+    mutation: str,
+    staged_upload_path: str,
+    client_identifier: Optional[str] = None,
+) -> BulkOperation:
+    """Start running the mutation for each line of the uploaded variables file."""
+    res = await token.execute_gql(
+        query=BULK_OPERATION_RUN_MUTATION_GQL,
+        variables={
+            'mutation': mutation,
+            'stagedUploadPath': staged_upload_path,
+            'clientIdentifier': client_identifier,
+        },
+        operation_name='bulkOperationRunMutation',
+    )
+    run = res.get('bulkOperationRunMutation')
+    if run and run.get('userErrors'):
+        raise ShopifyGQLUserError(res)
+    if not run or not run.get('bulkOperation'):
+        raise ShopifyGQLError(res)
+    return BulkOperation.model_validate(run['bulkOperation'])
+
+
+async def get_bulk_operation(token: Token, id: str) -> BulkOperation:
+    res = await token.execute_gql(
+        query=BULK_OPERATION_GQL, variables={'id': id}, operation_name='bulkOperation'
+    )
+    if not res.get('node'):
+        raise ShopifyGQLError(res)
+    return BulkOperation.model_validate(res['node'])
+
+
+async def wait_for_bulk_operation(
+    token: Token,
+    id: str,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    timeout: Optional[float] = None,
+) -> BulkOperation:
+    """Poll the operation every `poll_interval` seconds until it's finished, then return it.
+
+    Raises `TimeoutError` if it isn't finished after `timeout` seconds, the operation keeps
+    running in Shopify.
+    """
+    start = monotonic()
+    while True:
+        operation = await get_bulk_operation(token, id)
+        if operation.done:
+            return operation
+        if timeout is not None and monotonic() - start >= timeout:
+            raise TimeoutError(f'The bulk operation {id} is still {operation.status}')
+        await sleep(poll_interval)
+
+
+async def stream_results(token: Token, url: Optional[str]) -> AsyncIterator[BulkMutationResult]:
+    """Stream the result JSONL of a bulk mutation, one result per line.
+
+    The `url` is None when the operation had no line to process.
+    """
+    if url is None:
+        return
+    async for line in stream_lines(token, url):
+        yield BulkMutationResult.from_line(loads(line))
+
+
+async def bulk_mutation(
+    token: Token,
+    mutation: str,
+    variables: Iterable[Dict[str, Any]],
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    timeout: Optional[float] = None,
+    client_identifier: Optional[str] = None,
+    directory: Optional[str] = None,
+) -> AsyncIterator[BulkMutationResult]:
+    """Run the mutation for each item of `variables` as a bulk operation and stream the results.
+
+    ```python
+    async for result in bulk_mutation(token, PRODUCT_CREATE_GQL, variables):
+        if not result.ok:
+            print(result.line_number, result.errors, result.user_errors)
+    ```
+
+    The variables are written to a temporary file in `directory`, removed once uploaded. Shopify
+    runs a single bulk mutation per store at a time and limits the variables file to 100 MB.
+
+    Raises `ShopifyBulkOperationError` if the operation failed, was canceled or expired. The
+    results of the lines processed before, if any, are streamed first.
+    """
+    with TemporaryFile(suffix='.jsonl', dir=directory) as file:
+        count = await to_thread(write_variables, variables, file)
+        if not count:
+            return
+        file.seek(0)
+        staged_upload_path = await stage_upload(token, file)
+
+    operation = await start_bulk_mutation(
+        token, mutation, staged_upload_path, client_identifier=client_identifier
+    )
+    operation = await wait_for_bulk_operation(
+        token, operation.id, poll_interval=poll_interval, timeout=timeout
+    )
+    if operation.status == 'COMPLETED':
+        async for result in stream_results(token, operation.url):
+            yield result
+        return
+
+    async for result in stream_results(token, operation.partial_data_url):
+        yield result
+    raise ShopifyBulkOperationError(
+        f'The bulk operation {operation.id} is {operation.status}: {operation.error_code}',
+        partial_data_url=operation.partial_data_url,
+    )
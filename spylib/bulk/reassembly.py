@@ -0,0 +1,136 @@
+"""Rebuild the nested objects of a bulk query result from its flat JSONL lines.
+
+Each object of a nested connection is written on its own line with a `__parentId` referencing
+its parent, and Shopify writes every top level object before its children. A top level object
+is therefore complete as soon as the next one starts: it's emitted then, and only the subtree
+of the current top level object is kept in memory.
+"""
+
+from __future__ import annotations
+
+from json import loads
+from mmap import ACCESS_READ, mmap
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Union,
+)
+
+from spylib.admin_api import Token
+from spylib.bulk.download import stream_lines
+
+CHILDREN_KEY = '__children'
+PARENT_ID_KEY = '__parentId'
+
+Line = Union[str, bytes, Dict[str, Any]]
+ChildKey = Callable[[Dict[str, Any]], str]
+
+
+class BulkResultReassembler:
+    """Attach the child objects to their parent, one top level object at a time.
+
+    The children are appended to a list of their parent under the key returned by `child_key`
+    for the child, `__children` by default. E.g. to group them by type:
+
+    ```python
+    BulkResultReassembler(child_key=lambda child: child['id'].split('/')[3])
+    ```
+    """
+
+    def __init__(self, child_key: Optional[ChildKey] = None):
+        self.child_key = child_key
+        self._root: Optional[Dict[str, Any]] = None
+        # Objects of the current subtree by id, the parents of the lines to come
+        self._index: Dict[str, Dict[str, Any]] = {}
+
+    def feed(self, line: Line) -> Optional[Dict[str, Any]]:
+        """Add a line, return the previous top level object if this line starts a new one."""
+        item = line if isinstance(line, dict) else loads(line)
+        parent_id = item.get(PARENT_ID_KEY)
+        if parent_id is None:
+            completed = self.finish()
+            self._root = item
+            self._index_object(item)
+            return completed
+
+        parent = self._index.get(parent_id)
+        if parent is None:
+            raise ValueError(f'The parent {parent_id} is not part of the current object')
+        key = self.child_key(item) if self.child_key is not None else CHILDREN_KEY
+        parent.setdefault(key, []).append(item)
+        self._index_object(item)
+        return None
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """Return the current top level object, complete once all the lines were fed."""
+        completed, self._root = self._root, None
+        self._index.clear()
+        return completed
+
+    def _index_object(self, item: Dict[str, Any]):
+        id = item.get('id')
+        if id is not None:
+            self._index[id] = item
+
+
+def reassemble(lines: Iterable[Line], child_key: Optional[ChildKey] = None) -> Iterator[Dict]:
+    """Yield the top level objects of the lines with their children attached."""
+    reassembler = BulkResultReassembler(child_key=child_key)
+    for line in lines:
+        if isinstance(line, dict) or line.strip():
+            if (completed := reassembler.feed(line)) is not None:
+                yield completed
+    if (completed := reassembler.finish()) is not None:
+        yield completed
+
+
+async def areassemble(
+    lines: AsyncIterable[Line], child_key: Optional[ChildKey] = None
+) -> AsyncIterator[Dict]:
+    """Yield the top level objects of the lines of an async stream with their children."""
+    reassembler = BulkResultReassembler(child_key=child_key)
+    async for line in lines:
+        if isinstance(line, dict) or line.strip():
+            if (completed := reassembler.feed(line)) is not None:
+                yield completed
+    if (completed := reassembler.finish()) is not None:
+        yield completed
+
+
+def reassemble_file(
+    path: str, child_key: Optional[ChildKey] = None, use_mmap: bool = False
+) -> Iterator[Dict]:
+    """Yield the top level objects of a result file on disk with their children.
+
+    With `use_mmap`, the file is memory mapped instead of read through a buffer: the pages are
+    loaded by the OS as they are read and count in the resident memory of the process, but
+    they are backed by the file, so the OS can drop them under memory pressure.
+    """
+    with open(path, 'rb') as file:
+        if not use_mmap:
+            yield from reassemble(file, child_key=child_key)
+            return
+        if not file.seek(0, 2):
+            # An empty file can't be mapped
+            return
+        with mmap(file.fileno(), 0, access=ACCESS_READ) as mapped:
+            yield from reassemble(iter(mapped.readline, b''), child_key=child_key)
+
+
+async def stream_objects(
+    token: Token, url: Optional[str], child_key: Optional[ChildKey] = None
+) -> AsyncIterator[Dict]:
+    """Download the result of a bulk query and yield its top level objects with their children.
+
+    The `url` is None when the operation didn't return any object.
+    """
+    if url is None:
+        return
+    async for item in areassemble(stream_lines(token, url), child_key=child_key):
+        yield item
@@ -11,3 +11,4 @@ WRONG_OPERATION_NAME_ERROR_MESSAGE = (
 
 UTF8ENCODING = 'utf-8'
 API_CALL_NUMBER_RETRY_ATTEMPTS = 5
+GZIP_COMPRESS_LEVEL = 6
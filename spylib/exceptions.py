@@ -1,3 +1,6 @@
+from typing import Optional
+
+
 class ShopifyError(Exception):
     """Exception to identify any Shopify error."""
 
@@ -41,6 +44,15 @@ class ShopifyCallInvalidError(ShopifyError):
     pass
 
 
+class ShopifyResponseTooLargeError(ShopifyCallInvalidError):
+    """Exception to identify responses larger than the configured maximum size.
+
+    These should not be retried, the same call would return the same response.
+    """
+
+    pass
+
+
 class ShopifyThrottledError(ShopifyError):
     """Exception to identify errors that are due to rate limit control."""
 
@@ -53,6 +65,17 @@ class ShopifyExceedingMaxCostError(ShopifyError):
     pass
 
 
+class ShopifyBulkOperationError(ShopifyError):
+    """Exception to identify bulk operations that failed, were canceled or expired.
+
+    `partial_data_url` is the URL of the results of the lines processed before, if any.
+    """
+
+    def __init__(self, message: str, partial_data_url: Optional[str] = None):
+        super().__init__(message)
+        self.partial_data_url = partial_data_url
+
+
 class FastAPIImportError(ImportError):
     """Exception to identify errors when spylip.oauth is accessed without fastapi installed."""
 
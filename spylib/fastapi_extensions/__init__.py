@@ -2,10 +2,14 @@ from spylib.exceptions import FastAPIImportError
 
 try:
     from .authentication import (
+        WebhookDeduplication,
         WebhookHMACHeader,
         authenticate_webhook_hmac,
+        webhook_deduplication,
         webhook_hmac,
     )
+    from .session_token import SessionTokenMiddleware, authenticate_session_token
+    from .webhook_ingestion import WebhookIngestion
 except ImportError as e:
     raise FastAPIImportError(
         'The fastapi_extensions require `fastapi` which is not installed. '
@@ -16,4 +20,9 @@ __all__ = [
     'webhook_hmac',
     'authenticate_webhook_hmac',
     'WebhookHMACHeader',
+    'webhook_deduplication',
+    'WebhookDeduplication',
+    'WebhookIngestion',
+    'SessionTokenMiddleware',
+    'authenticate_session_token',
 ]
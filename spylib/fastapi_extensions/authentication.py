@@ -1,14 +1,18 @@
-from typing import Optional
+from typing import AsyncIterator, Optional, Sequence, Union
 
-from fastapi import Request, Security  # type: ignore
+from fastapi import Depends, Request, Security  # type: ignore
 from fastapi.openapi.models import APIKey, APIKeyIn  # type: ignore
 from fastapi.security.api_key import APIKeyBase  # type: ignore
 from starlette.exceptions import HTTPException
 from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
 
-from spylib import webhook
-
-SHOPIFY_WEBHOOK_HMAC_HEADER = 'X-Shopify-Hmac-SHA256'
+from spylib.hmac import Verifier
+from spylib.webhook.deduplication import MemoryWebhookDeduplicator, WebhookDeduplicator
+from spylib.webhook.events import (
+    SHOPIFY_WEBHOOK_HMAC_HEADER,
+    SHOPIFY_WEBHOOK_ID_HEADER,
+    SHOPIFY_WEBHOOK_SHOP_HEADER,
+)
 
 
 class WebhookHMACHeader(APIKeyBase):
@@ -16,13 +20,15 @@ class WebhookHMACHeader(APIKeyBase):
 
     It requires our own implementation of APIKeyHeader because we need to
     pass in the api secret and process the whole request object.
+
+    `api_secret_key` can be a list of secrets while rotating the API secret.
     """
 
     def __init__(
         self,
         *,
         name: str,
-        api_secret_key: str,
+        api_secret_key: Union[str, Sequence[str]],
         scheme_name: Optional[str] = None,
         description: Optional[str] = None,
         auto_error: bool = True,
@@ -32,16 +38,28 @@ class WebhookHMACHeader(APIKeyBase):
         self.auto_error = auto_error
         self.api_secret_key = api_secret_key
 
+    @property
+    def api_secret_key(self) -> Union[str, Sequence[str]]:
+        return self._api_secret_key
+
+    @api_secret_key.setter
+    def api_secret_key(self, api_secret_key: Union[str, Sequence[str]]):
+        # Precompute the keyed HMAC state once instead of on every webhook
+        self._api_secret_key = api_secret_key
+        self._verifier = Verifier(api_secret_key) if api_secret_key else None
+
     async def __call__(self, request: Request) -> bool:
-        data = str(await request.body(), 'utf-8')
-        if not self.api_secret_key:
+        if self._verifier is None:
             raise HTTPException(
                 status_code=HTTP_403_FORBIDDEN, detail='api_secret_key must be set'
             )
 
         hmac_header = request.headers.get(SHOPIFY_WEBHOOK_HMAC_HEADER, '')
-        return webhook.validate(
-            data=data, hmac_header=hmac_header, api_secret_key=self.api_secret_key
+        return self._verifier.is_valid(
+            sent_hmac=hmac_header,
+            message=await request.body(),
+            use_base64=True,
+            key=request.headers.get(SHOPIFY_WEBHOOK_SHOP_HEADER),
         )
 
 
@@ -68,3 +86,45 @@ def authenticate_webhook_hmac(hmac: bool = Security(webhook_hmac)):
         )
     else:
         return hmac
+
+
+class WebhookDeduplication:
+    """Dependency telling if the webhook is delivered for the first time.
+
+    It authenticates the webhook first, so forged requests can't fill the deduplicator, then
+    checks the `X-Shopify-Webhook-Id` header. It returns False for duplicates, which should be
+    acknowledged without being processed so Shopify stops retrying them. The body is never
+    parsed. When the handler raises, the id is forgotten so the retry of Shopify is processed.
+
+    ```python
+    webhook_hmac.api_secret_key = 'SOME_SECRET'
+    @app.post('/SOME_PATH')
+    def some_path(is_first_delivery: bool = Depends(webhook_deduplication)):
+        if not is_first_delivery:
+            return
+    ```
+    """
+
+    def __init__(self, deduplicator: Optional[WebhookDeduplicator] = None):
+        if deduplicator is None:
+            deduplicator = MemoryWebhookDeduplicator()
+        self.deduplicator = deduplicator
+
+    async def __call__(
+        self, request: Request, hmac: bool = Depends(authenticate_webhook_hmac)
+    ) -> AsyncIterator[bool]:
+        webhook_id = request.headers.get(SHOPIFY_WEBHOOK_ID_HEADER)
+        if not webhook_id:
+            yield True
+            return
+        first_delivery = not await self.deduplicator.seen(webhook_id)
+        try:
+            yield first_delivery
+        except Exception:
+            if first_delivery:
+                # Shopify will retry it, it must not be considered a duplicate then
+                await self.deduplicator.forget(webhook_id)
+            raise
+
+
+webhook_deduplication = WebhookDeduplication()
@@ -0,0 +1,99 @@
+from typing import Optional, Sequence
+
+from fastapi import Request  # type: ignore
+from jwt import PyJWTError
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.status import HTTP_401_UNAUTHORIZED
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from spylib.session_token import (
+    SessionTokenCache,
+    SessionTokenVerifier,
+    TokenValidationError,
+    VerifiedSessionToken,
+)
+
+SESSION_TOKEN_STATE = 'session_token'
+AUTHENTICATION_FAILED = 'Session token authentication failed'
+
+
+class SessionTokenMiddleware:
+    """ASGI middleware authenticating the requests with the session token sent by App Bridge.
+
+    The `Authorization` header is verified once per request, before routing, and the
+    `VerifiedSessionToken` is stored in `request.state.session_token` for the endpoints and
+    dependencies to reuse. Unauthorized requests are rejected with a 401 without reaching the
+    application. CORS preflight requests and paths starting with one of `exclude_paths` are
+    not authenticated.
+
+    By default the verifier caches the verified tokens until they expire.
+
+    ```python
+    app.add_middleware(
+        SessionTokenMiddleware, api_key='API_KEY', secret='API_SECRET', exclude_paths=['/shopify']
+    )
+    ```
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        api_key: str = '',
+        secret: str = '',
+        verifier: Optional[SessionTokenVerifier] = None,
+        exclude_paths: Sequence[str] = (),
+        cache_size: int = 1024,
+    ):
+        if verifier is None:
+            if not api_key or not secret:
+                raise ValueError('Either a verifier or the api_key and secret must be set')
+            verifier = SessionTokenVerifier(
+                api_key=api_key, secret=secret, cache=SessionTokenCache(maxsize=cache_size)
+            )
+        self.app = app
+        self.verifier = verifier
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope['type'] != 'http'
+            or scope['method'] == 'OPTIONS'
+            or (self.exclude_paths and scope['path'].startswith(self.exclude_paths))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            session_token = self.verifier.from_header(_authorization_header(scope))
+        except (TokenValidationError, PyJWTError):
+            response = JSONResponse(
+                {'detail': AUTHENTICATION_FAILED}, status_code=HTTP_401_UNAUTHORIZED
+            )
+            await response(scope, receive, send)
+            return
+
+        scope.setdefault('state', {})[SESSION_TOKEN_STATE] = session_token
+        await self.app(scope, receive, send)
+
+
+def _authorization_header(scope: Scope) -> str:
+    for name, value in scope['headers']:
+        if name == b'authorization':
+            return value.decode('latin-1')
+    return ''
+
+
+def authenticate_session_token(request: Request) -> VerifiedSessionToken:
+    """Dependency returning the session token verified by `SessionTokenMiddleware`.
+
+    ```python
+    @app.get('/SOME_PATH')
+    def some_path(session_token: VerifiedSessionToken = Depends(authenticate_session_token)):
+        return session_token.shop
+    ```
+    """
+    session_token = getattr(request.state, SESSION_TOKEN_STATE, None)
+    if session_token is None:
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail=AUTHENTICATION_FAILED)
+    return session_token
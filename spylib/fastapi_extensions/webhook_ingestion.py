@@ -0,0 +1,161 @@
+import logging
+from asyncio import CancelledError, Queue, QueueFull, Task, create_task, gather
+from inspect import isawaitable, iscoroutinefunction
+from typing import Awaitable, Callable, List, Optional, Sequence, Union
+
+from fastapi import APIRouter, Request, Response  # type: ignore
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_401_UNAUTHORIZED,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
+
+from spylib.hmac import Verifier
+from spylib.webhook.deduplication import WebhookDeduplicator
+from spylib.webhook.events import (
+    SHOPIFY_WEBHOOK_HMAC_HEADER,
+    SHOPIFY_WEBHOOK_SHOP_HEADER,
+    WebhookEvent,
+)
+
+WebhookHandler = Callable[[WebhookEvent], Optional[Awaitable]]
+
+
+class WebhookIngestion:
+    """Receive Shopify webhooks and process them in the background.
+
+    The endpoint validates the HMAC, queues the event in a bounded queue and answers right away,
+    so Shopify gets a fast 200 regardless of how long the handler takes. `workers` tasks consume
+    the queue and call the handler. When the queue is full the endpoint answers 503 and Shopify
+    retries the delivery later.
+
+    Like FastAPI does for the endpoints, a handler that isn't a coroutine function is run in the
+    thread pool so it doesn't block the event loop.
+
+    With a `deduplicator`, webhooks already delivered are acknowledged without being queued.
+
+    The workers are started on the first webhook or by calling `start`. Call `stop` on shutdown
+    to process the queued events and stop the workers.
+
+    ```python
+    ingestion = WebhookIngestion(api_secret_key='API_SECRET_KEY', handler=process_webhook)
+    app.include_router(ingestion.router)
+    app.add_event_handler('shutdown', ingestion.stop)
+    ```
+    """
+
+    def __init__(
+        self,
+        api_secret_key: Union[str, Sequence[str]],
+        handler: WebhookHandler,
+        path: str = '/webhooks',
+        queue_size: int = 1000,
+        workers: int = 4,
+        retry_after: int = 5,
+        deduplicator: Optional[WebhookDeduplicator] = None,
+    ):
+        if not path.startswith('/'):
+            raise ValueError('The path argument must start with "/"')
+        if queue_size < 1 or workers < 1:
+            raise ValueError('The queue_size and workers arguments must be positive')
+
+        self.handler = handler
+        self._handler_is_async = iscoroutinefunction(handler) or iscoroutinefunction(
+            getattr(handler, '__call__', None)
+        )
+        self.queue_size = queue_size
+        self.workers = workers
+        self.retry_after = retry_after
+        self.deduplicator = deduplicator
+        self._verifier = Verifier(api_secret_key)
+        self._queue: Optional[Queue] = None
+        self._tasks: List[Task] = []
+
+        self.router = APIRouter()
+        self.router.add_api_route(path, self._receive, methods=['POST'], include_in_schema=False)
+
+    @property
+    def qsize(self) -> int:
+        """Number of events waiting to be processed."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        if self._queue is not None:
+            return
+        # Created here so the queue belongs to the running event loop
+        self._queue = Queue(maxsize=self.queue_size)
+        self._tasks = [create_task(self._work(self._queue)) for _ in range(self.workers)]
+
+    async def join(self):
+        """Wait until all the queued events are processed."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self):
+        """Process the queued events then stop the workers."""
+        await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await gather(*self._tasks, return_exceptions=True)
+        self._queue = None
+        self._tasks = []
+
+    def enqueue(self, event: WebhookEvent) -> bool:
+        """Queue the event without waiting, return False if the queue is full."""
+        if self._queue is None:
+            raise RuntimeError('The webhook ingestion is not started')
+        try:
+            self._queue.put_nowait(event)
+        except QueueFull:
+            return False
+        return True
+
+    async def _receive(self, request: Request) -> Response:
+        body = await request.body()
+        headers = request.headers
+        if not self._verifier.is_valid(
+            sent_hmac=headers.get(SHOPIFY_WEBHOOK_HMAC_HEADER, ''),
+            message=body,
+            use_base64=True,
+            key=headers.get(SHOPIFY_WEBHOOK_SHOP_HEADER),
+        ):
+            raise HTTPException(
+                status_code=HTTP_401_UNAUTHORIZED, detail='Webhook HMAC authentication failed'
+            )
+
+        event = WebhookEvent.from_headers(headers, body)
+        if self.deduplicator is not None and event.webhook_id:
+            if await self.deduplicator.seen(event.webhook_id):
+                return Response(status_code=HTTP_200_OK)
+
+        await self.start()
+        if not self.enqueue(event):
+            if self.deduplicator is not None and event.webhook_id:
+                # Shopify will retry it, it must not be considered a duplicate then
+                await self.deduplicator.forget(event.webhook_id)
+            raise HTTPException(
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Webhook queue is full',
+                headers={'Retry-After': str(self.retry_after)},
+            )
+        return Response(status_code=HTTP_200_OK)
+
+    async def _work(self, queue: Queue):
+        while True:
+            event = await queue.get()
+            try:
+                if self._handler_is_async:
+                    await self.handler(event)  # type: ignore
+                elif isawaitable(result := await run_in_threadpool(self.handler, event)):
+                    await result  # type: ignore
+            except CancelledError:
+                raise
+            except Exception:
+                logging.exception(
+                    f'Store {event.shop_domain}: failed to process webhook {event.webhook_id} '
+                    f'for topic {event.topic}'
+                )
+            finally:
+                queue.task_done()
@@ -1,15 +1,193 @@
-from base64 import b64encode
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from functools import lru_cache
 from hashlib import sha256
-from hmac import compare_digest, new
+from hmac import HMAC, compare_digest, new
+from re import compile
+from threading import Lock
+from typing import List, Optional, Sequence, Tuple, Union
 
+from spylib.constants import UTF8ENCODING
 
-def calculate_from_message(secret: str, message: str, use_base64: bool = False) -> str:
-    hmac_hash = new(secret.encode('utf-8'), message.encode('utf-8'), sha256)
-    if use_base64:
-        # TODO fix bytes / str union issue
-        return b64encode(hmac_hash.digest()).decode('utf-8')
+Message = Union[str, bytes, bytearray, memoryview]
+
+_CHUNK_SIZE = 64 * 1024
+# As produced by `hexdigest`: whitespace and uppercase digits are not accepted
+_HEX_DIGEST = compile('[0-9a-f]{64}')
+
+
+def _to_bytes(message: Message) -> Union[bytes, bytearray, memoryview]:
+    if isinstance(message, str):
+        return message.encode(UTF8ENCODING)
+    return message
+
+
+class Signer:
+    """HMAC-SHA256 signer with the keyed state precomputed once for a secret.
+
+    Building an HMAC state hashes the padded key into the inner and outer digests. The signer
+    does it once and clones the keyed state for each message, which is cheaper than calling
+    `hmac.new` with the secret every time.
+    """
+
+    __slots__ = ('_state',)
+
+    def __init__(self, secret: Union[str, bytes]):
+        key = secret.encode(UTF8ENCODING) if isinstance(secret, str) else secret
+        self._state: HMAC = new(key, digestmod=sha256)
+
+    def digest(self, message: Message) -> bytes:
+        """Return the raw HMAC-SHA256 digest of the message."""
+        state = self._state.copy()
+        state.update(_to_bytes(message))
+        return state.digest()
+
+    def calculate(self, message: Message, use_base64: bool = False) -> str:
+        """Return the digest of the message encoded in hexadecimal or base64."""
+        digest = self.digest(message)
+        if use_base64:
+            return b64encode(digest).decode(UTF8ENCODING)
+        return digest.hex()
+
+
+class Verifier(Signer):
+    """Signer that also checks the HMAC sent along with a message against one or more secrets.
+
+    The sent HMAC is decoded to raw bytes and compared with the raw digest, so the calculated
+    digest never has to be encoded to a string.
+
+    Several secrets can be given while rotating the API secret: the first one is the primary
+    secret used to sign, and any of them is accepted when verifying. When a `key` (e.g. the shop
+    domain) is passed, the verifier remembers which secret last matched for that key and tries
+    it first next time. At most `max_keys` keys are remembered, the least recently matched ones
+    are forgotten first.
+    """
+
+    __slots__ = ('signers', 'max_keys', '_last_match', '_lock')
+
+    def __init__(
+        self,
+        secrets: Union[str, bytes, Sequence[Union[str, bytes]]],
+        max_keys: int = 10_000,
+    ):
+        if isinstance(secrets, (str, bytes)):
+            secrets = [secrets]
+        if not secrets:
+            raise ValueError('At least one secret is required')
+
+        super().__init__(secrets[0])
+        self.signers: Tuple[Signer, ...] = (self, *(Signer(secret) for secret in secrets[1:]))
+        self.max_keys = max_keys
+        self._last_match: 'OrderedDict[str, int]' = OrderedDict()
+        # Verifiers are shared by the threads of the sync runner and the webhook ingestion
+        self._lock = Lock()
+
+    def match(
+        self,
+        sent_hmac: Union[str, bytes],
+        message: Message,
+        use_base64: bool = False,
+        key: Optional[str] = None,
+    ) -> Optional[int]:
+        """Return the index of the secret that signed the message, or None if none did."""
+        sent_digest = decode_hmac(sent_hmac, use_base64=use_base64)
+        if sent_digest is None:
+            return None
+        data = _to_bytes(message)
 
-    return hmac_hash.hexdigest()
+        preferred = self._last_match.get(key, 0) if key is not None else 0
+        if compare_digest(sent_digest, self.signers[preferred].digest(data)):
+            if key is not None and preferred:
+                # Keep the key as the most recently matched one
+                self._remember(key, preferred)
+            return preferred
+
+        others = [index for index in range(len(self.signers)) if index != preferred]
+        for index, digest in zip(others, _digests([self.signers[i] for i in others], data)):
+            if compare_digest(sent_digest, digest):
+                if key is not None:
+                    self._remember(key, index)
+                return index
+        return None
+
+    def is_valid(
+        self,
+        sent_hmac: Union[str, bytes],
+        message: Message,
+        use_base64: bool = False,
+        key: Optional[str] = None,
+    ) -> bool:
+        return self.match(sent_hmac, message, use_base64=use_base64, key=key) is not None
+
+    def validate(
+        self,
+        sent_hmac: Union[str, bytes],
+        message: Message,
+        use_base64: bool = False,
+        key: Optional[str] = None,
+    ):
+        if not self.is_valid(sent_hmac=sent_hmac, message=message, use_base64=use_base64, key=key):
+            raise ValueError('HMAC verification failed')
+
+    def _remember(self, key: str, index: int):
+        with self._lock:
+            if index == 0:
+                # The primary secret is the default, no need to spend memory on it
+                self._last_match.pop(key, None)
+                return
+            self._last_match[key] = index
+            self._last_match.move_to_end(key)
+            while len(self._last_match) > self.max_keys:
+                self._last_match.popitem(last=False)
+
+
+def _digests(signers: Sequence[Signer], data: Union[bytes, bytearray, memoryview]) -> List[bytes]:
+    """Compute the digest of the data for several signers in a single pass over the data.
+
+    Each chunk is fed to every signer while it is still hot in the CPU cache instead of
+    reading the whole body once per secret.
+    """
+    if len(signers) == 1:
+        return [signers[0].digest(data)]
+
+    states = [signer._state.copy() for signer in signers]
+    view = memoryview(data)
+    for offset in range(0, len(view), _CHUNK_SIZE):
+        chunk = view[offset : offset + _CHUNK_SIZE]
+        for state in states:
+            state.update(chunk)
+    return [state.digest() for state in states]
+
+
+def decode_hmac(sent_hmac: Union[str, bytes], use_base64: bool = False) -> Optional[bytes]:
+    """Decode a hexadecimal or base64 HMAC to raw bytes, or return None if it is malformed."""
+    try:
+        if use_base64:
+            return b64decode(sent_hmac, validate=True)
+        if isinstance(sent_hmac, bytes):
+            sent_hmac = sent_hmac.decode('ascii')
+        if not _HEX_DIGEST.fullmatch(sent_hmac):
+            return None
+        return bytes.fromhex(sent_hmac)
+    except (BinasciiError, ValueError):
+        return None
+
+
+def get_verifier(secrets: Union[str, Sequence[str]]) -> Verifier:
+    """Return a verifier for the secret(s), reused across calls with the same secret(s)."""
+    if isinstance(secrets, str):
+        return _cached_verifier(secrets)
+    return _cached_verifier(tuple(secrets))
+
+
+@lru_cache(maxsize=32)
+def _cached_verifier(secrets: Union[str, Tuple[str, ...]]) -> Verifier:
+    return Verifier(secrets)
+
+
+def calculate_from_message(secret: str, message: str, use_base64: bool = False) -> str:
+    return get_verifier(secret).calculate(message, use_base64=use_base64)
 
 
 def calculate_from_components(
@@ -22,7 +200,4 @@ def calculate_from_components(
 
 
 def validate(secret: str, sent_hmac: str, message: str, use_base64: bool = False):
-    hmac_calculated = calculate_from_message(secret=secret, message=message, use_base64=use_base64)
-
-    if not compare_digest(sent_hmac, hmac_calculated):
-        raise ValueError('HMAC verification failed')
+    get_verifier(secret).validate(sent_hmac=sent_hmac, message=message, use_base64=use_base64)
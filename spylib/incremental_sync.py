@@ -0,0 +1,212 @@
+"""Incremental sync of a collection: only read the objects updated since the previous sync.
+
+A sync queries the objects updated since the watermark, the largest `updatedAt` seen by the
+previous sync, page by page. The cursor of each page is saved to a checkpoint store once the
+page is processed, so a sync interrupted by a crash or a deploy resumes from the last processed
+page. When the last page is processed, the watermark moves to the largest `updatedAt` seen.
+
+The pages are processed at least once: the page being processed when the sync was interrupted
+is read again, and the objects updated at the watermark itself are read again by the next sync,
+so the processing must be idempotent. `updatedAt` only has a one second precision: an object
+updated in the same second as the watermark, after it was read, is then still synced.
+"""
+
+from __future__ import annotations
+
+import os
+from abc import ABC, abstractmethod
+from asyncio import to_thread
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+from pydantic import BaseModel
+
+from spylib.admin_api import Token
+
+DEFAULT_PAGE_SIZE = 250
+
+
+class SyncCheckpoint(BaseModel):
+    """Progress of the incremental sync of a collection."""
+
+    watermark: Optional[datetime] = None
+    """Objects updated since this time are read, None to read the whole collection."""
+
+    cursor: Optional[str] = None
+    """Cursor of the last page processed by the sync in progress, if any."""
+
+    high_watermark: Optional[datetime] = None
+    """Largest `updatedAt` seen by the sync in progress, the next watermark."""
+
+
+class CheckpointStore(ABC):
+    """Persist the checkpoints of the incremental syncs.
+
+    Extend this class to keep the checkpoints in the app's database, next to the synced data.
+    """
+
+    @abstractmethod
+    async def load(self, key: str) -> Optional[SyncCheckpoint]:
+        """Return the checkpoint saved for the key, or None if it never synced."""
+
+    @abstractmethod
+    async def save(self, key: str, checkpoint: SyncCheckpoint) -> None:
+        """Save the checkpoint of the key, replacing the previous one."""
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """In-process checkpoint store, the checkpoints are lost when the process stops."""
+
+    def __init__(self):
+        self._checkpoints: Dict[str, SyncCheckpoint] = {}
+
+    async def load(self, key: str) -> Optional[SyncCheckpoint]:
+        return self._checkpoints.get(key)
+
+    async def save(self, key: str, checkpoint: SyncCheckpoint) -> None:
+        self._checkpoints[key] = checkpoint.model_copy()
+
+
+class FileCheckpointStore(CheckpointStore):
+    """Checkpoint store keeping a JSON file per key in a directory.
+
+    Each file is replaced atomically, so a crash while saving leaves the previous checkpoint.
+    The file is named after the percent-encoded key, so distinct keys never share a file.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    async def load(self, key: str) -> Optional[SyncCheckpoint]:
+        return await to_thread(self._load, key)
+
+    async def save(self, key: str, checkpoint: SyncCheckpoint) -> None:
+        await to_thread(self._save, key, checkpoint)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f'{quote(key, safe="")}.json'
+
+    def _load(self, key: str) -> Optional[SyncCheckpoint]:
+        try:
+            content = self._path(key).read_text()
+        except FileNotFoundError:
+            return None
+        return SyncCheckpoint.model_validate_json(content)
+
+    def _save(self, key: str, checkpoint: SyncCheckpoint):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        temporary = path.with_suffix('.tmp')
+        with open(temporary, 'w') as file:
+            file.write(checkpoint.model_dump_json())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+
+
+def search_query(watermark: Optional[datetime], filter: Optional[str] = None) -> Optional[str]:
+    """Build the search query of the objects updated since the watermark, included."""
+    if watermark is None:
+        return filter
+    timestamp = watermark.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    updated = f"updated_at:>='{timestamp}'"
+    return f'({filter}) AND {updated}' if filter else updated
+
+
+class IncrementalSync:
+    """Read the objects of a connection updated since the previous sync, resuming if needed.
+
+    The query must take the `$first`, `$after` and `$query` variables, select the `updatedAt` of
+    the nodes and the `pageInfo` of the connection, and should sort by update time:
+
+    ```python
+    PRODUCTS_GQL = '''
+    query products($first: Int!, $after: String, $query: String) {
+      products(first: $first, after: $after, query: $query, sortKey: UPDATED_AT) {
+        nodes { id title updatedAt }
+        pageInfo { hasNextPage endCursor }
+      }
+    }
+    '''
+
+    sync = IncrementalSync(token, PRODUCTS_GQL, 'products', FileCheckpointStore('checkpoints'))
+    async for products in sync.pages():
+        await save_products(products)
+    ```
+
+    The checkpoint is saved under `key`, `<store name>/<connection>` by default. The `filter` is
+    added to the search query, e.g. `status:active`.
+    """
+
+    def __init__(
+        self,
+        token: Token,
+        query: str,
+        connection: str,
+        checkpoint_store: CheckpointStore,
+        key: Optional[str] = None,
+        filter: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ):
+        self.token = token
+        self.query = query
+        self.connection = connection
+        self.checkpoint_store = checkpoint_store
+        self.key = key or f'{token.store_name}/{connection}'
+        self.filter = filter
+        self.page_size = page_size
+
+    async def pages(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield the nodes page by page, saving the checkpoint once each page is processed.
+
+        A page is processed when the next one is requested, so a page whose processing raised
+        is read again by the next sync.
+        """
+        checkpoint = await self.checkpoint_store.load(self.key) or SyncCheckpoint()
+        variables = {
+            'first': self.page_size,
+            'query': search_query(checkpoint.watermark, self.filter),
+        }
+        while True:
+            res = await self.token.execute_gql(
+                query=self.query, variables={**variables, 'after': checkpoint.cursor}
+            )
+            connection = res[self.connection]
+            nodes = _nodes(connection)
+            if nodes:
+                yield nodes
+
+            for node in nodes:
+                updated_at = _parse_timestamp(node['updatedAt'])
+                if checkpoint.high_watermark is None or updated_at > checkpoint.high_watermark:
+                    checkpoint.high_watermark = updated_at
+            page_info = connection['pageInfo']
+            if not page_info['hasNextPage']:
+                checkpoint = SyncCheckpoint(
+                    watermark=checkpoint.high_watermark or checkpoint.watermark
+                )
+                await self.checkpoint_store.save(self.key, checkpoint)
+                return
+            checkpoint.cursor = page_info['endCursor']
+            await self.checkpoint_store.save(self.key, checkpoint)
+
+    async def run(self, handler: Callable[[List[Dict[str, Any]]], Awaitable[Any]]) -> int:
+        """Pass each page of nodes to the handler and return the number of nodes synced."""
+        count = 0
+        async for nodes in self.pages():
+            await handler(nodes)
+            count += len(nodes)
+        return count
+
+
+def _nodes(connection: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if 'nodes' in connection:
+        return connection['nodes']
+    return [edge['node'] for edge in connection['edges']]
+
+
+def _parse_timestamp(value: str) -> datetime:
+    # fromisoformat only accepts the Z suffix from Python 3.11
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
@@ -1,43 +1,106 @@
 import datetime
 import json
 from base64 import urlsafe_b64encode
-from typing import Any, Dict
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Mapping, Optional
 
 from Crypto.Cipher import AES
-from Crypto.Hash import HMAC, SHA256
+from Crypto.Hash import SHA256
 from Crypto.Random import get_random_bytes
 
+from .hmac import Signer
 
-def generate_token(secret: str, customer_data: Dict[str, Any]) -> bytes:
-    key = SHA256.new(secret.encode('utf-8')).digest()
-    encryption_key = key[0:16]
-    signature_key = key[16:32]
 
-    if 'email' not in customer_data:
-        raise ValueError('Missing email in customer data')
+class MultipassGenerator:
+    """Multipass token generator with the encryption and signature keys derived once.
+
+    Use it to generate many tokens with the same secret, e.g. the login links for a whole
+    customer list. `generate_many` streams the tokens of an iterable of customers and can spread
+    very large batches over a pool of processes.
+
+    The customer data passed in is never modified.
+    """
+
+    def __init__(self, secret: str):
+        self._secret = secret
+        key = SHA256.new(secret.encode('utf-8')).digest()
+        self._encryption_key = key[0:16]
+        self._signer = Signer(key[16:32])
+
+    def __reduce__(self):
+        # The keys are derived again in the worker processes
+        return (MultipassGenerator, (self._secret,))
+
+    def generate_token(self, customer_data: Mapping[str, Any]) -> bytes:
+        if 'email' not in customer_data:
+            raise ValueError('Missing email in customer data')
+
+        data = {**customer_data, 'created_at': datetime.datetime.utcnow().isoformat()}
+        cypher_text = _encrypt(self._encryption_key, json.dumps(data).encode('utf-8'))
+        return urlsafe_b64encode(cypher_text + self._signer.digest(cypher_text))
+
+    def generate_url(self, customer_data: Mapping[str, Any], store_url: str) -> str:
+        token = self.generate_token(customer_data).decode('utf-8')
+        return f'{store_url}/account/login/multipass/{token}'
+
+    def generate_many(
+        self,
+        customers: Iterable[Mapping[str, Any]],
+        processes: Optional[int] = None,
+        chunksize: int = 1000,
+    ) -> Iterator[bytes]:
+        """Generate the tokens of the customers, in the same order.
+
+        The customers are consumed lazily, so the iterable can be a stream of any length. With
+        `processes`, chunks of `chunksize` customers are encrypted in a pool of that many
+        processes, with at most two chunks per process waiting at any time.
+        """
+        if not processes:
+            for customer_data in customers:
+                yield self.generate_token(customer_data)
+            return
 
-    customer_data['created_at'] = datetime.datetime.utcnow().isoformat()
-    cypher_text = _encrypt(encryption_key, json.dumps(customer_data))
-    return urlsafe_b64encode(cypher_text + _sign(signature_key, cypher_text))
+        iterator = iter(customers)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            pending: Deque['Future[List[bytes]]'] = deque()
+            while True:
+                while len(pending) < 2 * processes:
+                    chunk = list(islice(iterator, chunksize))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(_generate_chunk, self, chunk))
+                if not pending:
+                    return
+                yield from pending.popleft().result()
+
+
+def _generate_chunk(generator: MultipassGenerator, chunk: List[Mapping[str, Any]]) -> List[bytes]:
+    return [generator.generate_token(customer_data) for customer_data in chunk]
+
+
+@lru_cache(maxsize=32)
+def get_generator(secret: str) -> MultipassGenerator:
+    """Return a generator for the secret, reused across calls with the same secret."""
+    return MultipassGenerator(secret)
+
+
+def generate_token(secret: str, customer_data: Dict[str, Any]) -> bytes:
+    return get_generator(secret).generate_token(customer_data)
 
 
 def generate_url(secret: str, customer_data: Dict[str, Any], store_url) -> str:
-    token = generate_token(secret, customer_data).decode('utf-8')
-    return f'{store_url}/account/login/multipass/{token}'
+    return get_generator(secret).generate_url(customer_data, store_url)
 
 
-def _encrypt(encryption_key, plain_text) -> bytes:
-    plain_text = _pad(plain_text)
+def _encrypt(encryption_key: bytes, plain_text: bytes) -> bytes:
     iv = get_random_bytes(AES.block_size)
     cipher = AES.new(encryption_key, AES.MODE_CBC, iv)
-    return iv + cipher.encrypt(str.encode(plain_text))
-
-
-def _sign(signature_key, cypher_text):
-    return HMAC.new(signature_key, cypher_text, SHA256).digest()
+    return iv + cipher.encrypt(_pad(plain_text))
 
 
-def _pad(s):
-    return s + (AES.block_size - len(s) % AES.block_size) * chr(
-        AES.block_size - len(s) % AES.block_size
-    )
+def _pad(data: bytes) -> bytes:
+    padding = AES.block_size - len(data) % AES.block_size
+    return data + bytes((padding,)) * padding
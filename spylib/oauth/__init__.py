@@ -1,16 +1,35 @@
 from .exchange_token import (
     exchange_offline_token,
     exchange_online_token,
+    exchange_session_token,
     exchange_token,
 )
 from .models import OfflineTokenModel, OnlineTokenModel
-from .signature_validation import validate_signed_query_string
+from .nonce import MemoryNonceStore, NonceStore
+from .signature_validation import (
+    SignedQueryString,
+    parse_app_proxy_query_string,
+    parse_callback_query_string,
+    parse_signed_query_string,
+    validate_app_proxy_query_string,
+    validate_signed_query_string,
+)
+from .token_exchange import SessionTokenExchanger
 
 __all__ = [
     'exchange_token',
     'exchange_offline_token',
     'exchange_online_token',
+    'exchange_session_token',
+    'SessionTokenExchanger',
     'OfflineTokenModel',
     'OnlineTokenModel',
     'validate_signed_query_string',
+    'validate_app_proxy_query_string',
+    'parse_signed_query_string',
+    'parse_app_proxy_query_string',
+    'parse_callback_query_string',
+    'SignedQueryString',
+    'NonceStore',
+    'MemoryNonceStore',
 ]
@@ -3,8 +3,9 @@ from typing import Awaitable, Callable, Optional
 
 from .exchange_token import exchange_offline_token, exchange_online_token
 from .models import OfflineTokenModel, OnlineTokenModel
+from .nonce import NonceStore
 from .tokens import OAuthJWT
-from .validations import validate_callback, validate_oauthjwt
+from .validations import validate_callback, validate_nonce, validate_oauthjwt
 
 
 async def process_callback(
@@ -18,6 +19,7 @@ async def process_callback(
     code: str,
     post_install: Callable[[str, OfflineTokenModel], Optional[Awaitable]],
     post_login: Optional[Callable[[str, OnlineTokenModel], Optional[Awaitable]]],
+    nonce_store: Optional[NonceStore] = None,
 ) -> OAuthJWT:
     validate_callback(
         shop=shop,
@@ -26,6 +28,8 @@ async def process_callback(
         api_secret_key=api_secret_key,
     )
     oauthjwt: OAuthJWT = validate_oauthjwt(token=state, shop=shop, jwt_key=private_key)
+    if nonce_store is not None:
+        await validate_nonce(oauthjwt=oauthjwt, nonce_store=nonce_store)
 
     if not oauthjwt.is_login:
         await process_install_callback(
@@ -1,9 +1,85 @@
-from typing import Union
-
-from httpx import AsyncClient, codes
+from asyncio import AbstractEventLoop, Semaphore, get_running_loop
+from typing import Any, Dict, Optional, Tuple, Union
+
+from httpx import (
+    AsyncClient,
+    ConnectError,
+    ConnectTimeout,
+    PoolTimeout,
+    Response,
+    codes,
+)
+from tenacity import retry
+from tenacity.retry import retry_if_exception_type
+from tenacity.stop import stop_after_attempt
+from tenacity.wait import wait_random_exponential
+
+from spylib.admin_api import Token
+from spylib.constants import API_CALL_NUMBER_RETRY_ATTEMPTS
+from spylib.exceptions import ShopifyCallInvalidError, ShopifyIntermittentError
 
 from .models import OfflineTokenModel, OnlineTokenModel
 
+# Timeout in seconds of each call to the token endpoint
+TOKEN_EXCHANGE_TIMEOUT = 10.0
+# Maximum number of token exchanges running at the same time in the process
+TOKEN_EXCHANGE_MAX_CONCURRENCY = 50
+
+TOKEN_EXCHANGE_GRANT_TYPE = 'urn:ietf:params:oauth:grant-type:token-exchange'
+ID_TOKEN_TYPE = 'urn:ietf:params:oauth:token-type:id_token'
+ONLINE_ACCESS_TOKEN_TYPE = 'urn:shopify:params:oauth:token-type:online-access-token'
+OFFLINE_ACCESS_TOKEN_TYPE = 'urn:shopify:params:oauth:token-type:offline-access-token'
+
+_limiter: Optional[Tuple[AbstractEventLoop, Semaphore]] = None
+
+
+def _exchange_limiter() -> Semaphore:
+    """Return the semaphore bounding the concurrent exchanges, created for the running loop."""
+    global _limiter
+    loop = get_running_loop()
+    if _limiter is None or _limiter[0] is not loop:
+        _limiter = (loop, Semaphore(TOKEN_EXCHANGE_MAX_CONCURRENCY))
+    return _limiter[1]
+
+
+@retry(
+    reraise=True,
+    wait=wait_random_exponential(multiplier=0.5, max=5),
+    stop=stop_after_attempt(API_CALL_NUMBER_RETRY_ATTEMPTS),
+    # The code can only be used once, only retry when the request can't have been received
+    retry=retry_if_exception_type(
+        (ShopifyIntermittentError, ConnectError, ConnectTimeout, PoolTimeout)
+    ),
+)
+async def request_access_token(
+    shop: str, json: Dict[str, Any], client: Optional[AsyncClient] = None
+) -> Dict[str, Any]:
+    """Call the access token endpoint of the shop and return the JSON response.
+
+    The call goes through the client shared with the Admin API calls, unless another client is
+    given, so connections are reused across exchanges. At most `TOKEN_EXCHANGE_MAX_CONCURRENCY`
+    calls run at the same time, and 5xx responses and connection errors are retried with an
+    exponential backoff. Other transport errors, like a read timeout, are not retried: the
+    request may have been processed and the code already used.
+    """
+    async with _exchange_limiter():
+        response: Response = await (client or Token.client).post(
+            url=f'https://{shop}/admin/oauth/access_token',
+            json=json,
+            timeout=TOKEN_EXCHANGE_TIMEOUT,
+        )
+
+    if response.status_code >= 500:
+        raise ShopifyIntermittentError(
+            f'Shopify token exchange returned an intermittent error. Shop: "{shop}". '
+            f'Status: "{response.status_code}".'
+        )
+    if response.status_code != codes.OK:
+        raise ShopifyCallInvalidError(
+            f'Shopify rejected token exchange. Shop: "{shop}". Status: "{response.status_code}".'
+        )
+    return response.json()
+
 
 async def exchange_token(
     *,
@@ -11,6 +87,7 @@ async def exchange_token(
     code: str,
     api_key: str,
     api_secret_key: str,
+    client: Optional[AsyncClient] = None,
 ) -> Union[OnlineTokenModel, OfflineTokenModel]:
     """[Exchanges the temporary authorization code with Shopify for a token](https://shopify.dev/apps/auth/oauth/getting-started#step-5-get-a-permanent-access-token).
 
@@ -21,28 +98,21 @@ async def exchange_token(
         code (str): The authorization code provided in the redirect.
         api_key (str): The API key for the app, as defined in the Shopify Partner Dashboard.
         api_secret_key (str): The API secret key for the app, as defined in the Shopify Partner Dashboard.
+        client (AsyncClient, optional): HTTP client to use instead of the one shared with the Admin API calls.
 
     Returns:
         Union[OnlineTokenModel, OfflineTokenModel]: Validated token response. Will differ [depending upon the requested access mode.](https://shopify.dev/apps/auth/oauth/access-modes)
     """
 
-    async with AsyncClient(base_url=f'https://{shop}') as client:
-        response = await client.post(
-            url='/admin/oauth/access_token',
-            json={
-                'code': code,
-                'client_id': api_key,
-                'client_secret': api_secret_key,
-            },
-        )
-
-    if response.status_code != codes.OK:
-        message = (
-            f'Shopify rejected token exchange. Shop: "{shop}". Status: "{response.status_code}".'
-        )
-        raise Exception(message)  # Not sure what the convention is here
-
-    raw_response_body = response.json()
+    raw_response_body = await request_access_token(
+        shop=shop,
+        json={
+            'code': code,
+            'client_id': api_key,
+            'client_secret': api_secret_key,
+        },
+        client=client,
+    )
     is_online_token = 'associated_user' in raw_response_body
 
     if is_online_token:
@@ -57,6 +127,7 @@ async def exchange_offline_token(
     code: str,
     api_key: str,
     api_secret_key: str,
+    client: Optional[AsyncClient] = None,
 ) -> OfflineTokenModel:
     """[Exchanges the temporary authorization code with Shopify for an offline token](https://shopify.dev/apps/auth/oauth/getting-started#step-5-get-a-permanent-access-token).
 
@@ -69,12 +140,13 @@ async def exchange_offline_token(
         code (str): The authorization code provided in the redirect.
         api_key (str): The API key for the app, as defined in the Shopify Partner Dashboard.
         api_secret_key (str): The API secret key for the app, as defined in the Shopify Partner Dashboard.
+        client (AsyncClient, optional): HTTP client to use instead of the one shared with the Admin API calls.
 
     Returns:
         OfflineTokenModel: [Validated offline token response.]https://shopify.dev/apps/auth/oauth/access-modes#offline-access
     """
     token = await exchange_token(
-        shop=shop, code=code, api_key=api_key, api_secret_key=api_secret_key
+        shop=shop, code=code, api_key=api_key, api_secret_key=api_secret_key, client=client
     )
 
     assert isinstance(token, OfflineTokenModel)
@@ -88,6 +160,7 @@ async def exchange_online_token(
     code: str,
     api_key: str,
     api_secret_key: str,
+    client: Optional[AsyncClient] = None,
 ) -> OnlineTokenModel:
     """[Exchanges the temporary authorization code with Shopify for an online token](https://shopify.dev/apps/auth/oauth/getting-started#step-5-get-a-permanent-access-token).
 
@@ -100,14 +173,59 @@ async def exchange_online_token(
         code (str): The authorization code provided in the redirect.
         api_key (str): The API key for the app, as defined in the Shopify Partner Dashboard.
         api_secret_key (str): The API secret key for the app, as defined in the Shopify Partner Dashboard.
+        client (AsyncClient, optional): HTTP client to use instead of the one shared with the Admin API calls.
 
     Returns:
         OnlineTokenModel: [Validated online token response.]https://shopify.dev/apps/auth/oauth/access-modes#online-access
     """
     token = await exchange_token(
-        shop=shop, code=code, api_key=api_key, api_secret_key=api_secret_key
+        shop=shop, code=code, api_key=api_key, api_secret_key=api_secret_key, client=client
     )
 
     assert isinstance(token, OnlineTokenModel)
 
     return token
+
+
+async def exchange_session_token(
+    *,
+    shop: str,
+    session_token: str,
+    api_key: str,
+    api_secret_key: str,
+    online: bool = False,
+    client: Optional[AsyncClient] = None,
+) -> Union[OnlineTokenModel, OfflineTokenModel]:
+    """Exchanges a session token sent by App Bridge for an access token, without any redirect.
+
+    Uses the [token exchange](https://shopify.dev/docs/apps/auth/get-access-tokens/token-exchange)
+    grant available to embedded apps.
+
+    Args:
+        shop (str): The shop's domain, as found in the `dest` claim of the session token.
+        session_token (str): The raw session token, verified beforehand.
+        api_key (str): The API key for the app, as defined in the Shopify Partner Dashboard.
+        api_secret_key (str): The API secret key for the app, as defined in the Shopify Partner Dashboard.
+        online (bool): Request an online access token for the user of the session token instead of an offline one.
+        client (AsyncClient, optional): HTTP client to use instead of the one shared with the Admin API calls.
+
+    Returns:
+        Union[OnlineTokenModel, OfflineTokenModel]: The model for the returned access token.
+    """
+    raw_response_body = await request_access_token(
+        shop=shop,
+        json={
+            'client_id': api_key,
+            'client_secret': api_secret_key,
+            'grant_type': TOKEN_EXCHANGE_GRANT_TYPE,
+            'subject_token': session_token,
+            'subject_token_type': ID_TOKEN_TYPE,
+            'requested_token_type': (
+                ONLINE_ACCESS_TOKEN_TYPE if online else OFFLINE_ACCESS_TOKEN_TYPE
+            ),
+        },
+        client=client,
+    )
+    if online:
+        return OnlineTokenModel.model_validate(raw_response_body)
+    return OfflineTokenModel.model_validate(raw_response_body)
@@ -14,9 +14,10 @@ except ImportError as e:
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
 
-from ..utils import store_domain
+from ..utils import get_unique_id, store_domain
 from .callback import process_callback
 from .models import OfflineTokenModel, OnlineTokenModel
+from .nonce import NonceStore
 from .redirects import app_redirect, oauth_init_url
 
 
@@ -41,6 +42,7 @@ def init_oauth_router(
     install_init_path='/shopify/auth',
     callback_path='/callback',
     path_prefix: str = '',
+    nonce_store: Optional[NonceStore] = None,
 ) -> APIRouter:
     router = APIRouter()
 
@@ -51,21 +53,26 @@ def init_oauth_router(
     if path_prefix and not path_prefix.startswith('/'):
         raise ValueError('The path_prefix argument must start with "/"')
 
+    async def init_url(domain: str, is_login: bool) -> str:
+        nonce = get_unique_id()
+        if nonce_store is not None:
+            await nonce_store.add(nonce)
+        return oauth_init_url(
+            domain=domain,
+            is_login=is_login,
+            requested_scopes=user_scopes if is_login else app_scopes,
+            callback_domain=public_domain,
+            callback_path=callback_path,
+            path_prefix=path_prefix,
+            jwt_key=private_key,
+            api_key=api_key,
+            nonce=nonce,
+        )
+
     @router.get(install_init_path, include_in_schema=False)
     async def shopify_auth(shop: str):
         """Endpoint initiating the OAuth process on a Shopify store."""
-        return RedirectResponse(
-            oauth_init_url(
-                domain=store_domain(shop=shop),
-                is_login=False,
-                requested_scopes=app_scopes,
-                callback_domain=public_domain,
-                callback_path=callback_path,
-                path_prefix=path_prefix,
-                jwt_key=private_key,
-                api_key=api_key,
-            )
-        )
+        return RedirectResponse(await init_url(domain=store_domain(shop=shop), is_login=False))
 
     @router.get(callback_path, include_in_schema=False)
     async def shopify_callback(request: Request, shop: str, args: Callback = Depends(Callback)):
@@ -82,6 +89,7 @@ def init_oauth_router(
                 code=args.code,
                 post_install=post_install,
                 post_login=post_login,
+                nonce_store=nonce_store,
             )
         except Exception as e:
             raise HTTPException(status_code=400, detail=f'Validation failed: {e}')
@@ -98,18 +106,7 @@ def init_oauth_router(
                     )
                 )
             # Initiate the oauth loop for login
-            return RedirectResponse(
-                oauth_init_url(
-                    domain=args.shop,
-                    is_login=True,
-                    requested_scopes=user_scopes,
-                    callback_domain=public_domain,
-                    callback_path=callback_path,
-                    path_prefix=path_prefix,
-                    jwt_key=private_key,
-                    api_key=api_key,
-                )
-            )
+            return RedirectResponse(await init_url(domain=args.shop, is_login=True))
 
         # Redirect to the app in Shopify admin
         return RedirectResponse(
@@ -0,0 +1,102 @@
+from abc import ABC, abstractmethod
+from math import ceil
+from time import monotonic
+from typing import Dict, List, Set
+
+# Lifetime of the OAuth state JWT, see JWTBaseModel
+OAUTH_NONCE_LIFETIME = 900
+
+
+class NonceStore(ABC):
+    """Record the nonces of the OAuth states issued by the app so each one is used only once.
+
+    A nonce is added when the OAuth process starts and consumed when Shopify calls back, so
+    replaying the callback with the same state is rejected. Extend this class to share the
+    nonces between workers, e.g. with Redis `SET nonce 1 NX EX 900` to add and `GETDEL nonce`
+    to consume.
+    """
+
+    @abstractmethod
+    async def add(self, nonce: str) -> None:
+        """Record a newly issued nonce."""
+
+    @abstractmethod
+    async def consume(self, nonce: str) -> bool:
+        """Remove the nonce and return True if it was issued and not consumed or expired yet."""
+
+
+class MemoryNonceStore(NonceStore):
+    """In-process nonce store dropping the nonces `lifetime` seconds after they were issued.
+
+    The nonces are kept in a hash map for the lookups and in an expiry wheel of one-second
+    slots, so the expired nonces are dropped a slot at a time without scanning the whole store.
+    When more than `capacity` nonces are pending, the oldest ones are dropped early, so memory
+    never grows past `capacity` entries.
+
+    The store is meant for a single process: an OAuth process started on one worker and
+    finished on another needs a shared store.
+    """
+
+    def __init__(self, lifetime: float = OAUTH_NONCE_LIFETIME, capacity: int = 100_000):
+        if capacity < 1:
+            raise ValueError('The capacity must be positive')
+        self.lifetime = lifetime
+        self.capacity = capacity
+        self._wheel: List[Set[str]] = [set() for _ in range(ceil(lifetime) + 1)]
+        # Last second whose slot was dropped
+        self._tick = int(monotonic()) - 1
+        self._expires: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    async def add(self, nonce: str) -> None:
+        now = monotonic()
+        self._advance(now)
+        previous = self._expires.get(nonce)
+        if previous is not None:
+            # Issued again, it moves to the slot of its new expiry
+            self._slot(previous).discard(nonce)
+        elif len(self._expires) >= self.capacity:
+            self._drop_oldest()
+        expires = now + self.lifetime
+        self._expires[nonce] = expires
+        self._slot(expires).add(nonce)
+
+    async def consume(self, nonce: str) -> bool:
+        now = monotonic()
+        self._advance(now)
+        expires = self._expires.pop(nonce, None)
+        if expires is None:
+            return False
+        self._slot(expires).discard(nonce)
+        return expires > now
+
+    def _slot(self, expires: float) -> Set[str]:
+        return self._wheel[int(expires) % len(self._wheel)]
+
+    def _advance(self, now: float):
+        """Drop the nonces of the slots whose second has fully elapsed since the last call."""
+        tick = int(now)
+        # A full turn of the wheel visits every slot, no need to go around more than once
+        start = max(self._tick + 1, tick - len(self._wheel))
+        for second in range(start, tick):
+            self._drop_slot(second)
+        self._tick = max(self._tick, tick - 1)
+
+    def _drop_slot(self, second: int):
+        slot = self._wheel[second % len(self._wheel)]
+        # Only the nonces due by the end of this second are evicted
+        due = [nonce for nonce in slot if self._expires[nonce] < second + 1]
+        for nonce in due:
+            slot.discard(nonce)
+            del self._expires[nonce]
+
+    def _drop_oldest(self):
+        """Drop a nonce from the slot expiring the soonest."""
+        size = len(self._wheel)
+        for offset in range(size):
+            slot = self._wheel[(self._tick + 1 + offset) % size]
+            if slot:
+                del self._expires[slot.pop()]
+                return
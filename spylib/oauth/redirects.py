@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from ..utils import domain_to_storename, get_unique_id
 from .tokens import OAuthJWT
@@ -13,6 +13,7 @@ def oauth_init_url(
     is_login: bool,
     jwt_key: str,
     api_key: str,
+    nonce: Optional[str] = None,
 ) -> str:
     """Create the URL and the parameters needed to start the oauth process to install an app or to log a user in.
 
@@ -23,6 +24,8 @@ def oauth_init_url(
         See https://shopify.dev/docs/admin-api/access-scopes
     callback_domain: Public domain Shopify will connect to during the oauth process
     is_login: Specify if the oauth is to install the app or a user logging in
+    nonce: Nonce embedded in the state, a random one is generated if not given. Record it in a
+        `NonceStore` to reject replayed callbacks
 
     Returns
     -------
@@ -31,7 +34,7 @@ def oauth_init_url(
     scopes = ','.join(requested_scopes)
     redirect_uri = f'https://{callback_domain}{path_prefix}{callback_path}'
     oauthjwt = OAuthJWT(
-        is_login=is_login, storename=domain_to_storename(domain), nonce=get_unique_id()
+        is_login=is_login, storename=domain_to_storename(domain), nonce=nonce or get_unique_id()
     )
     oauth_token = oauthjwt.encode_token(key=jwt_key)
     access_mode = 'per-user' if is_login else ''
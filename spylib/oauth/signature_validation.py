@@ -1,36 +1,77 @@
 from json import dumps
-from typing import List, Optional, Tuple
-from urllib.parse import parse_qsl, urlencode
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import unquote_plus, urlencode
 
-from spylib.hmac import validate
+from spylib.constants import UTF8ENCODING
+from spylib.hmac import get_verifier
 
 
-def validate_signed_query_string(query_string: str, *, api_secret_key: str):
-    """Validates that a query string has been signed by Shopify.
+class SignedQueryString(NamedTuple):
+    """A query string signed by Shopify, parsed in a single pass.
+
+    `message` is the canonical message the signature was calculated from and `params` holds
+    the last value of each parameter other than the signature.
+    """
+
+    signature: Optional[str]
+    message: str
+    params: Dict[str, str]
+
+    def get(self, key: str) -> Optional[str]:
+        return self.params.get(key)
+
+    def validate(self, api_secret_key: str):
+        """Raises `ValueError` if the signature is missing or invalid."""
+        get_verifier(api_secret_key).validate(sent_hmac=self.signature or '', message=self.message)
+
+
+def _split_query_string(
+    query_string: Union[str, bytes], keep_blank_values: bool = False, strict: bool = True
+) -> Iterator[Tuple[str, str]]:
+    """Yield the decoded key and value of each field, like `parse_qsl`.
+
+    With `strict`, a field without `=` raises `ValueError` as with `strict_parsing`, otherwise
+    it's skipped.
+    """
+    if isinstance(query_string, bytes):
+        query_string = query_string.decode(UTF8ENCODING, errors='replace')
+    if not query_string:
+        return
+    for field in query_string.split('&'):
+        key, separator, value = field.partition('=')
+        if not separator:
+            if strict:
+                raise ValueError(f'bad query field: {field!r}')
+            continue
+        if not value and not keep_blank_values:
+            continue
+        # Most fields don't need decoding
+        if '%' in key or '+' in key:
+            key = unquote_plus(key)
+        if '%' in value or '+' in value:
+            value = unquote_plus(value)
+        yield key, value
+
+
+def parse_signed_query_string(query_string: Union[str, bytes]) -> SignedQueryString:
+    """Parse a query string signed with an `hmac` parameter, e.g. an embedded app request.
 
     [Implements the parsing algorithm defined by Shopify here](https://shopify.dev/apps/auth/oauth/getting-started#step-7-verify-a-request).
     Including the special case [`ids` parameter parsing](https://shopify.dev/apps/auth/oauth/getting-started#ids-array-parameter)
 
-
-    Args:
-        query_string: A valid query string. `hmac=123&test=456`
-        api_secret_key: The api secret key from Shopify partners.
+    The raw query string is parsed once to extract the parameters and build the message: the
+    fields other than `hmac` url encoded again in the order Shopify sent them, with the `ids[]`
+    values collected into a JSON list.
 
     Raises:
-        Exception: `ValueError`
+        Exception: `ValueError` if a field is malformed
     """
-
     signature: Optional[str] = None
+    params: Dict[str, str] = {}
     query_params: List[Tuple[str, str]] = []
-
-    # I tried a number of options here to avoid doing
-    # manual parsing and string manipulation. `parse_qs`
-    # can work as long as you pass `doseq=True` & `quote_via=quote``
-    # to urlencode. It does not, however, handle the ids param.
-    # The code ended up being cleaner this way in one loop.
-
     ids: List[str] = []
-    for key, value in parse_qsl(query_string, strict_parsing=True):
+
+    for key, value in _split_query_string(query_string):
         if key == 'hmac':
             signature = value
             continue
@@ -39,13 +80,81 @@ def validate_signed_query_string(query_string: str, *, api_secret_key: str):
                 query_params.append(('ids', ''))
             ids.append(value)
             continue
+        params[key] = value
         query_params.append((key, value))
 
     # `safe` param via: https://stackoverflow.com/a/49244224
     message = urlencode(query_params, safe=':/').replace('ids=', f'ids={dumps(ids)}')
+    return SignedQueryString(signature=signature, message=message, params=params)
+
+
+def parse_callback_query_string(query_string: Union[str, bytes]) -> SignedQueryString:
+    """Parse the query string of an OAuth callback, signed with an `hmac` parameter.
+
+    The message is built in the same pass as the parameters are extracted: the decoded fields
+    other than `hmac` joined with `&` in the order Shopify sent them, without encoding them
+    again. Fields without a value are skipped like `parse_qsl` does, and the first `hmac` is the
+    signature.
+    """
+    signature: Optional[str] = None
+    params: Dict[str, str] = {}
+    fields: List[str] = []
+    for key, value in _split_query_string(query_string, strict=False):
+        if key == 'hmac':
+            if signature is None:
+                signature = value
+            continue
+        params[key] = value
+        fields.append(f'{key}={value}')
+    return SignedQueryString(signature=signature, message='&'.join(fields), params=params)
 
-    validate(
-        sent_hmac=signature or '',
-        message=message,
-        secret=api_secret_key,
-    )
+
+def parse_app_proxy_query_string(query_string: Union[str, bytes]) -> SignedQueryString:
+    """Parse a query string forwarded by an app proxy and signed with a `signature` parameter.
+
+    [Implements the algorithm defined by Shopify here](https://shopify.dev/apps/online-store/app-proxies#calculate-a-digital-signature):
+    the fields other than `signature` sorted by key, the values of repeated keys joined with
+    `,`, and concatenated without separator.
+
+    Raises:
+        Exception: `ValueError` if a field is malformed
+    """
+    signature: Optional[str] = None
+    values: Dict[str, List[str]] = {}
+    for key, value in _split_query_string(query_string, keep_blank_values=True):
+        if key == 'signature':
+            signature = value
+            continue
+        values.setdefault(key, []).append(value)
+
+    message = ''.join(f'{key}={",".join(values[key])}' for key in sorted(values))
+    params = {key: key_values[-1] for key, key_values in values.items()}
+    return SignedQueryString(signature=signature, message=message, params=params)
+
+
+def validate_signed_query_string(query_string: Union[str, bytes], *, api_secret_key: str):
+    """Validates that a query string has been signed by Shopify.
+
+    See `parse_signed_query_string` for the parsing algorithm.
+
+    Args:
+        query_string: A valid query string. `hmac=123&test=456`
+        api_secret_key: The api secret key from Shopify partners.
+
+    Raises:
+        Exception: `ValueError`
+    """
+    parse_signed_query_string(query_string).validate(api_secret_key)
+
+
+def validate_app_proxy_query_string(query_string: Union[str, bytes], *, api_secret_key: str):
+    """Validates that a query string forwarded by an app proxy has been signed by Shopify.
+
+    Args:
+        query_string: The query string of the proxied request. `shop=...&signature=123`
+        api_secret_key: The api secret key from Shopify partners.
+
+    Raises:
+        Exception: `ValueError`
+    """
+    parse_app_proxy_query_string(query_string).validate(api_secret_key)
@@ -0,0 +1,100 @@
+from asyncio import Task, ensure_future, shield
+from math import inf
+from time import time
+from typing import Dict, Hashable, Optional, Tuple, Union
+
+from httpx import AsyncClient
+
+from ..session_token import PREFIX, SessionTokenCache, SessionTokenVerifier
+from .exchange_token import exchange_session_token
+from .models import OfflineTokenModel, OnlineTokenModel
+
+AccessToken = Union[OnlineTokenModel, OfflineTokenModel]
+
+
+class SessionTokenExchanger:
+    """Exchange the session tokens sent by App Bridge for access tokens, with a cache.
+
+    The session token is verified, then exchanged for an online or offline access token with
+    the token exchange grant. The access tokens are cached per shop, user (for online tokens)
+    and access mode: online tokens until `expiry_margin` seconds before they expire, offline
+    tokens until they are evicted or invalidated. Concurrent exchanges for the same key share a
+    single call to Shopify.
+
+    At most `maxsize` access tokens are cached, the least recently used are evicted first.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_secret_key: str,
+        maxsize: int = 1024,
+        expiry_margin: float = 60,
+        client: Optional[AsyncClient] = None,
+    ):
+        self.api_key = api_key
+        self.api_secret_key = api_secret_key
+        self.expiry_margin = expiry_margin
+        self.client = client
+        self.cache = SessionTokenCache(maxsize=maxsize)
+        self._verifier = SessionTokenVerifier(api_key, api_secret_key)
+        self._pending: Dict[Hashable, 'Task[AccessToken]'] = {}
+
+    async def from_header(self, authorization_header: str, online: bool = False) -> AccessToken:
+        """Verify the session token of the `Authorization` header and exchange it."""
+        verified = self._verifier.from_header(authorization_header)
+        session_token = authorization_header[len(PREFIX) :]
+        return await self._get(verified.shop, verified.sub, session_token, online)
+
+    async def exchange(self, session_token: str, online: bool = False) -> AccessToken:
+        """Verify the raw session token and exchange it, or return the cached access token."""
+        verified = self._verifier.verify(session_token)
+        return await self._get(verified.shop, verified.sub, session_token, online)
+
+    def invalidate(self, shop: str, user: Optional[str] = None, online: bool = False):
+        """Drop a cached access token, e.g. when Shopify rejects it."""
+        self.cache.delete(self._key(shop, user, online))
+
+    async def _get(self, shop: str, user: str, session_token: str, online: bool) -> AccessToken:
+        key = self._key(shop, user, online)
+        access_token = self.cache.get(key)
+        if access_token is not None:
+            return access_token
+
+        task = self._pending.get(key)
+        if task is None:
+            task = ensure_future(self._exchange(key, shop, session_token, online))
+            self._pending[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        # A cancelled caller must not cancel the exchange awaited by the others
+        return await shield(task)
+
+    async def _exchange(
+        self, key: Hashable, shop: str, session_token: str, online: bool
+    ) -> AccessToken:
+        access_token = await exchange_session_token(
+            shop=shop,
+            session_token=session_token,
+            api_key=self.api_key,
+            api_secret_key=self.api_secret_key,
+            online=online,
+            client=self.client,
+        )
+        # Offline access tokens don't expire, they stay cached until evicted or invalidated
+        expires_at = inf
+        if isinstance(access_token, OnlineTokenModel):
+            expires_at = time() + access_token.expires_in - self.expiry_margin
+        self.cache.set(key, access_token, expires_at=expires_at)
+        return access_token
+
+    def _done(self, key: Hashable, task: 'Task[AccessToken]'):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        # Every caller may have been cancelled, the failure must not be logged as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+    @staticmethod
+    def _key(shop: str, user: Optional[str], online: bool) -> Tuple[str, Optional[str], bool]:
+        # Offline tokens belong to the shop, not to the user
+        return (shop, user if online else None, online)
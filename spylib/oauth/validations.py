@@ -1,14 +1,14 @@
 from typing import Any, List, Tuple
-from urllib.parse import parse_qsl
 
 from spylib.hmac import validate as validate_hmac
 
 from ..utils import domain_to_storename, now_epoch
+from .nonce import NonceStore
+from .signature_validation import parse_callback_query_string
 from .tokens import OAuthJWT
 
 
 def validate_callback(shop: str, timestamp: int, query_string: Any, api_secret_key: str) -> None:
-    q_str = query_string.decode('utf-8')
     # 1) Check that the shop is a valid Shopify URL
     domain_to_storename(shop)
 
@@ -16,10 +16,8 @@ def validate_callback(shop: str, timestamp: int, query_string: Any, api_secret_k
     if now_epoch() - timestamp > 300:
         raise ValueError('Timestamp is too old')
 
-    # 3) Check the hmac
-    # Extract HMAC
-    args = parse_qsl(q_str)
-    validate_callback_args(args=args, api_secret_key=api_secret_key)
+    # 3) Check the hmac, parsing the raw query string once
+    parse_callback_query_string(query_string).validate(api_secret_key)
 
 
 def validate_callback_args(args: List[Tuple[str, str]], api_secret_key: str) -> None:
@@ -39,3 +37,9 @@ def validate_oauthjwt(token: str, shop: str, jwt_key: str) -> OAuthJWT:
         raise ValueError("Token storename and query shop don't match")
 
     return oauthjwt
+
+
+async def validate_nonce(oauthjwt: OAuthJWT, nonce_store: NonceStore) -> None:
+    # The nonce is consumed so the same state can't be replayed
+    if oauthjwt.nonce is None or not await nonce_store.consume(oauthjwt.nonce):
+        raise ValueError('The OAuth state was already used or was not issued by the app')
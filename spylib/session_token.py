@@ -1,13 +1,31 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from base64 import urlsafe_b64decode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from hmac import compare_digest
+from json import loads
+from threading import Lock
+from time import time
+from typing import Any, Dict, Hashable, Optional, Set, Tuple, Type
 from urllib.parse import urlparse
 
 from jwt import decode
+from jwt.exceptions import (
+    DecodeError,
+    ExpiredSignatureError,
+    ImmatureSignatureError,
+    InvalidAlgorithmError,
+    InvalidAudienceError,
+    InvalidIssuedAtError,
+    InvalidSignatureError,
+    MissingRequiredClaimError,
+)
 from pydantic import model_validator
 from pydantic.main import BaseModel
 from pydantic.networks import HttpUrl
 
+from .hmac import Signer
 from .utils.domain import store_domain
 
 REQUIRED_FIELDS = ['iss', 'dest', 'sub', 'jti', 'sid']
@@ -32,6 +50,57 @@ class TokenAuthenticationError(TokenValidationError):
     pass
 
 
+class SessionTokenCache:
+    """Bounded cache of verified session tokens, each kept until it expires.
+
+    App Bridge reuses the same session token for many requests until it expires, so caching
+    the verified token skips the JWT decoding and validation for most requests. The least
+    recently used tokens are evicted when more than `maxsize` are cached. Tokens without an
+    expiration are never cached.
+
+    Cached tokens are shared between requests and must not be modified.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError('The maxsize must be positive')
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float]):
+        if expires_at is None or expires_at <= time():
+            return
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
 class SessionToken(BaseModel):
     """Session tokens are derived from the authorization header from Shopify.
 
@@ -71,7 +140,13 @@ class SessionToken(BaseModel):
         authorization_header: str,
         api_key: str,
         secret: str,
+        cache: Optional[SessionTokenCache] = None,
     ) -> SessionToken:
+        """Decode and validate the session token of the authorization header.
+
+        With a `cache`, a token already validated is returned without being decoded again
+        until it expires.
+        """
         # Take the authorization headers and unload them
         if not authorization_header.startswith(PREFIX):
             raise TokenAuthenticationError(
@@ -80,6 +155,19 @@ class SessionToken(BaseModel):
 
         token = authorization_header[len(PREFIX) :]
 
+        if cache is not None:
+            cache_key = (token, api_key, secret)
+            session_token = cache.get(cache_key)
+            if session_token is None:
+                session_token = cls.from_token(token, api_key=api_key, secret=secret)
+                cache.set(cache_key, session_token, expires_at=session_token.exp)
+            return session_token
+
+        return cls.from_token(token, api_key=api_key, secret=secret)
+
+    @classmethod
+    def from_token(cls, token: str, api_key: str, secret: str) -> SessionToken:
+        """Decode and validate the session token JWT."""
         payload = decode(
             token,
             secret,
@@ -97,3 +185,223 @@ class SessionToken(BaseModel):
     @staticmethod
     def __url_to_base(url):
         return '{uri.scheme}://{uri.netloc}'.format(uri=urlparse(url))
+
+
+class VerifiedSessionToken:
+    """Session token verified by `SessionTokenVerifier`.
+
+    It has the same fields as `SessionToken` but is a plain object: `iss` and `dest` are only
+    parsed into `HttpUrl` when accessed, and the raw strings are available as `iss_str` and
+    `dest_str`. `shop` is the domain of the store, e.g. `example.myshopify.com`.
+    """
+
+    __slots__ = (
+        'iss_str',
+        'dest_str',
+        'shop',
+        'aud',
+        'sub',
+        'exp',
+        'nbf',
+        'iat',
+        'jti',
+        'sid',
+        '_iss',
+        '_dest',
+    )
+
+    def __init__(self, claims: Dict[str, Any], shop: str):
+        self.iss_str: str = claims['iss']
+        self.dest_str: str = claims['dest']
+        self.shop = shop
+        self.aud: Optional[str] = claims.get('aud')
+        self.sub: str = claims['sub']
+        self.exp: Optional[float] = claims.get('exp')
+        self.nbf: Optional[float] = claims.get('nbf')
+        self.iat: Optional[float] = claims.get('iat')
+        self.jti: str = claims['jti']
+        self.sid: str = claims['sid']
+        self._iss: Optional[HttpUrl] = None
+        self._dest: Optional[HttpUrl] = None
+
+    @property
+    def iss(self) -> HttpUrl:
+        if self._iss is None:
+            self._iss = HttpUrl(self.iss_str)
+        return self._iss
+
+    @property
+    def dest(self) -> HttpUrl:
+        if self._dest is None:
+            self._dest = HttpUrl(self.dest_str)
+        return self._dest
+
+    def to_session_token(self) -> SessionToken:
+        return SessionToken(
+            iss=self.iss_str,
+            dest=self.dest_str,
+            aud=self.aud,
+            sub=self.sub,
+            exp=self.exp,
+            nbf=self.nbf,
+            iat=self.iat,
+            jti=self.jti,
+            sid=self.sid,
+        )
+
+
+class SessionTokenVerifier:
+    """Fast verifier of the HS256 session tokens sent by App Bridge.
+
+    It performs the same checks as `SessionToken.from_header` and raises the same exceptions,
+    but is specialized for Shopify's fixed token format instead of going through PyJWT and
+    pydantic: a single split of the token, one HMAC-SHA256 with the keyed state precomputed
+    for the secret, direct checks of the claims and a lightweight `VerifiedSessionToken`. Unlike
+    PyJWT, booleans are rejected in the `exp`, `nbf` and `iat` claims.
+
+    With a `cache`, tokens already verified are returned directly until they expire. The
+    cache must not be shared with `SessionToken.from_header`.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        secret: str,
+        leeway: float = LEEWAY_SECONDS,
+        cache: Optional[SessionTokenCache] = None,
+    ):
+        self.api_key = api_key
+        self.leeway = leeway
+        self.cache = cache
+        self._signer = Signer(secret)
+        # Encoded JOSE headers already checked, App Bridge always sends the same one
+        self._valid_headers: Set[str] = set()
+
+    def from_header(self, authorization_header: str) -> VerifiedSessionToken:
+        if not authorization_header.startswith(PREFIX):
+            raise TokenAuthenticationError(
+                'The authorization header does not contain a Bearer token.'
+            )
+        return self.verify(authorization_header[len(PREFIX) :])
+
+    def verify(self, token: str) -> VerifiedSessionToken:
+        if self.cache is not None:
+            session_token = self.cache.get(token)
+            if session_token is None:
+                session_token = self._verify(token)
+                self.cache.set(token, session_token, expires_at=session_token.exp)
+            return session_token
+        return self._verify(token)
+
+    def _verify(self, token: str) -> VerifiedSessionToken:
+        parts = token.split('.')
+        if len(parts) != 3:
+            raise DecodeError('Not enough segments')
+        header, payload, signature = parts
+
+        if header not in self._valid_headers:
+            self._check_header(header)
+
+        signing_input = token[: len(header) + len(payload) + 1]
+        try:
+            signing_input_bytes = signing_input.encode('ascii')
+        except UnicodeEncodeError as e:
+            raise DecodeError('Invalid token encoding') from e
+        if not compare_digest(_b64decode(signature), self._signer.digest(signing_input_bytes)):
+            raise InvalidSignatureError('Signature verification failed')
+
+        try:
+            claims = loads(_b64decode(payload))
+        except ValueError as e:
+            raise DecodeError(f'Invalid payload string: {e}') from e
+        if not isinstance(claims, dict):
+            raise DecodeError('Invalid payload string: must be a json object')
+
+        self._check_claims(claims)
+        shop = self._check_hosts(claims)
+        return VerifiedSessionToken(claims, shop=shop)
+
+    def _check_header(self, header: str):
+        try:
+            jose_header = loads(_b64decode(header))
+        except ValueError as e:
+            raise DecodeError(f'Invalid header string: {e}') from e
+        if not isinstance(jose_header, dict):
+            raise DecodeError('Invalid header string: must be a json object')
+        if jose_header.get('alg') != ALGORITHM:
+            raise InvalidAlgorithmError('The specified alg value is not allowed')
+        if len(self._valid_headers) < 16:
+            self._valid_headers.add(header)
+
+    def _check_claims(self, claims: Dict[str, Any]):
+        for claim in REQUIRED_FIELDS:
+            if claims.get(claim) is None:
+                raise MissingRequiredClaimError(claim)
+            if not isinstance(claims[claim], str):
+                raise TokenValidationError(f'The {claim} claim must be a string')
+
+        # Same order and truncation to an integer as PyJWT, but booleans are rejected
+        now = time()
+        if 'iat' in claims:
+            iat = _integer_claim(claims, 'iat', InvalidIssuedAtError)
+            if iat > now + self.leeway:
+                raise ImmatureSignatureError('The token is not yet valid (iat)')
+        if 'nbf' in claims:
+            if _integer_claim(claims, 'nbf', DecodeError) > now + self.leeway:
+                raise ImmatureSignatureError('The token is not yet valid (nbf)')
+        if 'exp' in claims:
+            if _integer_claim(claims, 'exp', DecodeError) <= now - self.leeway:
+                raise ExpiredSignatureError('Signature has expired')
+
+        audience = claims.get('aud')
+        if audience is None:
+            raise MissingRequiredClaimError('aud')
+        if isinstance(audience, str):
+            audience = [audience]
+        if not isinstance(audience, list) or not all(isinstance(aud, str) for aud in audience):
+            raise InvalidAudienceError('Invalid claim format in token')
+        if self.api_key not in audience:
+            raise InvalidAudienceError("Audience doesn't match")
+
+    @staticmethod
+    def _check_hosts(claims: Dict[str, Any]) -> str:
+        iss = _origin(claims['iss'])
+        try:
+            shop = store_domain(iss)
+        except ValueError as e:
+            raise InvalidIssuerError(f'The domain {iss} is not a valid issuer.') from e
+
+        dest = _origin(claims['dest'])
+        if iss != dest:
+            raise MismatchedHostError(f'The issuer {iss} does not match the destination {dest}')
+        return shop
+
+
+def _integer_claim(claims: Dict[str, Any], claim: str, error: Type[Exception]) -> int:
+    value = claims[claim]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return int(value)
+        except (ValueError, OverflowError):
+            pass
+    raise error(f'The {claim} claim must be an integer')
+
+
+def _b64decode(value: str) -> bytes:
+    try:
+        return urlsafe_b64decode(value + '=' * (-len(value) % 4))
+    except (BinasciiError, ValueError) as e:
+        raise DecodeError('Invalid crypto padding') from e
+
+
+def _origin(url: str) -> str:
+    """Return `scheme://netloc` of the URL, like `urlparse` but without parsing the rest."""
+    scheme, separator, rest = url.partition('://')
+    if not separator:
+        return '://'
+    end = len(rest)
+    for delimiter in '/?#':
+        position = rest.find(delimiter)
+        if position != -1 and position < end:
+            end = position
+    return f'{scheme}://{rest[:end]}'
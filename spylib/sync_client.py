@@ -0,0 +1,213 @@
+"""Synchronous access to the library for code that can't run an event loop.
+
+Calling `asyncio.run` for every call creates a new event loop each time, so the connections
+pooled by `Token.client` can't be reused (they belong to the loop that opened them) and the
+limiters can't coordinate the calls. Instead, a `SyncRunner` runs a single long-lived event loop
+in a background thread, and the calls of all the threads are submitted to it.
+"""
+
+from __future__ import annotations
+
+import os
+from asyncio import (
+    AbstractEventLoop,
+    all_tasks,
+    current_task,
+    gather,
+    get_running_loop,
+    new_event_loop,
+    run_coroutine_threadsafe,
+    set_event_loop,
+)
+from concurrent.futures import TimeoutError
+from threading import Event, Lock, Thread, get_ident
+from typing import Any, Awaitable, Coroutine, Dict, Optional, TypeVar
+from weakref import WeakSet
+
+from .admin_api import Token
+from .utils.rest import Request
+
+T = TypeVar('T')
+
+
+class SyncRunner:
+    """Run coroutines from synchronous code on an event loop living in a background thread.
+
+    The loop is started on the first call and shared by all the calling threads, so the HTTP
+    connections, the concurrency limiter and the other state bound to the loop are shared too.
+
+    The connections pooled by `Token.client` belong to the loop that opened them, so the client
+    must not be shared with another event loop: after `stop`, assign a new `AsyncClient` to
+    `Token.client` before the runner, or another loop, makes calls again.
+    """
+
+    def __init__(self, name: str = 'spylib-sync-runner'):
+        self.name = name
+        self._loop: Optional[AbstractEventLoop] = None
+        self._thread: Optional[Thread] = None
+        self._lock = Lock()
+        _runners.add(self)
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def start(self):
+        """Start the event loop thread, if not already running."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = new_event_loop()
+            started = Event()
+            self._thread = Thread(
+                target=self._run_loop, args=(loop, started), name=self.name, daemon=True
+            )
+            self._thread.start()
+            started.wait()
+            self._loop = loop
+
+    def stop(self):
+        """Cancel the pending calls, stop the event loop and wait for its thread to finish.
+
+        The cancelled calls raise `concurrent.futures.CancelledError` in their callers.
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or thread is None:
+            return
+        run_coroutine_threadsafe(_shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def run(self, awaitable: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Run the coroutine on the event loop and return its result, blocking the caller.
+
+        When the result isn't ready after `timeout` seconds, the coroutine is cancelled and
+        `concurrent.futures.TimeoutError` is raised.
+        """
+        if self._thread is not None and self._thread.ident == get_ident():
+            if isinstance(awaitable, Coroutine):
+                awaitable.close()
+            raise RuntimeError('SyncRunner.run was called from its own event loop, await instead')
+        if self._loop is None:
+            self.start()
+        assert self._loop is not None
+        future = run_coroutine_threadsafe(_as_coroutine(awaitable), self._loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def _reset(self):
+        # The loop thread doesn't exist in a forked child, the next call starts a new one
+        self._lock = Lock()
+        self._loop = self._thread = None
+
+    @staticmethod
+    def _run_loop(loop: AbstractEventLoop, started: Event):
+        set_event_loop(loop)
+        loop.call_soon(started.set)
+        loop.run_forever()
+
+
+async def _as_coroutine(awaitable: Awaitable[T]) -> T:
+    return await awaitable
+
+
+async def _shutdown():
+    """Cancel and wait for the other tasks of the loop, then finalize its async generators."""
+    tasks = [task for task in all_tasks() if task is not current_task()]
+    for task in tasks:
+        task.cancel()
+    await gather(*tasks, return_exceptions=True)
+    await get_running_loop().shutdown_asyncgens()
+
+
+class SyncToken:
+    """Synchronous facade of a token, its calls run on the event loop of a `SyncRunner`.
+
+    ```python
+    token = SyncToken(run(OfflineToken.load(store_name='store-name')))
+    data = token.execute_gql(query='{ shop { name } }')
+    ```
+    """
+
+    def __init__(self, token: Token, runner: Optional[SyncRunner] = None):
+        self.token = token
+        self.runner = runner or get_runner()
+
+    def execute_gql(
+        self,
+        query: str,
+        variables: Dict[str, Any] = {},
+        operation_name: Optional[str] = None,
+        suppress_errors: bool = False,
+        result_type: Any = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        return self.runner.run(
+            self.token.execute_gql(
+                query=query,
+                variables=variables,
+                operation_name=operation_name,
+                suppress_errors=suppress_errors,
+                result_type=result_type,
+            ),
+            timeout=timeout,
+        )
+
+    def execute_rest(
+        self,
+        request: Request,
+        endpoint: str,
+        json: Optional[Dict[str, Any]] = None,
+        debug: str = '',
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        return self.runner.run(
+            self.token.execute_rest(request=request, endpoint=endpoint, json=json, debug=debug),
+            timeout=timeout,
+        )
+
+
+_runners: 'WeakSet[SyncRunner]' = WeakSet()
+_runner: Optional[SyncRunner] = None
+_runner_lock = Lock()
+
+
+def get_runner() -> SyncRunner:
+    """Return the runner shared by the whole process."""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = SyncRunner()
+    return _runner
+
+
+def run(awaitable: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Run any coroutine of the library from synchronous code on the shared runner.
+
+    ```python
+    from spylib.sync_client import run
+    from spylib.webhook import create_http
+
+    run(create_http(offline_token, topic, callback_url))
+    ```
+    """
+    return get_runner().run(awaitable, timeout=timeout)
+
+
+def _reset_after_fork():
+    global _runner, _runner_lock
+    for runner in _runners:
+        runner._reset()
+    _runner = None
+    _runner_lock = Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
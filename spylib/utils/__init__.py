@@ -1,4 +1,4 @@
-from .domain import domain_to_storename, store_domain
+from .domain import Shop, domain_to_storename, store_domain
 from .httpclient import HTTPClient
 from .jwtoken import JWTBaseModel
 from .misc import TimedResult, elapsed_time, get_unique_id, now_epoch
@@ -11,6 +11,7 @@ __all__ = [
     'HTTPClient',
     'domain_to_storename',
     'store_domain',
+    'Shop',
     'Method',
     'GET',
     'POST',
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import logging
+from asyncio import CancelledError, Task, create_task, sleep
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from inspect import isawaitable
+from threading import Lock
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Upper bounds of the buckets of the actual query cost histogram, the last bucket is unbounded
+COST_BUCKETS: Tuple[int, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Key of the calls of the stores and operations seen after the ledger is full
+OTHER = '__other__'
+
+CostKey = Tuple[str, Optional[str]]
+FlushCallback = Callable[[Dict[CostKey, 'CostStats']], Optional[Awaitable]]
+
+
+@dataclass
+class CostStats:
+    """Cost of the GraphQL calls of a store and operation."""
+
+    calls: int = 0
+    """Calls that returned a cost."""
+
+    requested_cost: int = 0
+    """Sum of the costs estimated by Shopify before running the queries."""
+
+    actual_cost: int = 0
+    """Sum of the costs actually consumed by the queries."""
+
+    throttled: int = 0
+    """Calls rejected because the store's budget was exhausted."""
+
+    throttle_time: float = 0.0
+    """Time in seconds spent waiting for the budget to be restored."""
+
+    histogram: List[int] = field(default_factory=lambda: [0] * (len(COST_BUCKETS) + 1))
+    """Number of calls per bucket of actual cost, see `COST_BUCKETS`."""
+
+    def copy(self) -> CostStats:
+        return CostStats(
+            calls=self.calls,
+            requested_cost=self.requested_cost,
+            actual_cost=self.actual_cost,
+            throttled=self.throttled,
+            throttle_time=self.throttle_time,
+            histogram=list(self.histogram),
+        )
+
+
+class CostLedger:
+    """Aggregate the GraphQL cost consumed per store and operation name.
+
+    The ledger only keeps counters and a fixed histogram per store and operation, so its memory
+    is bounded by `max_entries`: the calls of the stores and operations seen once the ledger is
+    full are counted under `(OTHER, None)`.
+
+    With an `on_flush` callback and a `flush_interval`, `start` periodically passes the stats
+    accumulated since the previous flush to the callback, e.g. to export them as metrics.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        on_flush: Optional[FlushCallback] = None,
+        flush_interval: float = 60,
+    ):
+        self.max_entries = max_entries
+        self.on_flush = on_flush
+        self.flush_interval = flush_interval
+        self._stats: Dict[CostKey, CostStats] = {}
+        self._lock = Lock()
+        self._task: Optional[Task] = None
+
+    def record(
+        self,
+        store_name: str,
+        operation_name: Optional[str],
+        requested_cost: Optional[int],
+        actual_cost: Optional[int],
+    ):
+        """Record the cost of a call, as found in the `extensions.cost` of the response."""
+        with self._lock:
+            stats = self._get(store_name, operation_name)
+            stats.calls += 1
+            stats.requested_cost += requested_cost or 0
+            if actual_cost is not None:
+                stats.actual_cost += actual_cost
+                stats.histogram[_bucket(actual_cost)] += 1
+
+    def record_throttle(self, store_name: str, operation_name: Optional[str], wait_time: float):
+        """Record a throttled call and the time waited before retrying it."""
+        with self._lock:
+            stats = self._get(store_name, operation_name)
+            stats.throttled += 1
+            stats.throttle_time += wait_time
+
+    def snapshot(self, reset: bool = False) -> Dict[CostKey, CostStats]:
+        """Return a copy of the stats per store and operation name, and reset them if asked."""
+        with self._lock:
+            if reset:
+                stats, self._stats = self._stats, {}
+                return stats
+            return {key: stats.copy() for key, stats in self._stats.items()}
+
+    async def flush(self) -> Dict[CostKey, CostStats]:
+        """Pass the stats accumulated since the previous flush to the callback and reset them."""
+        stats = self.snapshot(reset=True)
+        if self.on_flush is not None and stats:
+            if isawaitable(result := self.on_flush(stats)):
+                await result
+        return stats
+
+    async def start(self):
+        """Start flushing the stats every `flush_interval` seconds."""
+        if self._task is None:
+            self._task = create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Stop the periodic flush, then flush the remaining stats."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception('Failed to flush the cost ledger')
+
+    def _get(self, store_name: str, operation_name: Optional[str]) -> CostStats:
+        key = (store_name, operation_name)
+        stats = self._stats.get(key)
+        if stats is None:
+            if len(self._stats) >= self.max_entries:
+                key = (OTHER, None)
+                stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = CostStats()
+        return stats
+
+
+def _bucket(cost: int) -> int:
+    return bisect_left(COST_BUCKETS, cost)
@@ -1,17 +1,82 @@
-from re import search
+from __future__ import annotations
 
+from functools import lru_cache
+from re import compile
+from typing import Dict, Optional
 
+# Shops seen by a process are few compared to the calls, the memos keep the most recent ones
+_MEMO_SIZE = 4096
+
+_DOMAIN_PATTERN = compile(r'(https:\/\/)?([^.]+)\.myshopify\.com[\/]?')
+_SHOP_PATTERN = compile(r'^(https:\/\/)?([^.]+)(\.myshopify\.com[\/]?)?$')
+
+
+class Shop:
+    """Identity of a Shopify store with its URLs built once.
+
+    `Shop.from_storename` memoizes the shops of the most recent stores, so their URLs are
+    usually only built once. Shops are equal when their store names are.
+    """
+
+    __slots__ = ('storename', 'domain', 'admin_url', 'oauth_url', '_api_urls', '_graphql_urls')
+
+    def __init__(self, storename: str):
+        self.storename = storename
+        self.domain = f'{storename}.myshopify.com'
+        self.admin_url = f'https://{self.domain}/admin'
+        self.oauth_url = f'{self.admin_url}/oauth/access_token'
+        self._api_urls: Dict[Optional[str], str] = {}
+        self._graphql_urls: Dict[Optional[str], str] = {}
+
+    def __repr__(self) -> str:
+        return f'Shop({self.storename!r})'
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Shop):
+            return NotImplemented
+        return self.storename == other.storename
+
+    def __hash__(self) -> int:
+        return hash(self.storename)
+
+    @classmethod
+    def from_storename(cls, storename: str) -> Shop:
+        return _shop(storename)
+
+    def api_url(self, api_version: Optional[str] = None) -> str:
+        """Base URL of the Admin API, for the given API version or the default one."""
+        url = self._api_urls.get(api_version)
+        if url is None:
+            url = self.admin_url if api_version is None else f'{self.admin_url}/api/{api_version}'
+            self._api_urls[api_version] = url
+        return url
+
+    def graphql_url(self, api_version: Optional[str] = None) -> str:
+        """URL of the GraphQL endpoint, for the given API version or the default one."""
+        url = self._graphql_urls.get(api_version)
+        if url is None:
+            url = self._graphql_urls[api_version] = f'{self.api_url(api_version)}/graphql.json'
+        return url
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def _shop(storename: str) -> Shop:
+    return Shop(storename)
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
 def domain_to_storename(domain: str) -> str:
-    result = search(r'(https:\/\/)?([^.]+)\.myshopify\.com[\/]?', domain)
+    result = _DOMAIN_PATTERN.search(domain)
     if result:
         return result.group(2)
 
     raise ValueError(f'{domain} is not a shopify domain')
 
 
+@lru_cache(maxsize=_MEMO_SIZE)
 def store_domain(shop: str) -> str:
     """Conversion of a shop's subdomain or complete or incomplete url into a complete url."""
-    result = search(r'^(https:\/\/)?([^.]+)(\.myshopify\.com[\/]?)?$', shop.lower())
+    result = _SHOP_PATTERN.search(shop.lower())
     if not result:
         raise ValueError(f'{shop} is not a shopify shop')
 
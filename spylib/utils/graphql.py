@@ -0,0 +1,234 @@
+import re
+from functools import lru_cache
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Generic,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from pydantic import BaseModel, TypeAdapter
+
+_TOKEN_RE = re.compile(
+    r'''
+    (?P<ignored>[\s,\ufeff]+|\#[^\n\r]*)
+    |(?P<block_string>"""(?:\\"""|(?!""")[\s\S])*""")
+    |(?P<string>"(?:\\.|[^"\\\n\r])*")
+    |(?P<spread>\.\.\.)
+    |(?P<name>[_A-Za-z][_0-9A-Za-z]*)
+    |(?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+    |(?P<punctuator>[!$&()\:=@\[\]{|}])
+    ''',
+    re.VERBOSE,
+)
+
+T = TypeVar('T')
+
+OPERATION_TYPES = frozenset(('query', 'mutation', 'subscription'))
+
+
+class _Lexeme(NamedTuple):
+    """A significant token of a document."""
+
+    kind: str
+    value: str
+    start: int
+    end: int
+
+
+class Definition(NamedTuple):
+    """A top level definition of a document: an operation or a fragment."""
+
+    kind: str
+    name: Optional[str]
+    start: int
+    end: int
+    spreads: FrozenSet[str]
+
+
+# The documents are processed once per distinct string: the caches only pay off for documents
+# reused across calls, e.g. module constants. A document built for each call, with values
+# interpolated instead of passed as variables, is tokenized again every time.
+@lru_cache(maxsize=256)
+def tokenize(document: str) -> Optional[Tuple[_Lexeme, ...]]:
+    """Split the document in significant tokens, or return None if it can't be tokenized."""
+    tokens: List[_Lexeme] = []
+    position = 0
+    length = len(document)
+    while position < length:
+        match = _TOKEN_RE.match(document, position)
+        if match is None:
+            return None
+        kind = match.lastgroup or ''
+        if kind != 'ignored':
+            tokens.append(_Lexeme(kind, match.group(), match.start(), match.end()))
+        position = match.end()
+    return tuple(tokens)
+
+
+@lru_cache(maxsize=256)
+def parse_definitions(document: str) -> Optional[Tuple[Definition, ...]]:
+    """Find the operations and fragments defined in the document and the fragments they use."""
+    tokens = tokenize(document)
+    if tokens is None:
+        return None
+
+    definitions: List[Definition] = []
+    index = 0
+    while index < len(tokens):
+        first = tokens[index]
+        kind, name = 'query', None
+        if first.value == 'fragment' or first.value in OPERATION_TYPES:
+            kind = first.value
+            if index + 1 < len(tokens) and tokens[index + 1].kind == 'name':
+                name = tokens[index + 1].value
+        elif first.value != '{':
+            return None
+
+        # The definition ends with the selection set opened outside of any parenthesis, so
+        # object values in variable defaults or directive arguments are skipped
+        braces = parentheses = 0
+        selection_depth: Optional[int] = None
+        spreads = set()
+        while index < len(tokens):
+            token = tokens[index]
+            if token.value == '(':
+                parentheses += 1
+            elif token.value == ')':
+                parentheses -= 1
+            elif token.value == '{':
+                if selection_depth is None and parentheses == 0:
+                    selection_depth = braces
+                braces += 1
+            elif token.value == '}':
+                braces -= 1
+            elif token.kind == 'spread' and index + 1 < len(tokens):
+                following = tokens[index + 1]
+                if following.kind == 'name' and following.value != 'on':
+                    spreads.add(following.value)
+            index += 1
+            if selection_depth is not None and braces == selection_depth:
+                break
+        else:
+            if braces:
+                return None
+
+        definitions.append(Definition(kind, name, first.start, token.end, frozenset(spreads)))
+    return tuple(definitions)
+
+
+@lru_cache(maxsize=256)
+def document_operation_name(document: str) -> Optional[str]:
+    """Return the name of the first operation of the document, or None if it's anonymous."""
+    for definition in parse_definitions(document) or ():
+        if definition.kind != 'fragment':
+            return definition.name
+    return None
+
+
+@lru_cache(maxsize=256)
+def prune_document(document: str, operation_name: str) -> str:
+    """Keep only the named operation and the fragments it uses, directly or transitively.
+
+    The document is only tokenized, not validated. Documents with a single operation, where the
+    operation can't be found or that can't be tokenized are returned unchanged for Shopify to
+    report any error. The result is cached per document, so a document built dynamically for
+    each call is tokenized again on every call.
+    """
+    definitions = parse_definitions(document)
+    if definitions is None:
+        return document
+
+    operations = [definition for definition in definitions if definition.kind != 'fragment']
+    selected = [operation for operation in operations if operation.name == operation_name]
+    if len(operations) <= 1 or len(selected) != 1:
+        return document
+
+    fragments = {
+        definition.name: definition for definition in definitions if definition.kind == 'fragment'
+    }
+    used = set()
+    to_visit = list(selected[0].spreads)
+    while to_visit:
+        name = to_visit.pop()
+        if name in used or name not in fragments:
+            continue
+        used.add(name)
+        to_visit.extend(fragments[name].spreads)
+
+    return '\n\n'.join(
+        document[definition.start : definition.end]
+        for definition in definitions
+        if definition is selected[0] or (definition.kind == 'fragment' and definition.name in used)
+    )
+
+
+_WORD_KINDS = frozenset(('name', 'number'))
+
+
+@lru_cache(maxsize=256)
+def minify_document(document: str) -> str:
+    """Remove the comments and insignificant whitespace and commas from the document.
+
+    A single space is kept only between two names or numbers. Strings are kept as is. Documents
+    that can't be tokenized are returned unchanged.
+    """
+    tokens = tokenize(document)
+    if tokens is None:
+        return document
+
+    parts: List[str] = []
+    previous_kind = ''
+    for token in tokens:
+        if token.kind in _WORD_KINDS and previous_kind in _WORD_KINDS:
+            parts.append(' ')
+        parts.append(token.value)
+        previous_kind = token.kind
+    return ''.join(parts)
+
+
+def elide_nulls(value: Any) -> Any:
+    """Remove the null fields from the variables and the input objects they contain.
+
+    Omitting an optional input field is usually equivalent to sending it as null, but some
+    mutations use an explicit null to clear a value, which is why this isn't done by default.
+    Null items of lists are kept.
+    """
+    if isinstance(value, dict):
+        return {key: elide_nulls(item) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [elide_nulls(item) for item in value]
+    return value
+
+
+class GraphQLResponse(BaseModel, Generic[T]):
+    """Envelope of a GraphQL response with the `data` validated as the result type."""
+
+    data: Optional[T] = None
+    errors: Optional[List[Any]] = None
+    extensions: Optional[Dict[str, Any]] = None
+
+
+def response_adapter(result_type: Any) -> 'TypeAdapter[GraphQLResponse[Any]]':
+    """Return the adapter validating a whole GraphQL response, built once per result type."""
+    return _response_adapter(result_type)
+
+
+def result_adapter(result_type: Any) -> 'TypeAdapter[Any]':
+    """Return the adapter validating the `data` of a GraphQL response, built once per type."""
+    return _result_adapter(result_type)
+
+
+@lru_cache(maxsize=256)
+def _response_adapter(result_type: Any) -> 'TypeAdapter[GraphQLResponse[Any]]':
+    return TypeAdapter(GraphQLResponse[result_type])  # type: ignore[valid-type]
+
+
+@lru_cache(maxsize=256)
+def _result_adapter(result_type: Any) -> 'TypeAdapter[Any]':
+    return TypeAdapter(result_type)
@@ -1,6 +1,16 @@
-from typing import Any
+from importlib.util import find_spec
+from typing import Any, Optional
 
-from httpx import AsyncClient
+from httpx import AsyncClient, Response
+
+from ..exceptions import ShopifyResponseTooLargeError
+
+# Encodings httpx can decode, brotli only when one of the packages httpx decodes it with is there
+ACCEPT_ENCODING = (
+    'gzip, deflate, br'
+    if find_spec('brotli') is not None or find_spec('brotlicffi') is not None
+    else 'gzip, deflate'
+)
 
 
 class HTTPClient(AsyncClient):
@@ -15,3 +25,50 @@ class HTTPClient(AsyncClient):
     async def close(cls):
         # graceful shutdown
         await HTTPClient.__instance.aclose()
+
+
+async def read_limited(response: Response, max_size: int) -> Response:
+    """Read a streamed response, decompressing it chunk by chunk, up to `max_size` bytes.
+
+    The response is rejected from its `Content-Length` when possible, before reading anything.
+    Otherwise the reading stops as soon as the decompressed body exceeds `max_size` bytes, so
+    an oversized response is never buffered whole. The returned response holds the
+    decompressed body.
+    """
+    content_length = _content_length(response)
+    encoded = response.headers.get('Content-Encoding', 'identity') != 'identity'
+    if content_length is not None and not encoded and content_length > max_size:
+        raise ShopifyResponseTooLargeError(
+            f'The response of {response.request.url} is {content_length} bytes, '
+            f'more than the maximum of {max_size} bytes.'
+        )
+
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body += chunk
+        if len(body) > max_size:
+            raise ShopifyResponseTooLargeError(
+                f'The response of {response.request.url} is more than the maximum of '
+                f'{max_size} bytes.'
+            )
+
+    headers = [
+        (name, value)
+        for name, value in response.headers.multi_items()
+        if name not in ('content-encoding', 'content-length')
+    ]
+    return Response(
+        status_code=response.status_code,
+        headers=headers,
+        content=bytes(body),
+        request=response.request,
+        extensions=response.extensions,
+    )
+
+
+def _content_length(response: Response) -> Optional[int]:
+    # A malformed header is ignored, the size is then checked while reading
+    try:
+        return int(response.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
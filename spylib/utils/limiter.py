@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from asyncio import CancelledError, Future, get_running_loop
+from collections import deque
+from dataclasses import dataclass, field, replace
+from time import monotonic
+from typing import Deque, Dict
+
+
+@dataclass
+class ConcurrencyMetrics:
+    """Counters of the calls made to a store through a `ConcurrencyLimiter`."""
+
+    in_flight: int = 0
+    """Calls currently running."""
+
+    waiting: int = 0
+    """Calls currently queued for a free slot."""
+
+    max_waiting: int = 0
+    """Largest number of calls queued at the same time."""
+
+    acquired: int = 0
+    """Calls started, directly or after waiting."""
+
+    queued: int = 0
+    """Calls that had to wait for a free slot."""
+
+    total_wait_time: float = 0.0
+    """Time in seconds spent waiting by all the queued calls."""
+
+    max_wait_time: float = 0.0
+    """Longest time in seconds a call waited."""
+
+
+@dataclass
+class _StoreState:
+    metrics: ConcurrencyMetrics = field(default_factory=ConcurrencyMetrics)
+    waiters: Deque[Future] = field(default_factory=deque)
+
+
+class ConcurrencyLimiter:
+    """Limit the number of calls in flight at the same time for each store.
+
+    Shopify penalizes too many concurrent requests to the same store. Calls above
+    `max_concurrency` for a store wait in a first-in first-out queue until a running call for
+    that store finishes, so a burst is smoothed instead of being throttled. The limiter is meant
+    to be shared by all the tokens of a store, e.g. through the `concurrency_limiter` class
+    variable of `Token`.
+    """
+
+    def __init__(self, max_concurrency: int = 10):
+        if max_concurrency < 1:
+            raise ValueError('The max_concurrency must be positive')
+        self.max_concurrency = max_concurrency
+        self._stores: Dict[str, _StoreState] = {}
+
+    def acquire(self, store_name: str) -> _Slot:
+        """Return an async context manager holding a slot for the store while it's open."""
+        return _Slot(self, store_name)
+
+    def metrics(self, store_name: str) -> ConcurrencyMetrics:
+        """Return a copy of the metrics of the store."""
+        state = self._stores.get(store_name)
+        return replace(state.metrics) if state is not None else ConcurrencyMetrics()
+
+    def snapshot(self) -> Dict[str, ConcurrencyMetrics]:
+        """Return a copy of the metrics of all the stores."""
+        return {store_name: replace(state.metrics) for store_name, state in self._stores.items()}
+
+    async def _acquire(self, store_name: str):
+        state = self._stores.get(store_name)
+        if state is None:
+            state = self._stores[store_name] = _StoreState()
+        metrics = state.metrics
+
+        if metrics.in_flight < self.max_concurrency and not state.waiters:
+            metrics.in_flight += 1
+            metrics.acquired += 1
+            return
+
+        waiter = get_running_loop().create_future()
+        state.waiters.append(waiter)
+        metrics.waiting += 1
+        metrics.queued += 1
+        metrics.max_waiting = max(metrics.max_waiting, metrics.waiting)
+        start = monotonic()
+        try:
+            await waiter
+        except CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation, pass it on
+                self._release(store_name)
+            elif waiter in state.waiters:
+                state.waiters.remove(waiter)
+                metrics.waiting -= 1
+            raise
+
+        wait_time = monotonic() - start
+        metrics.acquired += 1
+        metrics.total_wait_time += wait_time
+        metrics.max_wait_time = max(metrics.max_wait_time, wait_time)
+
+    def _release(self, store_name: str):
+        state = self._stores[store_name]
+        while state.waiters:
+            waiter = state.waiters.popleft()
+            state.metrics.waiting -= 1
+            if not waiter.done():
+                # Hand the slot over to the next call, the number in flight doesn't change
+                waiter.set_result(None)
+                return
+        state.metrics.in_flight -= 1
+
+
+class _Slot:
+    __slots__ = ('_limiter', '_store_name')
+
+    def __init__(self, limiter: ConcurrencyLimiter, store_name: str):
+        self._limiter = limiter
+        self._store_name = store_name
+
+    async def __aenter__(self):
+        await self._limiter._acquire(self._store_name)
+
+    async def __aexit__(self, *exc_info):
+        self._limiter._release(self._store_name)
+
+
+class _Unlimited:
+    async def __aenter__(self):
+        pass
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+UNLIMITED = _Unlimited()
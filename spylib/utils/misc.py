@@ -5,7 +5,7 @@ from typing import Any, List, Type
 
 from pydantic import BaseModel
 
-from .shortuuid import random
+from .shortuuid import generate
 
 
 def now_epoch() -> int:
@@ -13,7 +13,7 @@ def now_epoch() -> int:
 
 
 def get_unique_id() -> str:
-    return random(length=10)
+    return generate(length=10)
 
 
 def parse_scope(v: Any) -> List[str]:
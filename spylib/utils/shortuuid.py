@@ -2,6 +2,9 @@
 # https://github.com/skorokithakis/shortuuid/blob/v1.0.8/shortuuid/main.py
 import binascii
 import os
+from threading import Lock
+from typing import List
+from weakref import WeakSet
 
 ALPHABET = '23456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
 
@@ -26,3 +29,86 @@ def int_to_string(number, alphabet, padding=None):
         remainder = max(padding - len(output), 0)
         output = output + alphabet[0] * remainder
     return output[::-1]
+
+
+class RandomStringGenerator:
+    """Cryptographically-secure random strings drawn from a buffer of entropy.
+
+    Entropy is read from `os.urandom` in chunks of `chunk_size` bytes and each chunk is mapped
+    to the alphabet at once with `bytes.translate`. To keep the characters uniform, the bytes
+    above the largest multiple of the alphabet size are dropped instead of wrapping around.
+    The generated characters are buffered and handed out by slicing.
+
+    The buffer is emptied in forked children, so a child never reuses the entropy of its
+    parent.
+    """
+
+    def __init__(self, alphabet: str = ALPHABET, chunk_size: int = 4096):
+        size = len(alphabet)
+        if not 1 < size <= 256 or not alphabet.isascii():
+            raise ValueError('The alphabet must have between 2 and 256 ASCII characters')
+        limit = 256 - 256 % size
+        self._table = bytes(
+            ord(alphabet[byte % size]) if byte < limit else 0 for byte in range(256)
+        )
+        self._delete = bytes(range(limit, 256))
+        self.chunk_size = chunk_size
+        self._lock = Lock()
+        self._buffer = ''
+        self._position = 0
+        _generators.add(self)
+
+    def generate(self, length: int) -> str:
+        """Generate a random string of the specified length."""
+        with self._lock:
+            end = self._position + length
+            if end > len(self._buffer):
+                self._refill(length)
+                end = length
+            value = self._buffer[self._position : end]
+            self._position = end
+        return value
+
+    def generate_many(self, count: int, length: int) -> List[str]:
+        """Generate `count` random strings of the specified length."""
+        data = self.generate(count * length)
+        return [data[start : start + length] for start in range(0, count * length, length)]
+
+    def _refill(self, length: int):
+        parts = [self._buffer[self._position :]]
+        available = len(parts[0])
+        while available < length:
+            chunk = os.urandom(max(self.chunk_size, length - available))
+            part = chunk.translate(self._table, self._delete).decode('ascii')
+            parts.append(part)
+            available += len(part)
+        self._buffer = ''.join(parts)
+        self._position = 0
+
+    def _reset(self):
+        self._lock = Lock()
+        self._buffer = ''
+        self._position = 0
+
+
+_generators: 'WeakSet[RandomStringGenerator]' = WeakSet()
+
+
+def _reset_generators():
+    for generator in _generators:
+        generator._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_generators)
+
+_generator = RandomStringGenerator()
+
+
+def generate(length: int) -> str:
+    """Generate a cryptographically-secure short random string from the shared buffer."""
+    return _generator.generate(length)
+
+
+def generate_many(count: int, length: int) -> List[str]:
+    return _generator.generate_many(count, length)
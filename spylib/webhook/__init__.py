@@ -1,13 +1,43 @@
 from enum import Enum
-from typing import List, Optional, Union
+from typing import List, Optional, Sequence, Union
 
 from pydantic import BaseModel
 
 from spylib.admin_api import OfflineTokenABC
-from spylib.constants import UTF8ENCODING
 from spylib.exceptions import ShopifyGQLError, ShopifyGQLUserError
-from spylib.hmac import validate as validate_hmac
+from spylib.hmac import get_verifier
+from spylib.webhook.deduplication import MemoryWebhookDeduplicator, WebhookDeduplicator
+from spylib.webhook.events import WebhookEvent
 from spylib.webhook.graphql_queries import WEBHOOK_CREATE_GQL
+from spylib.webhook.reconciliation import (
+    WebhookReconciliationReport,
+    WebhookReconciliationSummary,
+    WebhookSubscription,
+    list_subscriptions,
+    plan_reconciliation,
+    reconcile,
+    reconcile_many,
+)
+
+__all__ = [
+    'WebhookTopic',
+    'WebhookResponse',
+    'WebhookCreate',
+    'WebhookEvent',
+    'WebhookDeduplicator',
+    'MemoryWebhookDeduplicator',
+    'validate',
+    'create_http',
+    'create_event_bridge',
+    'create_pub_sub',
+    'WebhookSubscription',
+    'WebhookReconciliationReport',
+    'WebhookReconciliationSummary',
+    'list_subscriptions',
+    'plan_reconciliation',
+    'reconcile',
+    'reconcile_many',
+]
 
 
 class WebhookTopic(Enum):
@@ -24,19 +54,22 @@ class WebhookCreate(Enum):
     PUB_SUB = 'pubSubWebhookSubscriptionCreate'
 
 
-def validate(data: Union[str, bytes], hmac_header: str, api_secret_key: str) -> bool:
-    data_str: str
-    if isinstance(data, bytes):
-        data_str = data.decode(UTF8ENCODING)
-    else:
-        data_str = data
-    try:
-        validate_hmac(
-            secret=api_secret_key, sent_hmac=hmac_header, message=data_str, use_base64=True
-        )
-    except ValueError:
-        return False
-    return True
+def validate(
+    data: Union[str, bytes],
+    hmac_header: str,
+    api_secret_key: Union[str, Sequence[str]],
+    shop: Optional[str] = None,
+) -> bool:
+    """Check the base64 HMAC sent by Shopify in the webhook header against the raw body.
+
+    Bytes are signed as they are, so the body does not need to be decoded first.
+
+    Pass several secrets in `api_secret_key` while rotating the API secret, and the shop domain
+    in `shop` so the secret that last matched for that shop is tried first.
+    """
+    return get_verifier(api_secret_key).is_valid(
+        sent_hmac=hmac_header, message=data, use_base64=True, key=shop
+    )
 
 
 async def create_http(
@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+from array import array
+from time import monotonic
+from typing import Dict, List, Optional
+
+
+class WebhookDeduplicator(ABC):
+    """Remember the recently delivered webhook ids to detect the duplicates sent by Shopify.
+
+    Shopify delivers webhooks at least once, so the same `X-Shopify-Webhook-Id` can be received
+    several times. Extend this class to share the seen ids between workers, e.g. with Redis
+    `SET webhook_id 1 NX EX window`.
+    """
+
+    @abstractmethod
+    async def seen(self, webhook_id: str) -> bool:
+        """Record the webhook id and return True if it was already recorded."""
+
+    @abstractmethod
+    async def forget(self, webhook_id: str) -> None:
+        """Remove the webhook id, e.g. when the webhook could not be processed."""
+
+
+class MemoryWebhookDeduplicator(WebhookDeduplicator):
+    """In-process deduplicator remembering the ids seen within the last `window` seconds.
+
+    The ids are kept in a fixed-size ring ordered by arrival, next to a hash map for the
+    lookups. Expired ids are dropped from the oldest end of the ring, and when more than
+    `capacity` ids are seen within the window the oldest ones are forgotten early, so memory
+    never grows past `capacity` entries.
+    """
+
+    def __init__(self, window: float = 3600, capacity: int = 100_000):
+        if capacity < 1:
+            raise ValueError('The capacity must be positive')
+        self.window = window
+        self.capacity = capacity
+        self._ring_ids: List[Optional[str]] = [None] * capacity
+        self._ring_expires = array('d', bytes(8 * capacity))
+        self._head = 0
+        self._size = 0
+        self._expires: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    async def seen(self, webhook_id: str) -> bool:
+        now = monotonic()
+        self._purge(now)
+        if webhook_id in self._expires:
+            return True
+
+        if self._size == self.capacity:
+            self._pop_oldest()
+        tail = (self._head + self._size) % self.capacity
+        expires = now + self.window
+        self._ring_ids[tail] = webhook_id
+        self._ring_expires[tail] = expires
+        self._size += 1
+        self._expires[webhook_id] = expires
+        return False
+
+    async def forget(self, webhook_id: str) -> None:
+        # The ring slot is left to expire, _pop_oldest ignores it once the id is gone
+        self._expires.pop(webhook_id, None)
+
+    def _purge(self, now: float):
+        while self._size and self._ring_expires[self._head] <= now:
+            self._pop_oldest()
+
+    def _pop_oldest(self):
+        webhook_id = self._ring_ids[self._head]
+        # Only drop the id if it wasn't forgotten then seen again in a newer slot
+        if webhook_id is not None and (
+            self._expires.get(webhook_id) == self._ring_expires[self._head]
+        ):
+            del self._expires[webhook_id]
+        self._ring_ids[self._head] = None
+        self._head = (self._head + 1) % self.capacity
+        self._size -= 1
@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+from json import loads
+from typing import Any, Mapping, Optional
+
+SHOPIFY_WEBHOOK_HMAC_HEADER = 'X-Shopify-Hmac-SHA256'
+SHOPIFY_WEBHOOK_SHOP_HEADER = 'X-Shopify-Shop-Domain'
+SHOPIFY_WEBHOOK_TOPIC_HEADER = 'X-Shopify-Topic'
+SHOPIFY_WEBHOOK_ID_HEADER = 'X-Shopify-Webhook-Id'
+SHOPIFY_WEBHOOK_API_VERSION_HEADER = 'X-Shopify-API-Version'
+SHOPIFY_WEBHOOK_TRIGGERED_AT_HEADER = 'X-Shopify-Triggered-At'
+SHOPIFY_WEBHOOK_EVENT_ID_HEADER = 'X-Shopify-Event-Id'
+
+
+@dataclass(frozen=True)
+class WebhookEvent:
+    """A webhook delivered by Shopify, described by its standard `X-Shopify-*` headers.
+
+    The body is kept as raw bytes and only parsed when `json()` is called, so events can be
+    queued or discarded without paying for JSON parsing.
+    """
+
+    topic: str
+    shop_domain: str
+    webhook_id: str
+    body: bytes
+    api_version: Optional[str] = None
+    triggered_at: Optional[str] = None
+    event_id: Optional[str] = None
+
+    @classmethod
+    def from_headers(cls, headers: Mapping[str, str], body: bytes) -> 'WebhookEvent':
+        """Build the event from the request headers.
+
+        `headers` must be case-insensitive, like starlette's `Headers`.
+        """
+        return cls(
+            topic=headers.get(SHOPIFY_WEBHOOK_TOPIC_HEADER, ''),
+            shop_domain=headers.get(SHOPIFY_WEBHOOK_SHOP_HEADER, ''),
+            webhook_id=headers.get(SHOPIFY_WEBHOOK_ID_HEADER, ''),
+            body=body,
+            api_version=headers.get(SHOPIFY_WEBHOOK_API_VERSION_HEADER),
+            triggered_at=headers.get(SHOPIFY_WEBHOOK_TRIGGERED_AT_HEADER),
+            event_id=headers.get(SHOPIFY_WEBHOOK_EVENT_ID_HEADER),
+        )
+
+    def json(self) -> Any:
+        return loads(self.body)
@@ -54,3 +54,36 @@ fragment WebhookSubscription on WebhookSubscription {
   }
 }
 """
+
+WEBHOOK_LIST_GQL = """
+query webhookSubscriptions($first: Int!, $after: String) {
+  webhookSubscriptions(first: $first, after: $after) {
+    edges {
+      node {
+        id
+        topic
+        includeFields
+        metafieldNamespaces
+        filter
+        endpoint {
+          __typename
+          ... on WebhookHttpEndpoint {
+            callbackUrl
+          }
+          ... on WebhookEventBridgeEndpoint {
+            arn
+          }
+          ... on WebhookPubSubEndpoint {
+            pubSubProject
+            pubSubTopic
+          }
+        }
+      }
+    }
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+  }
+}
+"""
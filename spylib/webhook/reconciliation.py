@@ -0,0 +1,363 @@
+from asyncio import Semaphore, gather
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, model_validator
+
+from spylib.admin_api import OfflineTokenABC
+from spylib.webhook.graphql_queries import WEBHOOK_LIST_GQL
+
+LIST_PAGE_SIZE = 100
+MUTATION_BATCH_SIZE = 10
+
+
+class EndpointType(Enum):
+    HTTP = 'WebhookHttpEndpoint'
+    EVENT_BRIDGE = 'WebhookEventBridgeEndpoint'
+    PUB_SUB = 'WebhookPubSubEndpoint'
+
+
+# Mutation and input type names for each endpoint type
+_CREATE = {
+    EndpointType.HTTP: ('webhookSubscriptionCreate', 'WebhookSubscriptionInput'),
+    EndpointType.EVENT_BRIDGE: (
+        'eventBridgeWebhookSubscriptionCreate',
+        'EventBridgeWebhookSubscriptionInput',
+    ),
+    EndpointType.PUB_SUB: ('pubSubWebhookSubscriptionCreate', 'PubSubWebhookSubscriptionInput'),
+}
+_UPDATE = {
+    EndpointType.HTTP: ('webhookSubscriptionUpdate', 'WebhookSubscriptionInput'),
+    EndpointType.EVENT_BRIDGE: (
+        'eventBridgeWebhookSubscriptionUpdate',
+        'EventBridgeWebhookSubscriptionInput',
+    ),
+    EndpointType.PUB_SUB: ('pubSubWebhookSubscriptionUpdate', 'PubSubWebhookSubscriptionInput'),
+}
+
+
+class WebhookSubscription(BaseModel):
+    """A webhook subscription, either desired or existing in a store.
+
+    Exactly one endpoint must be set: `callback_url`, `arn` or `pub_sub_project` with
+    `pub_sub_topic`.
+    """
+
+    topic: str
+    callback_url: Optional[str] = None
+    arn: Optional[str] = None
+    pub_sub_project: Optional[str] = None
+    pub_sub_topic: Optional[str] = None
+    include_fields: Optional[List[str]] = None
+    metafield_namespaces: Optional[List[str]] = None
+    filter: Optional[str] = None
+    id: Optional[str] = None
+
+    @model_validator(mode='after')
+    def check_endpoint(self):
+        endpoints = [
+            self.callback_url is not None,
+            self.arn is not None,
+            self.pub_sub_project is not None or self.pub_sub_topic is not None,
+        ]
+        if sum(endpoints) != 1:
+            raise ValueError('Exactly one webhook endpoint must be defined')
+        return self
+
+    @property
+    def endpoint_type(self) -> EndpointType:
+        if self.callback_url is not None:
+            return EndpointType.HTTP
+        if self.arn is not None:
+            return EndpointType.EVENT_BRIDGE
+        return EndpointType.PUB_SUB
+
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        """Identify the subscription by its topic and endpoint."""
+        return (
+            self.topic,
+            self.callback_url,
+            self.arn,
+            self.pub_sub_project,
+            self.pub_sub_topic,
+        )
+
+    @property
+    def settings(self) -> Tuple[Any, ...]:
+        """The settings that can be updated without changing the subscription key."""
+        return (
+            tuple(sorted(self.include_fields or [])),
+            tuple(sorted(self.metafield_namespaces or [])),
+            self.filter or None,
+        )
+
+    def to_input(self) -> Dict[str, Any]:
+        """Build the subscription input of the create and update mutations."""
+        webhook_input: Dict[str, Any] = {
+            'format': 'JSON',
+            'includeFields': self.include_fields,
+            'metafieldNamespaces': self.metafield_namespaces,
+            'filter': self.filter,
+        }
+        if self.endpoint_type is EndpointType.HTTP:
+            webhook_input['callbackUrl'] = self.callback_url
+        elif self.endpoint_type is EndpointType.EVENT_BRIDGE:
+            webhook_input['arn'] = self.arn
+        else:
+            webhook_input['pubSubProject'] = self.pub_sub_project
+            webhook_input['pubSubTopic'] = self.pub_sub_topic
+        return webhook_input
+
+    @classmethod
+    def from_node(cls, node: Dict[str, Any]) -> 'WebhookSubscription':
+        endpoint = node.get('endpoint') or {}
+        return cls(
+            id=node['id'],
+            topic=node['topic'],
+            callback_url=endpoint.get('callbackUrl'),
+            arn=endpoint.get('arn'),
+            pub_sub_project=endpoint.get('pubSubProject'),
+            pub_sub_topic=endpoint.get('pubSubTopic'),
+            include_fields=node.get('includeFields'),
+            metafield_namespaces=node.get('metafieldNamespaces'),
+            filter=node.get('filter'),
+        )
+
+
+class WebhookReconciliationPlan(BaseModel):
+    create: List[WebhookSubscription] = []
+    update: List[WebhookSubscription] = []
+    delete: List[WebhookSubscription] = []
+    unchanged: List[WebhookSubscription] = []
+
+
+class WebhookReconciliationReport(BaseModel):
+    store_name: str
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    errors: List[str] = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+class WebhookReconciliationSummary(BaseModel):
+    reports: List[WebhookReconciliationReport] = []
+
+    @property
+    def created(self) -> int:
+        return sum(report.created for report in self.reports)
+
+    @property
+    def updated(self) -> int:
+        return sum(report.updated for report in self.reports)
+
+    @property
+    def deleted(self) -> int:
+        return sum(report.deleted for report in self.reports)
+
+    @property
+    def failed(self) -> List[WebhookReconciliationReport]:
+        return [report for report in self.reports if not report.ok]
+
+
+async def list_subscriptions(offline_token: OfflineTokenABC) -> List[WebhookSubscription]:
+    """List all the webhook subscriptions of the store, going through every page."""
+    subscriptions: List[WebhookSubscription] = []
+    after: Optional[str] = None
+    while True:
+        res = await offline_token.execute_gql(
+            query=WEBHOOK_LIST_GQL,
+            variables={'first': LIST_PAGE_SIZE, 'after': after},
+        )
+        connection = res['webhookSubscriptions']
+        subscriptions.extend(
+            WebhookSubscription.from_node(edge['node']) for edge in connection['edges']
+        )
+        if not connection['pageInfo']['hasNextPage']:
+            return subscriptions
+        after = connection['pageInfo']['endCursor']
+
+
+def _unique_desired(desired: Iterable[WebhookSubscription]) -> List[WebhookSubscription]:
+    """Raises `ValueError` if several subscriptions have the same topic and endpoint."""
+    subscriptions = list(desired)
+    keys = set()
+    for subscription in subscriptions:
+        if subscription.key in keys:
+            raise ValueError(
+                f'The webhook subscription to {subscription.topic} is desired more than once'
+            )
+        keys.add(subscription.key)
+    return subscriptions
+
+
+def plan_reconciliation(
+    desired: Iterable[WebhookSubscription],
+    existing: Iterable[WebhookSubscription],
+    delete_extraneous: bool = True,
+) -> WebhookReconciliationPlan:
+    """Compute the changes needed to go from the existing subscriptions to the desired ones.
+
+    Subscriptions are matched by topic and endpoint. A match with different settings is updated.
+    Existing subscriptions that aren't desired, including duplicates, are deleted if
+    `delete_extraneous` is set.
+
+    Raises `ValueError` if several desired subscriptions have the same topic and endpoint, since
+    Shopify would reject the second creation or update.
+    """
+    plan = WebhookReconciliationPlan()
+    existing_by_key: Dict[Tuple[Any, ...], WebhookSubscription] = {}
+    for subscription in existing:
+        if subscription.key in existing_by_key:
+            if delete_extraneous:
+                plan.delete.append(subscription)
+            continue
+        existing_by_key[subscription.key] = subscription
+
+    for subscription in _unique_desired(desired):
+        current = existing_by_key.pop(subscription.key, None)
+        if current is None:
+            plan.create.append(subscription)
+        elif current.settings != subscription.settings:
+            plan.update.append(subscription.model_copy(update={'id': current.id}))
+        else:
+            plan.unchanged.append(current)
+
+    if delete_extraneous:
+        plan.delete.extend(existing_by_key.values())
+    return plan
+
+
+def _batch_mutation(plan: Sequence[Tuple[str, WebhookSubscription]]) -> Tuple[str, Dict[str, Any]]:
+    """Build a single mutation document running every operation under its own alias."""
+    definitions: List[str] = []
+    fields: List[str] = []
+    variables: Dict[str, Any] = {}
+    for index, (action, subscription) in enumerate(plan):
+        if action == 'delete':
+            definitions.append(f'$id{index}: ID!')
+            fields.append(
+                f'op{index}: webhookSubscriptionDelete(id: $id{index}) '
+                '{ deletedWebhookSubscriptionId userErrors { field message } }'
+            )
+            variables[f'id{index}'] = subscription.id
+            continue
+
+        if action == 'create':
+            mutation, input_type = _CREATE[subscription.endpoint_type]
+            definitions.append(f'$topic{index}: WebhookSubscriptionTopic!')
+            arguments = f'topic: $topic{index}'
+            variables[f'topic{index}'] = subscription.topic
+        else:
+            mutation, input_type = _UPDATE[subscription.endpoint_type]
+            definitions.append(f'$id{index}: ID!')
+            arguments = f'id: $id{index}'
+            variables[f'id{index}'] = subscription.id
+        definitions.append(f'$input{index}: {input_type}!')
+        fields.append(
+            f'op{index}: {mutation}({arguments}, webhookSubscription: $input{index}) '
+            '{ webhookSubscription { id } userErrors { field message } }'
+        )
+        variables[f'input{index}'] = subscription.to_input()
+
+    query = (
+        f'mutation reconcileWebhookSubscriptions({", ".join(definitions)}) '
+        f'{{ {" ".join(fields)} }}'
+    )
+    return query, variables
+
+
+async def apply_reconciliation(
+    offline_token: OfflineTokenABC,
+    plan: WebhookReconciliationPlan,
+    batch_size: int = MUTATION_BATCH_SIZE,
+) -> WebhookReconciliationReport:
+    """Run the planned changes using aliased mutations, `batch_size` operations per call."""
+    report = WebhookReconciliationReport(
+        store_name=offline_token.store_name, unchanged=len(plan.unchanged)
+    )
+    operations = (
+        [('delete', subscription) for subscription in plan.delete]
+        + [('update', subscription) for subscription in plan.update]
+        + [('create', subscription) for subscription in plan.create]
+    )
+    for start in range(0, len(operations), batch_size):
+        batch = operations[start : start + batch_size]
+        query, variables = _batch_mutation(batch)
+        res = await offline_token.execute_gql(
+            query=query,
+            variables=variables,
+            operation_name='reconcileWebhookSubscriptions',
+            suppress_errors=True,
+        )
+        for index, (action, subscription) in enumerate(batch):
+            result = res.get(f'op{index}') if res else None
+            if not result:
+                report.errors.append(f'Failed to {action} {subscription.topic} subscription')
+            elif result.get('userErrors'):
+                messages = ', '.join(error['message'] for error in result['userErrors'])
+                report.errors.append(f'Failed to {action} {subscription.topic}: {messages}')
+            elif action == 'delete':
+                report.deleted += 1
+            elif action == 'update':
+                report.updated += 1
+            else:
+                report.created += 1
+    return report
+
+
+async def reconcile(
+    offline_token: OfflineTokenABC,
+    desired: Iterable[WebhookSubscription],
+    delete_extraneous: bool = True,
+    batch_size: int = MUTATION_BATCH_SIZE,
+) -> WebhookReconciliationReport:
+    """Make the webhook subscriptions of the store match the desired ones.
+
+    Lists the existing subscriptions, computes the difference and creates, updates and deletes
+    subscriptions with batched mutations. Raises `ValueError` before listing anything if several
+    desired subscriptions have the same topic and endpoint.
+    """
+    desired = _unique_desired(desired)
+    existing = await list_subscriptions(offline_token)
+    plan = plan_reconciliation(desired, existing, delete_extraneous=delete_extraneous)
+    return await apply_reconciliation(offline_token, plan, batch_size=batch_size)
+
+
+async def reconcile_many(
+    offline_tokens: Iterable[OfflineTokenABC],
+    desired: Iterable[WebhookSubscription],
+    delete_extraneous: bool = True,
+    max_concurrency: int = 10,
+    batch_size: int = MUTATION_BATCH_SIZE,
+) -> WebhookReconciliationSummary:
+    """Reconcile the webhook subscriptions of many stores, at most `max_concurrency` at a time.
+
+    A failing store doesn't stop the others, its error is recorded in its report. Raises
+    `ValueError` before reconciling any store if several desired subscriptions have the same
+    topic and endpoint.
+    """
+    desired = _unique_desired(desired)
+    semaphore = Semaphore(max_concurrency)
+
+    async def reconcile_store(offline_token: OfflineTokenABC) -> WebhookReconciliationReport:
+        async with semaphore:
+            try:
+                return await reconcile(
+                    offline_token,
+                    desired,
+                    delete_extraneous=delete_extraneous,
+                    batch_size=batch_size,
+                )
+            except Exception as e:
+                return WebhookReconciliationReport(
+                    store_name=offline_token.store_name, errors=[repr(e)]
+                )
+
+    reports = await gather(*(reconcile_store(token) for token in offline_tokens))
+    return WebhookReconciliationSummary(reports=list(reports))
@@ -0,0 +1,36 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from spylib.utils.limiter import ConcurrencyLimiter
+
+from ..token_classes import MockHTTPResponse, OfflineToken, test_information
+
+
+@pytest.mark.asyncio
+async def test_graphql_concurrency_limited_per_store(mocker):
+    in_flight = 0
+    peak = 0
+
+    async def request(*args, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return MockHTTPResponse(status_code=200, jsondata={'data': {'shop': {'name': 'test'}}})
+
+    mocker.patch('httpx.AsyncClient.request', new_callable=AsyncMock, side_effect=request)
+    limiter = ConcurrencyLimiter(max_concurrency=4)
+    mocker.patch.object(OfflineToken, 'concurrency_limiter', limiter)
+    # Separate instances of the same store share the limit
+    tokens = [await OfflineToken.load(store_name=test_information.store_name) for _ in range(50)]
+
+    await asyncio.gather(*(token.execute_gql(query='{ shop { name } }') for token in tokens))
+
+    assert peak == 4
+    metrics = limiter.metrics(test_information.store_name)
+    assert metrics.acquired == 50
+    assert metrics.queued == 46
+    assert metrics.in_flight == 0
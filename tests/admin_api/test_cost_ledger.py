@@ -0,0 +1,84 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from spylib.utils.cost_ledger import CostLedger
+
+from ..token_classes import MockHTTPResponse, OfflineToken, test_information
+
+
+def cost(requested, actual, available=1000):
+    return {
+        'cost': {
+            'requestedQueryCost': requested,
+            'actualQueryCost': actual,
+            'throttleStatus': {
+                'maximumAvailable': 1000,
+                'currentlyAvailable': available,
+                'restoreRate': 50,
+            },
+        }
+    }
+
+
+@pytest.mark.asyncio
+async def test_graphql_cost_recorded(mocker):
+    ledger = CostLedger()
+    mocker.patch.object(OfflineToken, 'cost_ledger', ledger)
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        side_effect=[
+            MockHTTPResponse(
+                status_code=200,
+                jsondata={'data': {'shop': {'name': 'test'}}, 'extensions': cost(2, 1)},
+            ),
+            MockHTTPResponse(
+                status_code=200,
+                jsondata={
+                    'errors': [
+                        {'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}},
+                    ],
+                    'extensions': cost(52, None, available=50),
+                },
+            ),
+            MockHTTPResponse(
+                status_code=200,
+                jsondata={'data': {'products': {'nodes': []}}, 'extensions': cost(52, 3)},
+            ),
+        ],
+    )
+    mocker.patch('spylib.admin_api.sleep', new_callable=AsyncMock)
+
+    await token.execute_gql(query='query getShop { shop { name } }')
+    await token.execute_gql(
+        query='query getProducts { products(first: 50) { nodes { id } } }',
+    )
+
+    snapshot = ledger.snapshot()
+    shop = snapshot[(test_information.store_name, 'getShop')]
+    assert (shop.calls, shop.requested_cost, shop.actual_cost) == (1, 2, 1)
+    products = snapshot[(test_information.store_name, 'getProducts')]
+    assert (products.calls, products.requested_cost, products.actual_cost) == (1, 52, 3)
+    assert (products.throttled, products.throttle_time) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_graphql_typed_result_cost_recorded(mocker):
+    ledger = CostLedger()
+    mocker.patch.object(OfflineToken, 'cost_ledger', ledger)
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(
+            status_code=200,
+            jsondata={'data': {'shop': {'name': 'test'}}, 'extensions': cost(2, 1)},
+        ),
+    )
+
+    await token.execute_gql(query='{ shop { name } }', result_type=dict)
+
+    stats = ledger.snapshot()[(test_information.store_name, None)]
+    assert (stats.calls, stats.actual_cost) == (1, 1)
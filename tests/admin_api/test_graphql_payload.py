@@ -0,0 +1,91 @@
+from gzip import decompress
+from json import loads
+from typing import ClassVar, Optional
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ..token_classes import (
+    MockHTTPResponse,
+    OfflineToken,
+    offline_token_data,
+    test_information,
+)
+
+QUERY = '''
+query shop($id: ID) {
+  # The shop name
+  shop {
+    name
+  }
+}
+'''
+GQL_RESPONSE = {'data': {'shop': {'name': 'graphql-admin'}}}
+
+
+class OptimizedToken(OfflineToken):
+    gql_minify: ClassVar[bool] = True
+    gql_elide_null_variables: ClassVar[bool] = True
+    gql_compression_threshold: ClassVar[Optional[int]] = 0
+
+
+def optimized_token() -> OptimizedToken:
+    return OptimizedToken(
+        access_token=offline_token_data.access_token,
+        scope=offline_token_data.scope,
+        store_name=test_information.store_name,
+    )
+
+
+@pytest.mark.asyncio
+async def test_graphql_payload_unchanged_by_default(mocker):
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    shopify_request_mock = mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(status_code=200, jsondata=GQL_RESPONSE),
+    )
+
+    await token.execute_gql(query=QUERY, variables={'id': None})
+
+    kwargs = shopify_request_mock.call_args.kwargs
+    assert kwargs['json'] == {'query': QUERY, 'variables': {'id': None}, 'operationName': None}
+    assert 'Content-Encoding' not in kwargs['headers']
+
+
+@pytest.mark.asyncio
+async def test_graphql_payload_optimized(mocker):
+    token = optimized_token()
+    shopify_request_mock = mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(status_code=200, jsondata=GQL_RESPONSE),
+    )
+
+    jsondata = await token.execute_gql(query=QUERY, variables={'id': None})
+
+    assert jsondata == GQL_RESPONSE['data']
+    kwargs = shopify_request_mock.call_args.kwargs
+    assert kwargs['headers']['Content-Encoding'] == 'gzip'
+    assert loads(decompress(kwargs['content'])) == {
+        'query': 'query shop($id:ID){shop{name}}',
+        'variables': {},
+        'operationName': None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_graphql_payload_below_compression_threshold(mocker):
+    token = optimized_token()
+    mocker.patch.object(OptimizedToken, 'gql_compression_threshold', 10_000)
+    shopify_request_mock = mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(status_code=200, jsondata=GQL_RESPONSE),
+    )
+
+    await token.execute_gql(query=QUERY)
+
+    kwargs = shopify_request_mock.call_args.kwargs
+    assert 'Content-Encoding' not in kwargs['headers']
+    assert loads(kwargs['content'])['query'] == 'query shop($id:ID){shop{name}}'
@@ -0,0 +1,146 @@
+from typing import List, Optional
+from unittest.mock import AsyncMock
+
+import pytest
+from pydantic import BaseModel, ValidationError
+from typing_extensions import TypedDict
+
+from spylib.exceptions import ShopifyGQLError
+from spylib.utils.graphql import response_adapter
+
+from ..token_classes import MockHTTPResponse, OfflineToken, test_information
+
+QUERY = 'query { products(first: 2) { nodes { id title } } }'
+DATA = {
+    'products': {
+        'nodes': [
+            {'id': 'gid://shopify/Product/1', 'title': 'Hat'},
+            {'id': 'gid://shopify/Product/2', 'title': 'Scarf'},
+        ]
+    }
+}
+COST = {
+    'cost': {
+        'requestedQueryCost': 4,
+        'actualQueryCost': 4,
+        'throttleStatus': {
+            'maximumAvailable': 1000,
+            'currentlyAvailable': 996,
+            'restoreRate': 50,
+        },
+    }
+}
+
+
+class Product(BaseModel):
+    id: str
+    title: str
+
+
+class Products(BaseModel):
+    nodes: List[Product]
+
+
+class ProductsQuery(BaseModel):
+    products: Products
+
+
+class ProductsQueryDict(TypedDict):
+    products: dict
+
+
+@pytest.mark.asyncio
+async def test_graphql_result_type_model(mocker):
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(
+            status_code=200, jsondata={'data': DATA, 'extensions': COST}
+        ),
+    )
+    dict_path = mocker.spy(MockHTTPResponse, 'json')
+
+    result = await token.execute_gql(query=QUERY, result_type=ProductsQuery)
+
+    assert isinstance(result, ProductsQuery)
+    assert result == ProductsQuery.model_validate(DATA)
+    # Validated straight from the raw JSON
+    dict_path.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_graphql_result_type_typed_dict(mocker):
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(status_code=200, jsondata={'data': DATA}),
+    )
+
+    result = await token.execute_gql(query=QUERY, result_type=ProductsQueryDict)
+
+    assert result == DATA
+
+
+@pytest.mark.asyncio
+async def test_graphql_result_type_errors(mocker):
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(
+            status_code=200,
+            jsondata={
+                'data': {'products': None},
+                'errors': [{'message': 'Access denied', 'path': ['products']}],
+            },
+        ),
+    )
+
+    with pytest.raises(ShopifyGQLError):
+        await token.execute_gql(query=QUERY, result_type=ProductsQuery)
+
+
+@pytest.mark.asyncio
+async def test_graphql_result_type_suppressed_errors(mocker):
+    class OptionalProductsQuery(BaseModel):
+        products: Optional[Products]
+
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(
+            status_code=200,
+            jsondata={
+                'data': {'products': None},
+                'errors': [{'message': 'Access denied', 'path': ['products']}],
+            },
+        ),
+    )
+
+    result = await token.execute_gql(
+        query=QUERY, result_type=OptionalProductsQuery, suppress_errors=True
+    )
+
+    assert result == OptionalProductsQuery(products=None)
+
+
+@pytest.mark.asyncio
+async def test_graphql_result_type_mismatch(mocker):
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(
+            status_code=200, jsondata={'data': {'products': {'nodes': [{'id': 1}]}}}
+        ),
+    )
+
+    with pytest.raises(ValidationError):
+        await token.execute_gql(query=QUERY, result_type=ProductsQuery)
+
+
+def test_response_adapter_cached():
+    assert response_adapter(ProductsQuery) is response_adapter(ProductsQuery)
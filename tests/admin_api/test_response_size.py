@@ -0,0 +1,109 @@
+import gzip
+import json
+from importlib.util import find_spec
+
+import pytest
+from httpx import ByteStream, Request, Response
+from respx import MockRouter
+
+from spylib.exceptions import ShopifyResponseTooLargeError
+from spylib.utils.httpclient import ACCEPT_ENCODING, read_limited
+from spylib.utils.rest import GET
+
+from ..token_classes import OfflineToken, test_information
+
+DATA = {'products': {'nodes': [{'id': f'gid://shopify/Product/{i}'} for i in range(100)]}}
+BODY = json.dumps({'data': DATA}).encode('utf-8')
+GRAPHQL_URL = r'.*/graphql\.json'
+
+
+@pytest.fixture
+def max_response_size(mocker):
+    def set_size(size):
+        mocker.patch.object(OfflineToken, 'max_response_size', size)
+
+    return set_size
+
+
+@pytest.mark.asyncio
+async def test_graphql_gzip_response_within_limit(respx_mock: MockRouter, max_response_size):
+    max_response_size(len(BODY))
+    route = respx_mock.post(url__regex=GRAPHQL_URL).respond(
+        content=gzip.compress(BODY), headers={'Content-Encoding': 'gzip'}
+    )
+    token = await OfflineToken.load(store_name=test_information.store_name)
+
+    assert await token.execute_gql(query='{ products { nodes { id } } }') == DATA
+    assert 'gzip' in route.calls.last.request.headers['Accept-Encoding']
+
+
+@pytest.mark.asyncio
+async def test_graphql_response_too_large(respx_mock: MockRouter, max_response_size):
+    max_response_size(len(BODY) - 1)
+    route = respx_mock.post(url__regex=GRAPHQL_URL).respond(content=BODY)
+    token = await OfflineToken.load(store_name=test_information.store_name)
+
+    with pytest.raises(ShopifyResponseTooLargeError, match=f'{len(BODY)} bytes'):
+        await token.execute_gql(query='{ products { nodes { id } } }')
+    # Not retried
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_graphql_compressed_response_too_large(respx_mock: MockRouter, max_response_size):
+    max_response_size(1000)
+    respx_mock.post(url__regex=GRAPHQL_URL).respond(
+        content=gzip.compress(BODY), headers={'Content-Encoding': 'gzip'}
+    )
+    token = await OfflineToken.load(store_name=test_information.store_name)
+
+    with pytest.raises(ShopifyResponseTooLargeError, match='more than the maximum of 1000'):
+        await token.execute_gql(query='{ products { nodes { id } } }')
+
+
+@pytest.mark.asyncio
+async def test_rest_response_size(respx_mock: MockRouter, max_response_size):
+    max_response_size(1000)
+    route = respx_mock.get(url__regex=r'.*/shop\.json')
+    route.side_effect = [
+        Response(
+            200,
+            json={'shop': {'id': 1}},
+            headers={'X-Shopify-Shop-Api-Call-Limit': '1/40'},
+        ),
+        Response(
+            200,
+            json={'shop': {'name': 'x' * 1000}},
+            headers={'X-Shopify-Shop-Api-Call-Limit': '2/40'},
+        ),
+    ]
+    token = await OfflineToken.load(store_name=test_information.store_name)
+
+    assert await token.execute_rest(request=GET, endpoint='/shop.json') == {'shop': {'id': 1}}
+    with pytest.raises(ShopifyResponseTooLargeError):
+        await token.execute_rest(request=GET, endpoint='/shop.json')
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_read_limited_malformed_content_length():
+    def response():
+        return Response(
+            200,
+            headers={'Content-Length': 'not-a-number'},
+            stream=ByteStream(BODY),
+            request=Request('GET', 'https://test-store.myshopify.com/admin/shop.json'),
+        )
+
+    limited = await read_limited(response(), len(BODY))
+    assert limited.content == BODY
+    with pytest.raises(ShopifyResponseTooLargeError, match='more than the maximum'):
+        await read_limited(response(), len(BODY) - 1)
+
+
+def test_accept_encoding():
+    encodings = ACCEPT_ENCODING.split(', ')
+
+    assert encodings[:2] == ['gzip', 'deflate']
+    brotli = find_spec('brotli') is not None or find_spec('brotlicffi') is not None
+    assert ('br' in encodings) == brotli
@@ -1,8 +1,8 @@
-from fastapi import Depends, FastAPI  # type: ignore[import]
+from fastapi import Depends, FastAPI, HTTPException  # type: ignore[import]
 from fastapi.testclient import TestClient  # type: ignore[import]
 from pytest import fixture
 
-from spylib.fastapi_extensions import authenticate_webhook_hmac
+from spylib.fastapi_extensions import authenticate_webhook_hmac, webhook_deduplication
 
 app = FastAPI()
 
@@ -16,3 +16,19 @@ def authenticate(hmac: bool = Depends(authenticate_webhook_hmac)):
 def client():
     with TestClient(app) as client:
         yield client
+
+
+@app.post('/webhook_deduplication')
+def deduplicate(is_first_delivery: bool = Depends(webhook_deduplication)):
+    return is_first_delivery
+
+
+failing_deliveries = {'count': 1}
+
+
+@app.post('/webhook_deduplication_failing')
+def deduplicate_failing(is_first_delivery: bool = Depends(webhook_deduplication)):
+    if is_first_delivery and failing_deliveries['count']:
+        failing_deliveries['count'] -= 1
+        raise HTTPException(status_code=500, detail='Processing failed')
+    return is_first_delivery
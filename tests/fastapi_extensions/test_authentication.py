@@ -1,4 +1,4 @@
-from spylib.fastapi_extensions import webhook_hmac
+from spylib.fastapi_extensions import webhook_deduplication, webhook_hmac
 
 API_SECRET = 'secret'
 MESSAGE = 'message'
@@ -27,3 +27,55 @@ def test_webhook_hmac_invalid(client):
     )
     assert response.status_code == 401
     assert response.json() == {'detail': 'Webhook HMAC authentication failed'}
+
+
+def test_webhook_hmac_valid_rotating_secrets(client):
+    webhook_hmac.api_secret_key = ['new_secret', API_SECRET]
+    response = client.post(
+        '/webhook_hmac',
+        headers={
+            'X-Shopify-Hmac-Sha256': VALID_HMAC,
+            'X-Shopify-Shop-Domain': 'test.myshopify.com',
+        },
+        data=MESSAGE,
+    )
+    assert response.status_code == 200
+
+
+def test_webhook_deduplication(client):
+    webhook_hmac.api_secret_key = API_SECRET
+    headers = {'X-Shopify-Hmac-Sha256': VALID_HMAC, 'X-Shopify-Webhook-Id': 'webhook-dedup-1'}
+
+    response = client.post('/webhook_deduplication', headers=headers, data=MESSAGE)
+    assert response.status_code == 200
+    assert response.json() is True
+
+    response = client.post('/webhook_deduplication', headers=headers, data=MESSAGE)
+    assert response.status_code == 200
+    assert response.json() is False
+
+
+def test_webhook_deduplication_invalid_hmac(client):
+    webhook_hmac.api_secret_key = API_SECRET
+    headers = {'X-Shopify-Hmac-Sha256': INVALID_HMAC, 'X-Shopify-Webhook-Id': 'webhook-dedup-2'}
+
+    response = client.post('/webhook_deduplication', headers=headers, data=MESSAGE)
+    assert response.status_code == 401
+    assert not webhook_deduplication.deduplicator._expires.get('webhook-dedup-2')
+
+
+def test_webhook_deduplication_handler_failure(client):
+    webhook_hmac.api_secret_key = API_SECRET
+    headers = {'X-Shopify-Hmac-Sha256': VALID_HMAC, 'X-Shopify-Webhook-Id': 'webhook-dedup-3'}
+
+    response = client.post('/webhook_deduplication_failing', headers=headers, data=MESSAGE)
+    assert response.status_code == 500
+
+    # The retry of Shopify is processed
+    response = client.post('/webhook_deduplication_failing', headers=headers, data=MESSAGE)
+    assert response.status_code == 200
+    assert response.json() is True
+
+    response = client.post('/webhook_deduplication_failing', headers=headers, data=MESSAGE)
+    assert response.status_code == 200
+    assert response.json() is False
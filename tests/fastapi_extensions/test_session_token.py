@@ -0,0 +1,91 @@
+from time import time
+
+import jwt
+from fastapi import Depends, FastAPI  # type: ignore[import]
+from fastapi.testclient import TestClient  # type: ignore[import]
+from pytest import fixture, raises
+
+from spylib.fastapi_extensions import SessionTokenMiddleware, authenticate_session_token
+from spylib.session_token import SessionTokenVerifier, VerifiedSessionToken
+
+API_KEY = 'API_KEY'
+API_SECRET = 'API_SECRET'
+
+
+def generate_auth_header(**claims) -> str:
+    now = time()
+    payload = {
+        'iss': 'https://test.myshopify.com/admin',
+        'dest': 'https://test.myshopify.com',
+        'aud': API_KEY,
+        'sub': '1',
+        'exp': now + 60,
+        'nbf': now - 60,
+        'iat': now,
+        'jti': '3512a085-ee9a-4914-b252-3aabcd1ada14',
+        'sid': 'abc123',
+        **claims,
+    }
+    return f'Bearer {jwt.encode(payload, API_SECRET, algorithm="HS256")}'
+
+
+@fixture()
+def client():
+    app = FastAPI()
+    app.add_middleware(
+        SessionTokenMiddleware, api_key=API_KEY, secret=API_SECRET, exclude_paths=['/public']
+    )
+
+    def shop(session_token: VerifiedSessionToken = Depends(authenticate_session_token)) -> str:
+        return session_token.shop
+
+    @app.get('/shop')
+    def get_shop(
+        shop: str = Depends(shop),
+        session_token: VerifiedSessionToken = Depends(authenticate_session_token),
+    ):
+        return {'shop': shop, 'sub': session_token.sub}
+
+    @app.get('/public/health')
+    def health():
+        return 'OK'
+
+    @app.get('/public/shop')
+    def public_shop(session_token: VerifiedSessionToken = Depends(authenticate_session_token)):
+        return session_token.shop
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_session_token_middleware(client, mocker):
+    # Decoded once even if several dependencies need it
+    verify = mocker.spy(SessionTokenVerifier, 'from_header')
+    response = client.get('/shop', headers={'Authorization': generate_auth_header()})
+
+    assert response.status_code == 200
+    assert response.json() == {'shop': 'test.myshopify.com', 'sub': '1'}
+    assert verify.call_count == 1
+
+
+def test_session_token_middleware_rejects_before_routing(client):
+    response = client.get('/shop', headers={'Authorization': generate_auth_header(aud='other')})
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Session token authentication failed'}
+
+    response = client.get('/unknown')
+    assert response.status_code == 401
+
+
+def test_session_token_middleware_excluded_paths(client):
+    assert client.get('/public/health').status_code == 200
+    assert client.options('/shop').status_code != 401
+    # The dependency still requires a session token
+    assert client.get('/public/shop').status_code == 401
+
+
+def test_session_token_middleware_requires_credentials():
+    app = FastAPI()
+    app.add_middleware(SessionTokenMiddleware)
+    with raises(ValueError):
+        TestClient(app).get('/')
@@ -0,0 +1,150 @@
+import threading
+from asyncio import Event, sleep
+
+import pytest
+from fastapi import FastAPI  # type: ignore[import]
+from httpx import AsyncClient
+
+from spylib.fastapi_extensions import WebhookIngestion
+from spylib.webhook import MemoryWebhookDeduplicator, WebhookEvent
+
+API_SECRET = 'secret'
+MESSAGE = '{"id": 1}'
+VALID_HMAC = 'HmaC4Bw8oKa+/A6Wm3oTLEyqJmv+tDIzcqPNO7NS3Do='
+HEADERS = {
+    'X-Shopify-Hmac-Sha256': VALID_HMAC,
+    'X-Shopify-Topic': 'orders/create',
+    'X-Shopify-Shop-Domain': 'test.myshopify.com',
+    'X-Shopify-Webhook-Id': 'b54557e4-bdd9-4b37-8a5f-bf7d70bcd043',
+    'X-Shopify-API-Version': '2023-04',
+}
+
+
+def make_client(ingestion: WebhookIngestion) -> AsyncClient:
+    app = FastAPI()
+    app.include_router(ingestion.router)
+    return AsyncClient(app=app, base_url='http://test')
+
+
+@pytest.mark.asyncio
+async def test_webhook_ingestion_processes_in_background():
+    events = []
+    ingestion = WebhookIngestion(api_secret_key=API_SECRET, handler=events.append)
+
+    async with make_client(ingestion) as client:
+        response = await client.post('/webhooks', headers=HEADERS, content=MESSAGE)
+    assert response.status_code == 200
+
+    await ingestion.stop()
+    assert events == [
+        WebhookEvent(
+            topic='orders/create',
+            shop_domain='test.myshopify.com',
+            webhook_id='b54557e4-bdd9-4b37-8a5f-bf7d70bcd043',
+            api_version='2023-04',
+            body=MESSAGE.encode(),
+        )
+    ]
+    assert events[0].json() == {'id': 1}
+
+
+@pytest.mark.asyncio
+async def test_webhook_ingestion_invalid_hmac():
+    events = []
+    ingestion = WebhookIngestion(api_secret_key=API_SECRET, handler=events.append)
+
+    async with make_client(ingestion) as client:
+        response = await client.post(
+            '/webhooks', headers={**HEADERS, 'X-Shopify-Hmac-Sha256': 'hmac'}, content=MESSAGE
+        )
+    assert response.status_code == 401
+    assert events == []
+
+
+@pytest.mark.asyncio
+async def test_webhook_ingestion_backpressure():
+    started = Event()
+    release = Event()
+    processed = []
+
+    async def handler(event: WebhookEvent):
+        started.set()
+        await release.wait()
+        processed.append(event)
+
+    ingestion = WebhookIngestion(
+        api_secret_key=API_SECRET, handler=handler, queue_size=1, workers=1, retry_after=7
+    )
+
+    async with make_client(ingestion) as client:
+        response = await client.post('/webhooks', headers=HEADERS, content=MESSAGE)
+        statuses = [response.status_code]
+        await started.wait()
+        for _ in range(3):
+            response = await client.post('/webhooks', headers=HEADERS, content=MESSAGE)
+            statuses.append(response.status_code)
+
+    # One event is being processed, one is queued, the others are rejected
+    assert statuses == [200, 200, 503, 503]
+    assert response.headers['Retry-After'] == '7'
+
+    release.set()
+    await ingestion.stop()
+    assert len(processed) == 2
+
+
+@pytest.mark.asyncio
+async def test_webhook_ingestion_handler_error_does_not_stop_workers():
+    processed = []
+
+    def handler(event: WebhookEvent):
+        processed.append(event)
+        raise ValueError('boom')
+
+    ingestion = WebhookIngestion(api_secret_key=API_SECRET, handler=handler, workers=1)
+
+    async with make_client(ingestion) as client:
+        for _ in range(2):
+            await client.post('/webhooks', headers=HEADERS, content=MESSAGE)
+
+    await ingestion.stop()
+    assert len(processed) == 2
+
+
+@pytest.mark.asyncio
+async def test_webhook_ingestion_sync_handler_does_not_block_the_loop():
+    release = threading.Event()
+    calls = []
+
+    def handler(event: WebhookEvent):
+        calls.append((threading.get_ident(), release.wait(timeout=5)))
+
+    ingestion = WebhookIngestion(api_secret_key=API_SECRET, handler=handler, workers=1)
+
+    async with make_client(ingestion) as client:
+        await client.post('/webhooks', headers=HEADERS, content=MESSAGE)
+        await sleep(0.01)
+        # Acknowledged while the handler is still blocked
+        response = await client.post('/webhooks', headers=HEADERS, content=MESSAGE)
+        assert response.status_code == 200
+        release.set()
+
+    await ingestion.stop()
+    assert calls == [(calls[0][0], True)] * 2
+    assert calls[0][0] != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_webhook_ingestion_deduplication():
+    events = []
+    ingestion = WebhookIngestion(
+        api_secret_key=API_SECRET, handler=events.append, deduplicator=MemoryWebhookDeduplicator()
+    )
+
+    async with make_client(ingestion) as client:
+        for _ in range(3):
+            response = await client.post('/webhooks', headers=HEADERS, content=MESSAGE)
+            assert response.status_code == 200
+
+    await ingestion.stop()
+    assert len(events) == 1
@@ -175,6 +175,54 @@ async def test_oauth_with_fastapi(mocker):
     TEST_DATA.post_login.assert_called_with('test', OnlineTokenModel(**ONLINETOKEN_DATA))
 
 
+@pytest.mark.asyncio
+async def test_oauth_callback_replay(mocker):
+    if 'fastapi' not in modules and util.find_spec('fastapi') is None:
+        pytest.skip('fastapi not installed')
+
+    from fastapi import FastAPI  # type: ignore[import]
+    from fastapi.testclient import TestClient  # type: ignore[import]
+
+    from spylib.oauth import MemoryNonceStore
+    from spylib.oauth.fastapi import init_oauth_router
+
+    nonce_store = MemoryNonceStore()
+    app = FastAPI()
+    app.include_router(
+        init_oauth_router(**{**TEST_DATA, 'post_login': None}, nonce_store=nonce_store)
+    )
+    client = TestClient(app)
+
+    response = client.get('/shopify/auth', params=dict(shop=TEST_STORE), follow_redirects=False)
+    query = check_oauth_redirect_url(
+        response=response, client=client, path='/admin/oauth/authorize', scope=[]
+    )
+    state = check_oauth_redirect_query(query=query, scope=TEST_DATA.app_scopes)
+    assert len(nonce_store) == 1
+
+    shopify_request_mock = mocker.patch('httpx.AsyncClient.request', new_callable=AsyncMock)
+    shopify_request_mock.return_value = MockHTTPResponse(
+        status_code=200, jsondata=OFFLINETOKEN_DATA
+    )
+
+    query_str = urlencode(
+        dict(shop=TEST_STORE, state=state, timestamp=now_epoch(), code='INSTALLCODE')
+    )
+    query_str += '&hmac=' + hmac.calculate_from_message(
+        secret=SHOPIFY_SECRET_KEY, message=query_str
+    )
+
+    response = client.get('/callback', params=query_str, follow_redirects=False)
+    assert response.status_code == 307
+    assert len(nonce_store) == 0
+
+    # Replaying the same callback is rejected before exchanging the code again
+    response = client.get('/callback', params=query_str, follow_redirects=False)
+    assert response.status_code == 400
+    assert 'already used' in response.json()['detail']
+    shopify_request_mock.assert_awaited_once()
+
+
 def check_oauth_redirect_url(response: Response, client, path: str, scope: List[str]) -> str:
     print(response.text)
     assert response.status_code == 307
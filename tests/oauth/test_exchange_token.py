@@ -1,7 +1,17 @@
+from unittest.mock import AsyncMock
+
 import pytest
+from httpx import AsyncClient, ConnectError, ReadTimeout, Response
 from respx import MockRouter
+from tenacity.wait import wait_none
 
+from spylib.admin_api import Token
+from spylib.constants import API_CALL_NUMBER_RETRY_ATTEMPTS
+from spylib.exceptions import ShopifyCallInvalidError, ShopifyIntermittentError
 from spylib.oauth import OfflineTokenModel, OnlineTokenModel, exchange_token
+from spylib.oauth.exchange_token import request_access_token
+
+from ..token_classes import MockHTTPResponse
 
 exchange_token_params = [
     (
@@ -59,3 +69,104 @@ async def test_exchange_token(respx_mock: MockRouter, token_dict, token_model):
     )
 
     assert result == token_model.model_validate(token_dict)
+
+
+@pytest.fixture
+def no_retry_wait(mocker):
+    mocker.patch.object(request_access_token.retry, 'wait', wait_none())
+
+
+@pytest.mark.asyncio
+async def test_exchange_token_retries_intermittent_errors(respx_mock: MockRouter, no_retry_wait):
+    shop = 'example.myshopify.com'
+    token_dict, token_model = exchange_token_params[0]
+
+    route = respx_mock.post(f'https://{shop}/admin/oauth/access_token')
+    route.side_effect = [
+        Response(502),
+        ConnectError('Connection reset'),
+        Response(200, json=token_dict),
+    ]
+
+    result = await exchange_token(shop=shop, code='code', api_key='key', api_secret_key='secret')
+
+    assert result == token_model.model_validate(token_dict)
+    assert route.call_count == 3
+
+
+@pytest.mark.parametrize('shop', ['Example.myshopify.com', 'shop.example.com'])
+@pytest.mark.asyncio
+async def test_exchange_token_shop_url(respx_mock: MockRouter, shop):
+    token_dict, token_model = exchange_token_params[0]
+    route = respx_mock.post(f'https://{shop}/admin/oauth/access_token').respond(json=token_dict)
+
+    await exchange_token(shop=shop, code='code', api_key='key', api_secret_key='secret')
+
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_exchange_token_read_timeout_not_retried(respx_mock: MockRouter, no_retry_wait):
+    shop = 'example.myshopify.com'
+    route = respx_mock.post(f'https://{shop}/admin/oauth/access_token')
+    route.side_effect = ReadTimeout('Timed out')
+
+    with pytest.raises(ReadTimeout):
+        await exchange_token(shop=shop, code='code', api_key='key', api_secret_key='secret')
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_exchange_token_gives_up_after_retries(respx_mock: MockRouter, no_retry_wait):
+    shop = 'example.myshopify.com'
+    route = respx_mock.post(f'https://{shop}/admin/oauth/access_token').respond(503)
+
+    with pytest.raises(ShopifyIntermittentError):
+        await exchange_token(shop=shop, code='code', api_key='key', api_secret_key='secret')
+
+    assert route.call_count == API_CALL_NUMBER_RETRY_ATTEMPTS
+
+
+@pytest.mark.asyncio
+async def test_exchange_token_rejected(respx_mock: MockRouter):
+    shop = 'example.myshopify.com'
+    route = respx_mock.post(f'https://{shop}/admin/oauth/access_token').respond(400)
+
+    with pytest.raises(ShopifyCallInvalidError, match='Shopify rejected token exchange'):
+        await exchange_token(shop=shop, code='code', api_key='key', api_secret_key='secret')
+
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_exchange_token_uses_shared_client(mocker):
+    token_dict, token_model = exchange_token_params[0]
+    post = mocker.patch.object(
+        Token.client,
+        'post',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(status_code=200, jsondata=token_dict),
+    )
+
+    result = await exchange_token(
+        shop='example.myshopify.com', code='code', api_key='key', api_secret_key='secret'
+    )
+
+    assert result == token_model.model_validate(token_dict)
+    post.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_exchange_token_custom_client(mocker, respx_mock: MockRouter):
+    shop = 'example.myshopify.com'
+    token_dict, token_model = exchange_token_params[0]
+    respx_mock.post(f'https://{shop}/admin/oauth/access_token').respond(json=token_dict)
+    shared_post = mocker.spy(Token.client, 'post')
+
+    async with AsyncClient() as client:
+        result = await exchange_token(
+            shop=shop, code='code', api_key='key', api_secret_key='secret', client=client
+        )
+
+    assert result == token_model.model_validate(token_dict)
+    shared_post.assert_not_called()
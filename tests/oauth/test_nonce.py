@@ -0,0 +1,108 @@
+import pytest
+
+from spylib.oauth import MemoryNonceStore
+from spylib.oauth.tokens import OAuthJWT
+from spylib.oauth.validations import validate_nonce
+
+
+@pytest.fixture
+def clock(mocker):
+    return mocker.patch('spylib.oauth.nonce.monotonic', return_value=1000.0)
+
+
+@pytest.mark.asyncio
+async def test_nonce_consumed_once(clock):
+    store = MemoryNonceStore()
+    await store.add('nonce')
+
+    assert await store.consume('nonce') is True
+    assert await store.consume('nonce') is False
+    assert await store.consume('unknown') is False
+    assert len(store) == 0
+
+
+@pytest.mark.asyncio
+async def test_nonce_expires(clock):
+    store = MemoryNonceStore(lifetime=900)
+    await store.add('old')
+    clock.return_value = 1500.5
+    await store.add('new')
+
+    clock.return_value = 1900.2
+    assert await store.consume('old') is False
+
+    clock.return_value = 2400.0
+    assert len(store) == 1
+    clock.return_value = 2401.0
+    assert await store.consume('new') is False
+    assert len(store) == 0
+
+
+@pytest.mark.asyncio
+async def test_nonce_expired_entries_dropped_without_lookups(clock):
+    store = MemoryNonceStore(lifetime=10)
+    for i in range(100):
+        clock.return_value = 1000.0 + i * 0.1
+        await store.add(f'nonce-{i}')
+
+    clock.return_value = 1015.0
+    await store.add('last')
+    assert len(store) == 51
+
+    clock.return_value = 1021.0
+    await store.add('latest')
+    assert len(store) == 2
+
+
+@pytest.mark.asyncio
+async def test_nonce_issued_again_moves_to_its_new_slot(clock):
+    store = MemoryNonceStore(lifetime=10)
+    await store.add('nonce')
+    clock.return_value = 1005.0
+    await store.add('nonce')
+
+    # Tracked by a single slot of the wheel
+    assert sum(len(slot) for slot in store._wheel) == 1
+
+    clock.return_value = 1011.0
+    await store.add('other')
+    assert await store.consume('nonce') is True
+    await store.add('nonce')
+
+    clock.return_value = 1030.0
+    await store.add('last')
+    assert len(store) == 1
+    assert sum(len(slot) for slot in store._wheel) == 1
+
+
+@pytest.mark.asyncio
+async def test_nonce_capacity(clock):
+    store = MemoryNonceStore(capacity=3)
+    for i in range(5):
+        clock.return_value = 1000.0 + i
+        await store.add(f'nonce-{i}')
+
+    assert len(store) == 3
+    assert await store.consume('nonce-0') is False
+    assert await store.consume('nonce-1') is False
+    assert await store.consume('nonce-4') is True
+
+
+def test_nonce_store_capacity_validation():
+    with pytest.raises(ValueError):
+        MemoryNonceStore(capacity=0)
+
+
+@pytest.mark.asyncio
+async def test_validate_nonce(clock):
+    store = MemoryNonceStore()
+    await store.add('nonce')
+    oauthjwt = OAuthJWT(is_login=False, storename='test', nonce='nonce')
+
+    await validate_nonce(oauthjwt=oauthjwt, nonce_store=store)
+    with pytest.raises(ValueError, match='already used'):
+        await validate_nonce(oauthjwt=oauthjwt, nonce_store=store)
+    with pytest.raises(ValueError, match='already used'):
+        await validate_nonce(
+            oauthjwt=OAuthJWT(is_login=False, storename='test'), nonce_store=store
+        )
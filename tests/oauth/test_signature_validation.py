@@ -1,3 +1,6 @@
+from json import dumps
+from urllib.parse import parse_qsl, urlencode
+
 import pytest
 
 # Initially tested with real data generated by Shopify and
@@ -25,3 +28,157 @@ def test_signature_validation(query_string, api_secret_key):
     from spylib.oauth import validate_signed_query_string
 
     validate_signed_query_string(query_string=query_string, api_secret_key=api_secret_key)
+
+
+def test_signature_validation_bytes():
+    from spylib.oauth import validate_signed_query_string
+
+    validate_signed_query_string(query_string=bulk_link.encode(), api_secret_key=API_SECRET_KEY)
+
+
+@pytest.mark.parametrize(
+    'query_string',
+    [
+        install.replace('timestamp=1654212701', 'timestamp=1654212702'),
+        install.replace('hmac=fe078', 'hmac=fe079'),
+        install.replace(
+            'hmac=fe078eb09b2b418b5db8c4efd2093ccab0855f28b3bc7d99e14c4971cf4ae670&', ''
+        ),
+        bulk_link.replace('ids%5B%5D=4729471893592&', ''),
+    ],
+    ids=['Modified param', 'Modified hmac', 'Missing hmac', 'Missing id'],
+)
+def test_invalid_signature_validation(query_string):
+    from spylib.oauth import validate_signed_query_string
+
+    with pytest.raises(ValueError):
+        validate_signed_query_string(query_string=query_string, api_secret_key=API_SECRET_KEY)
+
+
+def test_malformed_query_string():
+    from spylib.oauth import parse_signed_query_string
+
+    with pytest.raises(ValueError):
+        parse_signed_query_string('hmac=123&nofield')
+
+
+def baseline_message(query_string: str) -> str:
+    """The message as built by `parse_qsl` and `urlencode` before the single pass parser."""
+    query_params = []
+    ids = []
+    for key, value in parse_qsl(query_string, strict_parsing=True):
+        if key == 'hmac':
+            continue
+        if key == 'ids[]':
+            if not ids:
+                query_params.append(('ids', ''))
+            ids.append(value)
+            continue
+        query_params.append((key, value))
+    return urlencode(query_params, safe=':/').replace('ids=', f'ids={dumps(ids)}')
+
+
+@pytest.mark.parametrize(
+    'query_string',
+    [
+        install,
+        bulk_link,
+        'host=YWRtaW4%3D&hmac=123&shop=test.myshopify.com',
+        'hmac=123&state=a+b&email=a%40b.com&path=%2Fapps%2Fx',
+        'code=a%26b&hmac=123&ids%5B%5D=1&shop=test.myshopify.com&ids%5B%5D=2&state=a+b%25',
+        'hmac=123&locale=fr&name=Caf%C3%A9&invalid=%E9&blank=&a%3Db=c',
+    ],
+    ids=['install', 'bulk link', 'equal sign', 'plus and escapes', 'ids', 'non ascii'],
+)
+def test_parse_signed_query_string_message(query_string):
+    from spylib.oauth import parse_signed_query_string
+
+    assert parse_signed_query_string(query_string).message == baseline_message(query_string)
+    assert parse_signed_query_string(query_string.encode()).message == baseline_message(
+        query_string
+    )
+
+
+def test_parse_signed_query_string():
+    from spylib.oauth import parse_signed_query_string
+
+    signed = parse_signed_query_string(
+        'code=a%26b&hmac=123&ids%5B%5D=1&shop=test.myshopify.com&ids%5B%5D=2&host=YWRtaW4%3D'
+    )
+
+    assert signed.signature == '123'
+    assert signed.get('shop') == 'test.myshopify.com'
+    assert signed.get('code') == 'a&b'
+    assert signed.get('host') == 'YWRtaW4='
+    assert signed.get('ids') is None
+    assert signed.message == ('code=a%26b&ids=["1", "2"]&shop=test.myshopify.com&host=YWRtaW4%3D')
+
+
+def baseline_callback_message(query_string: str) -> str:
+    """The message as built by `validate_callback` with `parse_qsl` before the single pass."""
+    args = parse_qsl(query_string)
+    return '&'.join([f'{arg[0]}={arg[1]}' for arg in args if arg[0] != 'hmac'])
+
+
+@pytest.mark.parametrize(
+    'query_string',
+    [
+        install,
+        'code=a%26b&hmac=123&shop=test.myshopify.com&state=a+b%25&timestamp=1654212701',
+        'hmac=123&locale=fr&name=Caf%C3%A9&invalid=%E9&blank=&nofield&&a%3Db=c&=x',
+        'hmac=123&hmac=456&shop=test.myshopify.com',
+    ],
+    ids=['install', 'plus and escapes', 'malformed fields', 'repeated hmac'],
+)
+def test_parse_callback_query_string_message(query_string):
+    from spylib.oauth import parse_callback_query_string
+
+    signed = parse_callback_query_string(query_string.encode())
+
+    assert signed.message == baseline_callback_message(query_string)
+    assert signed.signature == [arg[1] for arg in parse_qsl(query_string) if arg[0] == 'hmac'][0]
+
+
+def test_validate_callback(mocker):
+    from spylib.hmac import calculate_from_message
+    from spylib.oauth.validations import validate_callback
+
+    mocker.patch('spylib.oauth.validations.now_epoch', return_value=1654212701)
+    query_string = 'code=a%26b&shop=test.myshopify.com&state=a+b&timestamp=1654212701'
+    signature = calculate_from_message(
+        secret=API_SECRET_KEY, message=baseline_callback_message(query_string)
+    )
+    signed = f'{query_string}&hmac={signature}'.encode()
+    arguments = dict(shop='test.myshopify.com', timestamp=1654212701, query_string=signed)
+
+    validate_callback(**arguments, api_secret_key=API_SECRET_KEY)
+    with pytest.raises(ValueError):
+        validate_callback(**arguments, api_secret_key='other')
+
+
+def test_app_proxy_signature_validation():
+    from spylib.hmac import calculate_from_message
+    from spylib.oauth import (
+        parse_app_proxy_query_string,
+        validate_app_proxy_query_string,
+    )
+
+    # Example from https://shopify.dev/apps/online-store/app-proxies#calculate-a-digital-signature
+    query_string = (
+        'extra=1&extra=2&shop=shop-name.myshopify.com&logged_in_customer_id=1'
+        '&path_prefix=%2Fapps%2Fawesome_reviews&timestamp=1317327555'
+    )
+    signed = parse_app_proxy_query_string(query_string)
+    assert signed.message == (
+        'extra=1,2logged_in_customer_id=1path_prefix=/apps/awesome_reviews'
+        'shop=shop-name.myshopify.comtimestamp=1317327555'
+    )
+
+    signature = calculate_from_message(secret=API_SECRET_KEY, message=signed.message)
+    validate_app_proxy_query_string(
+        f'{query_string}&signature={signature}', api_secret_key=API_SECRET_KEY
+    )
+    with pytest.raises(ValueError):
+        validate_app_proxy_query_string(
+            f'{query_string}&signature={signature}', api_secret_key='other'
+        )
@@ -0,0 +1,197 @@
+import asyncio
+import gc
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from httpx import Response
+from respx import MockRouter
+
+from spylib.exceptions import ShopifyCallInvalidError
+from spylib.oauth import (
+    OfflineTokenModel,
+    OnlineTokenModel,
+    SessionTokenExchanger,
+    exchange_session_token,
+)
+from spylib.session_token import TokenValidationError
+
+from .test_exchange_token import exchange_token_params
+
+API_KEY = 'API_KEY'
+API_SECRET = 'API_SECRET'
+SHOP = 'test.myshopify.com'
+ACCESS_TOKEN_URL = f'https://{SHOP}/admin/oauth/access_token'
+
+OFFLINE_TOKEN_DATA = exchange_token_params[0][0]
+ONLINE_TOKEN_DATA = exchange_token_params[1][0]
+
+
+def session_token(sub: str = '1', secret: str = API_SECRET) -> str:
+    now = datetime.now()
+    return jwt.encode(
+        {
+            'iss': f'https://{SHOP}/admin',
+            'dest': f'https://{SHOP}',
+            'aud': API_KEY,
+            'sub': sub,
+            'exp': (now + timedelta(0, 60)).timestamp(),
+            'nbf': (now - timedelta(0, 60)).timestamp(),
+            'iat': now.timestamp(),
+            'jti': '3512a085-ee9a-4914-b252-3aabcd1ada14',
+            'sid': 'abc123',
+        },
+        secret,
+        algorithm='HS256',
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'online,token_dict,token_model,requested_token_type',
+    [
+        (
+            False,
+            OFFLINE_TOKEN_DATA,
+            OfflineTokenModel,
+            'urn:shopify:params:oauth:token-type:offline-access-token',
+        ),
+        (
+            True,
+            ONLINE_TOKEN_DATA,
+            OnlineTokenModel,
+            'urn:shopify:params:oauth:token-type:online-access-token',
+        ),
+    ],
+)
+async def test_exchange_session_token(
+    respx_mock: MockRouter, online, token_dict, token_model, requested_token_type
+):
+    token = session_token()
+    respx_mock.post(
+        ACCESS_TOKEN_URL,
+        json__client_id=API_KEY,
+        json__client_secret=API_SECRET,
+        json__grant_type='urn:ietf:params:oauth:grant-type:token-exchange',
+        json__subject_token=token,
+        json__subject_token_type='urn:ietf:params:oauth:token-type:id_token',
+        json__requested_token_type=requested_token_type,
+    ).respond(json=token_dict)
+
+    result = await exchange_session_token(
+        shop=SHOP, session_token=token, api_key=API_KEY, api_secret_key=API_SECRET, online=online
+    )
+
+    assert result == token_model.model_validate(token_dict)
+
+
+@pytest.mark.asyncio
+async def test_exchanger_caches_offline_token_per_shop(respx_mock: MockRouter):
+    route = respx_mock.post(ACCESS_TOKEN_URL).respond(json=OFFLINE_TOKEN_DATA)
+    exchanger = SessionTokenExchanger(API_KEY, API_SECRET)
+
+    first = await exchanger.exchange(session_token(sub='1'))
+    second = await exchanger.from_header(f'Bearer {session_token(sub="2")}')
+
+    assert first == second == OfflineTokenModel.model_validate(OFFLINE_TOKEN_DATA)
+    assert route.call_count == 1
+
+    exchanger.invalidate(SHOP)
+    await exchanger.exchange(session_token())
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_exchanger_caches_online_token_per_user(respx_mock: MockRouter):
+    route = respx_mock.post(ACCESS_TOKEN_URL).respond(json=ONLINE_TOKEN_DATA)
+    exchanger = SessionTokenExchanger(API_KEY, API_SECRET)
+
+    await exchanger.exchange(session_token(sub='1'), online=True)
+    await exchanger.exchange(session_token(sub='1'), online=True)
+    assert route.call_count == 1
+
+    await exchanger.exchange(session_token(sub='2'), online=True)
+    assert route.call_count == 2
+    assert len(exchanger.cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_exchanger_online_token_expiry(respx_mock: MockRouter):
+    route = respx_mock.post(ACCESS_TOKEN_URL).respond(json={**ONLINE_TOKEN_DATA, 'expires_in': 30})
+    exchanger = SessionTokenExchanger(API_KEY, API_SECRET, expiry_margin=60)
+
+    await exchanger.exchange(session_token(), online=True)
+    await exchanger.exchange(session_token(), online=True)
+
+    # Expiring within the margin, never cached
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_exchanger_deduplicates_concurrent_exchanges(respx_mock: MockRouter):
+    route = respx_mock.post(ACCESS_TOKEN_URL).respond(json=ONLINE_TOKEN_DATA)
+    exchanger = SessionTokenExchanger(API_KEY, API_SECRET)
+    token = session_token()
+
+    results = await asyncio.gather(*(exchanger.exchange(token, online=True) for _ in range(10)))
+
+    assert all(result is results[0] for result in results)
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_exchanger_failure_not_cached(respx_mock: MockRouter):
+    route = respx_mock.post(ACCESS_TOKEN_URL)
+    route.side_effect = [Response(400), Response(200, json=OFFLINE_TOKEN_DATA)]
+    exchanger = SessionTokenExchanger(API_KEY, API_SECRET)
+
+    with pytest.raises(ShopifyCallInvalidError):
+        await exchanger.exchange(session_token())
+    assert await exchanger.exchange(session_token()) == OfflineTokenModel.model_validate(
+        OFFLINE_TOKEN_DATA
+    )
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_exchanger_invalid_session_token(respx_mock: MockRouter):
+    route = respx_mock.post(ACCESS_TOKEN_URL).respond(json=OFFLINE_TOKEN_DATA)
+    exchanger = SessionTokenExchanger(API_KEY, API_SECRET)
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        await exchanger.exchange(session_token(secret='other'))
+    with pytest.raises(TokenValidationError):
+        await exchanger.from_header(session_token())
+    assert route.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_exchanger_failure_retrieved_when_callers_cancelled(mocker):
+    started, fail = asyncio.Event(), asyncio.Event()
+
+    async def failing_exchange(**kwargs):
+        started.set()
+        await fail.wait()
+        raise ShopifyCallInvalidError('Rejected')
+
+    mocker.patch('spylib.oauth.token_exchange.exchange_session_token', failing_exchange)
+    loop = asyncio.get_running_loop()
+    exception_handler = mocker.Mock()
+    loop.set_exception_handler(exception_handler)
+    exchanger = SessionTokenExchanger(API_KEY, API_SECRET)
+
+    try:
+        caller = asyncio.ensure_future(exchanger.exchange(session_token()))
+        await started.wait()
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        fail.set()
+        while exchanger._pending:
+            await asyncio.sleep(0)
+        gc.collect()
+    finally:
+        loop.set_exception_handler(None)
+
+    # The failed exchange isn't reported as "Task exception was never retrieved"
+    exception_handler.assert_not_called()
@@ -0,0 +1,208 @@
+import json
+from io import BytesIO
+
+import pytest
+from httpx import Response
+from respx import MockRouter
+
+from spylib.bulk import BulkMutationResult, bulk_mutation, write_variables
+from spylib.exceptions import ShopifyBulkOperationError, ShopifyGQLUserError
+
+from .token_classes import OfflineToken, test_information
+
+GRAPHQL_URL = r'.*/graphql\.json'
+UPLOAD_URL = 'https://uploads.example.org/'
+RESULT_URL = 'https://results.example.org/bulk.jsonl'
+OPERATION_ID = 'gid://shopify/BulkOperation/1'
+
+PRODUCT_CREATE_GQL = """
+mutation call($input: ProductInput!) {
+  productCreate(input: $input) {
+    product { id }
+    userErrors { field message }
+  }
+}
+"""
+
+STAGED_TARGET = {
+    'url': UPLOAD_URL,
+    'resourceUrl': None,
+    'parameters': [
+        {'name': 'key', 'value': 'tmp/bulk/bulk_op_vars.jsonl'},
+        {'name': 'policy', 'value': 'signed-policy'},
+    ],
+}
+
+
+def operation(status, url=None, error_code=None, partial_data_url=None):
+    return {
+        'id': OPERATION_ID,
+        'status': status,
+        'errorCode': error_code,
+        'objectCount': '2',
+        'url': url,
+        'partialDataUrl': partial_data_url,
+    }
+
+
+class ShopifyStandIn:
+    """Answer the GraphQL calls of a bulk mutation, going through the given statuses."""
+
+    def __init__(self, statuses, user_errors=None):
+        self.statuses = list(statuses)
+        self.user_errors = user_errors or []
+        self.calls = []
+
+    def __call__(self, request):
+        body = json.loads(request.content)
+        self.calls.append(body)
+        name = body['operationName']
+        if name == 'stagedUploadsCreate':
+            data = {'stagedUploadsCreate': {'stagedTargets': [STAGED_TARGET], 'userErrors': []}}
+        elif name == 'bulkOperationRunMutation':
+            data = {
+                'bulkOperationRunMutation': {
+                    'bulkOperation': operation('CREATED'),
+                    'userErrors': self.user_errors,
+                }
+            }
+        else:
+            data = {'node': self.statuses.pop(0)}
+        return Response(200, json={'data': data})
+
+
+def result_line(line_number, id=None, user_errors=None):
+    product = {'id': id} if id else None
+    return json.dumps(
+        {
+            'data': {'productCreate': {'product': product, 'userErrors': user_errors or []}},
+            '__lineNumber': line_number,
+        }
+    )
+
+
+def test_write_variables():
+    file = BytesIO()
+
+    count = write_variables(({'input': {'title': f'Product {i}'}} for i in range(3)), file)
+
+    assert count == 3
+    assert file.getvalue().splitlines() == [
+        b'{"input":{"title":"Product 0"}}',
+        b'{"input":{"title":"Product 1"}}',
+        b'{"input":{"title":"Product 2"}}',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bulk_mutation(respx_mock: MockRouter):
+    shopify = ShopifyStandIn(
+        [operation('RUNNING'), operation('COMPLETED', url=RESULT_URL)],
+    )
+    respx_mock.post(url__regex=GRAPHQL_URL).mock(side_effect=shopify)
+    upload = respx_mock.post(UPLOAD_URL).respond(201)
+    error = {'field': ['input', 'title'], 'message': "Title can't be blank"}
+    respx_mock.get(RESULT_URL).respond(
+        content='\n'.join(
+            [result_line(0, id='gid://shopify/Product/1'), result_line(1, user_errors=[error])]
+        )
+        + '\n'
+    )
+    token = await OfflineToken.load(store_name=test_information.store_name)
+
+    results = [
+        result
+        async for result in bulk_mutation(
+            token,
+            PRODUCT_CREATE_GQL,
+            [{'input': {'title': 'Product'}}, {'input': {'title': ''}}],
+            poll_interval=0,
+        )
+    ]
+
+    assert [result.line_number for result in results] == [0, 1]
+    assert results[0].ok
+    assert results[0].data == {
+        'productCreate': {'product': {'id': 'gid://shopify/Product/1'}, 'userErrors': []}
+    }
+    assert not results[1].ok
+    assert results[1].user_errors == [error]
+
+    # The variables file is uploaded with the parameters of the staged target
+    content = upload.calls.last.request.content
+    assert b'name="policy"\r\n\r\nsigned-policy' in content
+    assert b'{"input":{"title":"Product"}}\n{"input":{"title":""}}\n' in content
+
+    run = shopify.calls[1]
+    assert run['operationName'] == 'bulkOperationRunMutation'
+    assert run['variables']['mutation'] == PRODUCT_CREATE_GQL
+    assert run['variables']['stagedUploadPath'] == 'tmp/bulk/bulk_op_vars.jsonl'
+    # Polled until completed
+    assert [call['operationName'] for call in shopify.calls[2:]] == ['bulkOperation'] * 2
+
+
+def test_result_with_graphql_errors():
+    result = BulkMutationResult.from_line(
+        {'errors': [{'message': 'Variable $input is invalid'}], '__lineNumber': 3}
+    )
+
+    assert result.line_number == 3
+    assert result.data is None
+    assert not result.ok
+
+
+@pytest.mark.asyncio
+async def test_bulk_mutation_failed(respx_mock: MockRouter):
+    shopify = ShopifyStandIn([operation('FAILED', error_code='INTERNAL_SERVER_ERROR')])
+    respx_mock.post(url__regex=GRAPHQL_URL).mock(side_effect=shopify)
+    respx_mock.post(UPLOAD_URL).respond(201)
+    token = await OfflineToken.load(store_name=test_information.store_name)
+
+    with pytest.raises(ShopifyBulkOperationError, match='FAILED: INTERNAL_SERVER_ERROR'):
+        async for _ in bulk_mutation(token, PRODUCT_CREATE_GQL, [{}], poll_interval=0):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_bulk_mutation_failed_with_partial_data(respx_mock: MockRouter):
+    partial_url = 'https://results.example.org/partial.jsonl'
+    shopify = ShopifyStandIn(
+        [operation('FAILED', error_code='TIMEOUT', partial_data_url=partial_url)]
+    )
+    respx_mock.post(url__regex=GRAPHQL_URL).mock(side_effect=shopify)
+    respx_mock.post(UPLOAD_URL).respond(201)
+    respx_mock.get(partial_url).respond(
+        content=result_line(0, id='gid://shopify/Product/1') + '\n'
+    )
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    results = []
+
+    with pytest.raises(ShopifyBulkOperationError, match='FAILED: TIMEOUT') as error:
+        async for result in bulk_mutation(token, PRODUCT_CREATE_GQL, [{}, {}], poll_interval=0):
+            results.append(result)
+
+    # The lines processed before the failure are not lost
+    assert [result.line_number for result in results] == [0]
+    assert error.value.partial_data_url == partial_url
+
+
+@pytest.mark.asyncio
+async def test_bulk_mutation_user_errors(respx_mock: MockRouter):
+    error = {'field': None, 'message': 'A bulk mutation operation is already in progress'}
+    shopify = ShopifyStandIn([], user_errors=[error])
+    respx_mock.post(url__regex=GRAPHQL_URL).mock(side_effect=shopify)
+    respx_mock.post(UPLOAD_URL).respond(201)
+    token = await OfflineToken.load(store_name=test_information.store_name)
+
+    with pytest.raises(ShopifyGQLUserError):
+        async for _ in bulk_mutation(token, PRODUCT_CREATE_GQL, [{}], poll_interval=0):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_bulk_mutation_without_variables(respx_mock: MockRouter):
+    route = respx_mock.post(url__regex=GRAPHQL_URL)
+    token = await OfflineToken.load(store_name=test_information.store_name)
+
+    assert [result async for result in bulk_mutation(token, PRODUCT_CREATE_GQL, [])] == []
+    assert not route.called
@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from respx import MockRouter
+
+from spylib.bulk import (
+    BulkResultReassembler,
+    areassemble,
+    reassemble,
+    reassemble_file,
+    stream_objects,
+)
+
+from .token_classes import OfflineToken, test_information
+
+RESULT_URL = 'https://results.example.org/bulk.jsonl'
+
+ITEMS = [
+    {'id': 'gid://shopify/Product/1', 'title': 'Shirt'},
+    {'id': 'gid://shopify/ProductVariant/11', '__parentId': 'gid://shopify/Product/1'},
+    {'id': 'gid://shopify/Metafield/111', '__parentId': 'gid://shopify/ProductVariant/11'},
+    {'id': 'gid://shopify/ProductVariant/12', '__parentId': 'gid://shopify/Product/1'},
+    {'id': 'gid://shopify/Product/2', 'title': 'Hat'},
+    {'id': 'gid://shopify/Product/3', 'title': 'Socks'},
+    {'id': 'gid://shopify/ProductVariant/31', '__parentId': 'gid://shopify/Product/3'},
+]
+LINES = [json.dumps(item) + '\n' for item in ITEMS]
+
+EXPECTED = [
+    {
+        'id': 'gid://shopify/Product/1',
+        'title': 'Shirt',
+        '__children': [
+            {
+                'id': 'gid://shopify/ProductVariant/11',
+                '__parentId': 'gid://shopify/Product/1',
+                '__children': [
+                    {
+                        'id': 'gid://shopify/Metafield/111',
+                        '__parentId': 'gid://shopify/ProductVariant/11',
+                    }
+                ],
+            },
+            {'id': 'gid://shopify/ProductVariant/12', '__parentId': 'gid://shopify/Product/1'},
+        ],
+    },
+    {'id': 'gid://shopify/Product/2', 'title': 'Hat'},
+    {
+        'id': 'gid://shopify/Product/3',
+        'title': 'Socks',
+        '__children': [
+            {'id': 'gid://shopify/ProductVariant/31', '__parentId': 'gid://shopify/Product/3'}
+        ],
+    },
+]
+
+
+def test_reassemble():
+    assert list(reassemble(LINES)) == EXPECTED
+
+
+def test_reassemble_emits_each_object_when_the_next_one_starts():
+    reassembler = BulkResultReassembler()
+
+    emitted = [reassembler.feed(line) for line in LINES]
+
+    assert emitted[:4] == [None] * 4
+    assert emitted[4] == EXPECTED[0]
+    assert emitted[5] == EXPECTED[1]
+    assert emitted[6] is None
+    # Only the subtree of the current object is kept
+    assert len(reassembler._index) == 2
+    assert reassembler.finish() == EXPECTED[2]
+    assert reassembler.finish() is None
+
+
+def test_reassemble_child_key():
+    objects = list(reassemble(LINES, child_key=lambda child: child['id'].split('/')[3]))
+
+    variants = objects[0]['ProductVariant']
+    assert [variant['id'] for variant in variants] == [
+        'gid://shopify/ProductVariant/11',
+        'gid://shopify/ProductVariant/12',
+    ]
+    assert variants[0]['Metafield'][0]['id'] == 'gid://shopify/Metafield/111'
+
+
+def test_reassemble_child_before_its_parent():
+    with pytest.raises(ValueError, match='gid://shopify/Product/2'):
+        list(reassemble([LINES[0], json.dumps({'__parentId': 'gid://shopify/Product/2'})]))
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_reassemble_file(tmp_path, use_mmap):
+    path = tmp_path / 'bulk.jsonl'
+    path.write_text(''.join(LINES))
+
+    assert list(reassemble_file(str(path), use_mmap=use_mmap)) == EXPECTED
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_reassemble_empty_file(tmp_path, use_mmap):
+    path = tmp_path / 'bulk.jsonl'
+    path.write_text('')
+
+    assert list(reassemble_file(str(path), use_mmap=use_mmap)) == []
+
+
+@pytest.mark.asyncio
+async def test_areassemble():
+    async def lines():
+        for line in LINES:
+            yield line.encode('utf-8')
+
+    assert [item async for item in areassemble(lines())] == EXPECTED
+
+
+@pytest.mark.asyncio
+async def test_stream_objects(respx_mock: MockRouter):
+    respx_mock.get(RESULT_URL).respond(content=''.join(LINES))
+    token = await OfflineToken.load(store_name=test_information.store_name)
+
+    assert [item async for item in stream_objects(token, RESULT_URL)] == EXPECTED
+    assert [item async for item in stream_objects(token, None)] == []
@@ -1,9 +1,18 @@
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from hmac import compare_digest
 
 import pytest
 
-from spylib.hmac import calculate_from_components, calculate_from_message, validate
+from spylib.hmac import (
+    Signer,
+    Verifier,
+    calculate_from_components,
+    calculate_from_message,
+    get_verifier,
+    validate,
+)
 
 API_KEY = 'API_KEY'
 API_SECRET = 'API_SECRET'
@@ -76,3 +85,124 @@ async def test_validate():
 async def test_invalid_validate(message):
     with pytest.raises(ValueError):
         assert validate(secret=API_SECRET, sent_hmac=HMAC, message=message)
+
+
+def test_signer_matches_calculate_from_message():
+    signer = Signer(API_SECRET)
+    assert signer.calculate(MESSAGE) == HMAC
+    assert signer.calculate(MESSAGE.encode()) == HMAC
+    # The keyed state is cloned, so consecutive messages don't leak into each other
+    assert signer.calculate('RANDOM') == calculate_from_message(API_SECRET, message='RANDOM')
+    assert signer.calculate(MESSAGE) == HMAC
+
+
+@pytest.mark.parametrize(
+    'sent_hmac,use_base64,expected',
+    [
+        (HMAC, False, True),
+        (HMAC.upper(), False, False),
+        (f' {HMAC}\n', False, False),
+        (HMAC[:-2], False, False),
+        (HMAC.encode(), False, True),
+        (b64encode(bytes.fromhex(HMAC)).decode(), True, True),
+        (HMAC, True, False),
+        ('not hex', False, False),
+        ('not base64!', True, False),
+        ('é', False, False),
+    ],
+    ids=[
+        'Hex',
+        'Upper hex',
+        'Hex with whitespace',
+        'Short hex',
+        'Hex bytes',
+        'Base64',
+        'Hex as base64',
+        'Invalid hex',
+        'Invalid base64',
+        'Unicode',
+    ],
+)
+def test_verifier_is_valid(sent_hmac, use_base64, expected):
+    verifier = Verifier(API_SECRET)
+    assert verifier.is_valid(sent_hmac, MESSAGE, use_base64=use_base64) is expected
+
+
+def test_verifier_validate():
+    verifier = Verifier(API_SECRET)
+    verifier.validate(HMAC, MESSAGE)
+    with pytest.raises(ValueError, match='HMAC verification failed'):
+        verifier.validate(HMAC, 'RANDOM')
+
+
+def test_get_verifier_is_reused():
+    assert get_verifier(API_SECRET) is get_verifier(API_SECRET)
+
+
+OLD_SECRET = 'OLD_API_SECRET'
+
+
+def test_verifier_multiple_secrets():
+    verifier = Verifier([API_SECRET, OLD_SECRET])
+    old_hmac = calculate_from_message(OLD_SECRET, message=MESSAGE)
+
+    assert verifier.match(HMAC, MESSAGE) == 0
+    assert verifier.match(old_hmac, MESSAGE) == 1
+    assert verifier.match(HMAC, 'RANDOM') is None
+    # The primary secret signs
+    assert verifier.calculate(MESSAGE) == HMAC
+
+
+def test_verifier_remembers_last_matching_secret():
+    verifier = Verifier([API_SECRET, OLD_SECRET], max_keys=1)
+    old_hmac = calculate_from_message(OLD_SECRET, message=MESSAGE)
+
+    assert verifier.match(old_hmac, MESSAGE, key='shop-1') == 1
+    assert verifier._last_match == {'shop-1': 1}
+
+    # Only max_keys shops are remembered
+    assert verifier.match(old_hmac, MESSAGE, key='shop-2') == 1
+    assert list(verifier._last_match) == ['shop-2']
+
+    # Going back to the primary secret forgets the shop
+    assert verifier.match(HMAC, MESSAGE, key='shop-2') == 0
+    assert not verifier._last_match
+
+
+def test_verifier_forgets_least_recently_matched_key():
+    verifier = Verifier([API_SECRET, OLD_SECRET], max_keys=2)
+    old_hmac = calculate_from_message(OLD_SECRET, message=MESSAGE)
+
+    verifier.match(old_hmac, MESSAGE, key='shop-1')
+    verifier.match(old_hmac, MESSAGE, key='shop-2')
+    # A hit on the remembered secret refreshes the shop
+    assert verifier.match(old_hmac, MESSAGE, key='shop-1') == 1
+    verifier.match(old_hmac, MESSAGE, key='shop-3')
+
+    assert list(verifier._last_match) == ['shop-1', 'shop-3']
+
+
+def test_verifier_concurrent_matches():
+    verifier = Verifier([API_SECRET, OLD_SECRET], max_keys=10)
+    old_hmac = calculate_from_message(OLD_SECRET, message=MESSAGE)
+
+    def match_shops(offset):
+        for i in range(2000):
+            assert verifier.match(old_hmac, MESSAGE, key=f'shop-{(i + offset) % 50}') == 1
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(match_shops, range(4)))
+    assert len(verifier._last_match) == 10
+
+
+def test_verifier_multiple_secrets_large_body():
+    secrets = [API_SECRET, OLD_SECRET, 'OTHER_SECRET']
+    verifier = Verifier(secrets)
+    body = b'x' * (3 * 64 * 1024 + 5)
+    for index, secret in enumerate(secrets):
+        assert verifier.match(Signer(secret).calculate(body), body) == index
+
+
+def test_verifier_requires_a_secret():
+    with pytest.raises(ValueError):
+        Verifier([])
@@ -0,0 +1,196 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from spylib.incremental_sync import (
+    FileCheckpointStore,
+    IncrementalSync,
+    MemoryCheckpointStore,
+    SyncCheckpoint,
+    search_query,
+)
+
+from .token_classes import OfflineToken, test_information
+
+PRODUCTS_GQL = """
+query products($first: Int!, $after: String, $query: String) {
+  products(first: $first, after: $after, query: $query, sortKey: UPDATED_AT) {
+    nodes { id updatedAt }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+KEY = f'{test_information.store_name}/products'
+
+
+def node(id: int, updated_at: str) -> dict:
+    return {'id': f'gid://shopify/Product/{id}', 'updatedAt': updated_at}
+
+
+def page(nodes, end_cursor=None) -> dict:
+    return {
+        'products': {
+            'nodes': nodes,
+            'pageInfo': {'hasNextPage': end_cursor is not None, 'endCursor': end_cursor},
+        }
+    }
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_search_query():
+    watermark = utc(2024, 1, 2, 3, 4, 5)
+
+    assert search_query(None) is None
+    assert search_query(None, 'status:active') == 'status:active'
+    assert search_query(watermark) == "updated_at:>='2024-01-02T03:04:05Z'"
+    assert (
+        search_query(watermark, 'status:active OR status:draft')
+        == "(status:active OR status:draft) AND updated_at:>='2024-01-02T03:04:05Z'"
+    )
+
+
+@pytest.mark.asyncio
+async def test_incremental_sync(mocker):
+    execute_gql = mocker.patch.object(
+        OfflineToken,
+        'execute_gql',
+        AsyncMock(
+            side_effect=[
+                page([node(1, '2024-01-01T00:00:00Z'), node(2, '2024-01-03T00:00:00Z')], 'c1'),
+                page([node(3, '2024-01-02T00:00:00Z')]),
+                page([node(2, '2024-01-04T00:00:00Z')]),
+            ]
+        ),
+    )
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    store = MemoryCheckpointStore()
+    sync = IncrementalSync(token, PRODUCTS_GQL, 'products', store, page_size=2)
+    handler = AsyncMock()
+
+    assert await sync.run(handler) == 3
+    assert handler.call_count == 2
+    assert await store.load(KEY) == SyncCheckpoint(watermark=utc(2024, 1, 3))
+    assert [call.kwargs['variables'] for call in execute_gql.call_args_list] == [
+        {'first': 2, 'query': None, 'after': None},
+        {'first': 2, 'query': None, 'after': 'c1'},
+    ]
+
+    # The next sync only reads what changed since
+    assert await sync.run(handler) == 1
+    assert execute_gql.call_args.kwargs['variables'] == {
+        'first': 2,
+        'query': "updated_at:>='2024-01-03T00:00:00Z'",
+        'after': None,
+    }
+    assert await store.load(KEY) == SyncCheckpoint(watermark=utc(2024, 1, 4))
+
+
+@pytest.mark.asyncio
+async def test_incremental_sync_resumes(mocker, tmp_path):
+    watermark = utc(2024, 1, 1)
+    store = FileCheckpointStore(str(tmp_path))
+    await store.save(KEY, SyncCheckpoint(watermark=watermark))
+    execute_gql = mocker.patch.object(
+        OfflineToken,
+        'execute_gql',
+        AsyncMock(
+            side_effect=[
+                page([node(1, '2024-01-02T00:00:00Z')], 'c1'),
+                page([node(2, '2024-01-03T00:00:00Z')], 'c2'),
+                page([node(2, '2024-01-03T00:00:00Z')], 'c2'),
+                page([node(3, '2024-01-04T00:00:00Z')]),
+            ]
+        ),
+    )
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    sync = IncrementalSync(token, PRODUCTS_GQL, 'products', store)
+
+    async def crash_on_second_page(nodes):
+        if nodes[0]['id'] == 'gid://shopify/Product/2':
+            raise RuntimeError('Crash')
+
+    with pytest.raises(RuntimeError):
+        await sync.run(crash_on_second_page)
+    # Only the first page was processed
+    assert await store.load(KEY) == SyncCheckpoint(
+        watermark=watermark, cursor='c1', high_watermark=utc(2024, 1, 2)
+    )
+
+    # A new process resumes from the same page with the same watermark
+    resumed = IncrementalSync(token, PRODUCTS_GQL, 'products', FileCheckpointStore(str(tmp_path)))
+    assert await resumed.run(AsyncMock()) == 2
+    assert [call.kwargs['variables']['after'] for call in execute_gql.call_args_list] == [
+        None,
+        'c1',
+        'c1',
+        'c2',
+    ]
+    assert {call.kwargs['variables']['query'] for call in execute_gql.call_args_list} == {
+        "updated_at:>='2024-01-01T00:00:00Z'"
+    }
+    assert await store.load(KEY) == SyncCheckpoint(watermark=utc(2024, 1, 4))
+
+
+@pytest.mark.asyncio
+async def test_incremental_sync_same_second_as_watermark(mocker):
+    execute_gql = mocker.patch.object(
+        OfflineToken,
+        'execute_gql',
+        AsyncMock(
+            side_effect=[
+                page([node(1, '2024-01-01T00:00:00Z'), node(2, '2024-01-02T00:00:00Z')]),
+                # Product 3 was updated in the same second as product 2, after it was read
+                page([node(2, '2024-01-02T00:00:00Z'), node(3, '2024-01-02T00:00:00Z')]),
+            ]
+        ),
+    )
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    store = MemoryCheckpointStore()
+    sync = IncrementalSync(token, PRODUCTS_GQL, 'products', store)
+    synced = []
+
+    async def handler(nodes):
+        synced.extend(node['id'] for node in nodes)
+
+    await sync.run(handler)
+    await sync.run(handler)
+
+    assert execute_gql.call_args.kwargs['variables']['query'] == (
+        "updated_at:>='2024-01-02T00:00:00Z'"
+    )
+    assert 'gid://shopify/Product/3' in synced
+    assert await store.load(KEY) == SyncCheckpoint(watermark=utc(2024, 1, 2))
+
+
+@pytest.mark.asyncio
+async def test_incremental_sync_nothing_changed(mocker):
+    mocker.patch.object(OfflineToken, 'execute_gql', AsyncMock(return_value=page([])))
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    store = MemoryCheckpointStore()
+    await store.save(KEY, SyncCheckpoint(watermark=utc(2024, 1, 1)))
+    sync = IncrementalSync(token, PRODUCTS_GQL, 'products', store)
+
+    assert [nodes async for nodes in sync.pages()] == []
+    assert await store.load(KEY) == SyncCheckpoint(watermark=utc(2024, 1, 1))
+
+
+@pytest.mark.asyncio
+async def test_file_checkpoint_store(tmp_path):
+    store = FileCheckpointStore(str(tmp_path / 'checkpoints'))
+    checkpoint = SyncCheckpoint(watermark=utc(2024, 1, 1), cursor='c1')
+
+    assert await store.load(KEY) is None
+    await store.save(KEY, checkpoint)
+    assert await store.load(KEY) == checkpoint
+    assert [path.name for path in (tmp_path / 'checkpoints').iterdir()] == [
+        'Test-Store%2Fproducts.json'
+    ]
+
+    # Keys only differing by a separator don't share a file
+    await store.save('Test-Store_products', SyncCheckpoint(cursor='c2'))
+    assert await store.load(KEY) == checkpoint
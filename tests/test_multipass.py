@@ -0,0 +1,65 @@
+import hmac
+import json
+from base64 import urlsafe_b64decode
+from hashlib import sha256
+
+import pytest
+from Crypto.Cipher import AES
+
+from spylib import multipass
+from spylib.multipass import MultipassGenerator
+
+SECRET = 'MULTIPASS_SECRET'
+
+
+def decode_token(token: bytes, secret: str = SECRET) -> dict:
+    key = sha256(secret.encode('utf-8')).digest()
+    raw = urlsafe_b64decode(token)
+    cypher_text, signature = raw[:-32], raw[-32:]
+    assert hmac.compare_digest(signature, hmac.new(key[16:], cypher_text, sha256).digest())
+
+    iv, encrypted = cypher_text[: AES.block_size], cypher_text[AES.block_size :]
+    plain_text = AES.new(key[:16], AES.MODE_CBC, iv).decrypt(encrypted)
+    return json.loads(plain_text[: -plain_text[-1]])
+
+
+def test_generate_token():
+    customer_data = {'email': 'customer@example.com', 'first_name': 'Zoë'}
+
+    token = MultipassGenerator(SECRET).generate_token(customer_data)
+
+    data = decode_token(token)
+    assert data.pop('created_at')
+    assert data == {'email': 'customer@example.com', 'first_name': 'Zoë'}
+    # The input is not modified
+    assert customer_data == {'email': 'customer@example.com', 'first_name': 'Zoë'}
+
+
+def test_generate_token_functions():
+    customer_data = {'email': 'customer@example.com'}
+
+    token = multipass.generate_token(secret=SECRET, customer_data=customer_data)
+    url = multipass.generate_url(
+        secret=SECRET, customer_data=customer_data, store_url='https://test.myshopify.com'
+    )
+
+    assert decode_token(token)['email'] == 'customer@example.com'
+    prefix = 'https://test.myshopify.com/account/login/multipass/'
+    assert url.startswith(prefix)
+    assert decode_token(url[len(prefix) :].encode('utf-8'))['email'] == 'customer@example.com'
+    assert customer_data == {'email': 'customer@example.com'}
+
+
+def test_generate_token_missing_email():
+    with pytest.raises(ValueError, match='Missing email'):
+        MultipassGenerator(SECRET).generate_token({'first_name': 'John'})
+
+
+@pytest.mark.parametrize('processes', [None, 2])
+def test_generate_many(processes):
+    customers = ({'email': f'customer{i}@example.com'} for i in range(25))
+
+    tokens = MultipassGenerator(SECRET).generate_many(customers, processes=processes, chunksize=4)
+
+    emails = [decode_token(token)['email'] for token in tokens]
+    assert emails == [f'customer{i}@example.com' for i in range(25)]
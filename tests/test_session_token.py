@@ -11,6 +11,8 @@ from spylib.session_token import (
     InvalidIssuerError,
     MismatchedHostError,
     SessionToken,
+    SessionTokenCache,
+    SessionTokenVerifier,
     TokenAuthenticationError,
 )
 
@@ -112,3 +114,170 @@ async def test_depends(token):
     header = generate_auth_header(token)
 
     client.get('/token', headers={'Authorization': header})
+
+
+@pytest.mark.asyncio
+async def test_session_token_cache(token, mocker):
+    cache = SessionTokenCache(maxsize=2)
+    header = generate_auth_header(token)
+    model_validate = mocker.spy(SessionToken, 'model_validate')
+
+    session_token = SessionToken.from_header(header, API_KEY, API_SECRET, cache=cache)
+    assert SessionToken.from_header(header, API_KEY, API_SECRET, cache=cache) is session_token
+    assert model_validate.call_count == 1
+    assert len(cache) == 1
+
+    # The secret and api key are part of the key
+    with pytest.raises(jwt.InvalidSignatureError):
+        SessionToken.from_header(header, API_KEY, 'other_secret', cache=cache)
+
+
+@pytest.mark.asyncio
+async def test_session_token_cache_expiry(token, mocker):
+    cache = SessionTokenCache()
+    header = generate_auth_header(token)
+
+    session_token = SessionToken.from_header(header, API_KEY, API_SECRET, cache=cache)
+
+    mocker.patch('spylib.session_token.time', return_value=token['exp'])
+    assert cache.get((header[len('Bearer ') :], API_KEY, API_SECRET)) is None
+    assert len(cache) == 0
+    assert session_token.exp == token['exp']
+
+
+def test_session_token_cache_eviction():
+    cache = SessionTokenCache(maxsize=2)
+    expires_at = (datetime.now() + timedelta(0, 60)).timestamp()
+
+    cache.set('a', 1, expires_at=expires_at)
+    cache.set('b', 2, expires_at=expires_at)
+    assert cache.get('a') == 1
+    cache.set('c', 3, expires_at=expires_at)
+
+    # b was the least recently used
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+    # Tokens without or past their expiration aren't cached
+    cache.set('d', 4, expires_at=None)
+    cache.set('e', 5, expires_at=datetime.now().timestamp() - 1)
+    assert cache.get('d') is None
+    assert cache.get('e') is None
+
+
+@pytest.mark.asyncio
+async def test_session_token_verifier(token):
+    verifier = SessionTokenVerifier(API_KEY, API_SECRET)
+    header = generate_auth_header(token)
+
+    session_token = verifier.from_header(header)
+
+    assert session_token.shop == 'test.myshopify.com'
+    assert session_token.iss_str == token['iss']
+    assert session_token.iss == HttpUrl(token['iss'])
+    assert session_token.dest == HttpUrl(token['dest'])
+    assert session_token.to_session_token() == SessionToken.from_header(
+        header, API_KEY, API_SECRET
+    )
+
+
+@pytest.mark.asyncio
+async def test_session_token_verifier_cache(token, mocker):
+    verifier = SessionTokenVerifier(API_KEY, API_SECRET, cache=SessionTokenCache())
+    header = generate_auth_header(token)
+    check_claims = mocker.spy(verifier, '_check_claims')
+
+    assert verifier.from_header(header) is verifier.from_header(header)
+    assert check_claims.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_session_token_verifier_invalid_header():
+    verifier = SessionTokenVerifier(API_KEY, API_SECRET)
+    with pytest.raises(TokenAuthenticationError):
+        verifier.from_header('')
+
+
+@pytest.mark.parametrize(
+    'encoded_token,error',
+    [
+        ('not-a-jwt', jwt.DecodeError),
+        ('a.b.c', jwt.DecodeError),
+        (jwt.encode(get_token(), 'invalid_secret', algorithm='HS256'), jwt.InvalidSignatureError),
+        (jwt.encode(get_token(), API_SECRET, algorithm='HS512'), jwt.InvalidAlgorithmError),
+    ],
+    ids=['Not a JWT', 'Invalid segments', 'Invalid signature', 'Wrong algorithm'],
+)
+@pytest.mark.asyncio
+async def test_session_token_verifier_invalid_token(encoded_token, error):
+    verifier = SessionTokenVerifier(API_KEY, API_SECRET)
+    with pytest.raises(error):
+        verifier.from_header(f'Bearer {encoded_token}')
+
+
+@pytest.mark.parametrize(
+    'parameter,value,error',
+    [
+        ('iss', 'https://someinvalidhost.com', InvalidIssuerError),
+        ('iss', 'https://someinvalidhost.myshopify.com/', MismatchedHostError),
+        ('nbf', (datetime.now() + timedelta(0, 60)).timestamp(), jwt.ImmatureSignatureError),
+        ('exp', (datetime.now() - timedelta(0, 60)).timestamp(), jwt.ExpiredSignatureError),
+        ('iat', (datetime.now() + timedelta(0, 60)).timestamp(), jwt.ImmatureSignatureError),
+        ('iat', 'now', jwt.InvalidIssuedAtError),
+        ('iat', None, jwt.InvalidIssuedAtError),
+        ('exp', '1', jwt.InvalidTokenError),
+        ('exp', True, jwt.InvalidTokenError),
+        ('aud', 'some_invalid_audience', jwt.InvalidAudienceError),
+        ('aud', 123, jwt.InvalidAudienceError),
+        ('aud', [API_KEY, 123], jwt.InvalidAudienceError),
+        ('sid', None, jwt.MissingRequiredClaimError),
+    ],
+    ids=[
+        'Invalid ISS',
+        'Mismatched host',
+        'NBF in future',
+        'EXP in past',
+        'IAT in future',
+        'IAT not a number',
+        'IAT null',
+        'EXP string',
+        'EXP boolean',
+        'Wrong audience',
+        'Audience not a string',
+        'Audience list with a non string',
+        'Missing claim',
+    ],
+)
+@pytest.mark.asyncio
+async def test_session_token_verifier_invalid_parameters(token, parameter, value, error):
+    token[parameter] = value
+    header = generate_auth_header(token)
+    verifier = SessionTokenVerifier(API_KEY, API_SECRET)
+
+    with pytest.raises(error):
+        verifier.from_header(header)
+    # Same behavior as the PyJWT path
+    with pytest.raises(error):
+        SessionToken.from_header(header, API_KEY, API_SECRET)
+
+
+@pytest.mark.parametrize('parameter', ['exp', 'nbf', 'iat'])
+@pytest.mark.asyncio
+async def test_session_token_verifier_boolean_time_claims(token, parameter):
+    # PyJWT truncates the time claims with int(), which accepts booleans
+    token[parameter] = True
+    header = generate_auth_header(token)
+
+    with pytest.raises(jwt.InvalidTokenError, match=f'The {parameter} claim must be an integer'):
+        SessionTokenVerifier(API_KEY, API_SECRET).from_header(header)
+
+
+@pytest.mark.asyncio
+async def test_session_token_verifier_leeway(token):
+    token['nbf'] = (datetime.now() + timedelta(0, 5)).timestamp()
+    header = generate_auth_header(token)
+
+    assert SessionTokenVerifier(API_KEY, API_SECRET).from_header(header)
+    with pytest.raises(jwt.ImmatureSignatureError):
+        SessionTokenVerifier(API_KEY, API_SECRET, leeway=0).from_header(header)
@@ -0,0 +1,152 @@
+import asyncio
+import os
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError
+from threading import Event, get_ident
+from unittest.mock import AsyncMock
+
+import pytest
+
+from spylib.sync_client import SyncRunner, SyncToken, get_runner, run
+from spylib.utils.limiter import ConcurrencyLimiter
+from spylib.utils.rest import GET
+
+from .token_classes import MockHTTPResponse, OfflineToken, test_information
+
+
+@pytest.fixture
+def runner():
+    runner = SyncRunner()
+    yield runner
+    runner.stop()
+
+
+def test_sync_token_shares_one_loop_across_threads(mocker, runner):
+    threads = set()
+    loops = set()
+
+    async def request(*args, **kwargs):
+        threads.add(get_ident())
+        loops.add(id(asyncio.get_running_loop()))
+        await asyncio.sleep(0.001)
+        return MockHTTPResponse(status_code=200, jsondata={'data': {'shop': {'name': 'test'}}})
+
+    mocker.patch('httpx.AsyncClient.request', new_callable=AsyncMock, side_effect=request)
+    limiter = ConcurrencyLimiter(max_concurrency=2)
+    mocker.patch.object(OfflineToken, 'concurrency_limiter', limiter)
+    token = SyncToken(
+        runner.run(OfflineToken.load(store_name=test_information.store_name)), runner
+    )
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(lambda _: token.execute_gql(query='{ shop { name } }'), range(32))
+        )
+
+    assert results == [{'shop': {'name': 'test'}}] * 32
+    assert len(threads) == 1
+    assert len(loops) == 1
+    assert threads != {get_ident()}
+    # The limiter saw the calls of all the threads
+    assert limiter.metrics(test_information.store_name).acquired == 32
+    assert limiter.metrics(test_information.store_name).queued > 0
+
+
+def test_sync_token_rest(mocker, runner):
+    mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(status_code=200, jsondata={'shop': {'id': 1}}),
+    )
+    token = SyncToken(
+        runner.run(OfflineToken.load(store_name=test_information.store_name)), runner
+    )
+
+    assert token.execute_rest(request=GET, endpoint='/shop.json') == {'shop': {'id': 1}}
+
+
+def test_runner_exceptions_and_timeout(runner):
+    async def fail():
+        raise ValueError('failed')
+
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(ValueError, match='failed'):
+        runner.run(fail())
+    with pytest.raises(TimeoutError):
+        runner.run(slow(), timeout=0.01)
+    runner.run(asyncio.sleep(0.01))
+    assert cancelled == [True]
+
+
+def test_runner_called_from_its_loop(runner):
+    async def nested():
+        return runner.run(asyncio.sleep(0))
+
+    with pytest.raises(RuntimeError, match='own event loop'):
+        runner.run(nested())
+
+
+def test_runner_restart(runner):
+    assert runner.run(asyncio.sleep(0, result=1)) == 1
+    runner.stop()
+    assert not runner.running
+    assert runner.run(asyncio.sleep(0, result=2)) == 2
+
+
+def test_runner_stop_cancels_pending_calls(runner):
+    finalized = []
+    started = Event()
+
+    async def stream():
+        try:
+            yield 1
+            started.set()
+            await asyncio.sleep(10)
+            yield 2
+        finally:
+            finalized.append('generator')
+
+    async def slow():
+        async for _ in stream():
+            pass
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(runner.run, slow())
+        assert started.wait(timeout=1)
+        runner.stop()
+
+        with pytest.raises(CancelledError):
+            pending.result(timeout=1)
+    assert finalized == ['generator']
+
+
+def test_shared_runner():
+    assert get_runner() is get_runner()
+    assert run(asyncio.sleep(0, result='done')) == 'done'
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='Requires fork')
+def test_runner_usable_in_forked_child(runner):
+    async def answer():
+        return 42
+
+    assert runner.run(answer()) == 42
+
+    pid = os.fork()
+    if pid == 0:
+        # The loop thread of the parent doesn't exist in the child
+        try:
+            os._exit(0 if runner.run(answer(), timeout=5) == 42 else 1)
+        except BaseException:
+            os._exit(1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert runner.run(answer()) == 42
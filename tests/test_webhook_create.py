@@ -111,3 +111,34 @@ async def test_store_http_webhook_create_invalidtopic(mocker):
         )
 
     assert shopify_request_mock.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_store_http_webhook_create_sends_only_its_operation(mocker):
+    token = await OfflineToken.load(store_name=test_information.store_name)
+
+    gql_response = {
+        'data': {
+            'webhookSubscriptionCreate': {
+                'webhookSubscription': {'id': 'gid://shopify/WebhookSubscription/1'},
+                'userErrors': [],
+            }
+        }
+    }
+    shopify_request_mock = mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        return_value=MockHTTPResponse(status_code=200, jsondata=gql_response),
+    )
+
+    await create_http(
+        offline_token=token,
+        topic=WebhookTopic.ORDERS_CREATE,
+        callback_url='https://example.org/endpoint',
+    )
+
+    query = shopify_request_mock.call_args.kwargs['json']['query']
+    assert 'mutation webhookSubscriptionCreate(' in query
+    assert 'fragment WebhookSubscription on WebhookSubscription' in query
+    assert 'pubSubWebhookSubscriptionCreate' not in query
+    assert 'eventBridgeWebhookSubscriptionCreate' not in query
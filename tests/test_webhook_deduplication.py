@@ -0,0 +1,57 @@
+import pytest
+
+from spylib.webhook import MemoryWebhookDeduplicator
+
+
+@pytest.mark.asyncio
+async def test_memory_deduplicator_detects_duplicates():
+    deduplicator = MemoryWebhookDeduplicator()
+
+    assert not await deduplicator.seen('webhook-1')
+    assert not await deduplicator.seen('webhook-2')
+    assert await deduplicator.seen('webhook-1')
+    assert len(deduplicator) == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_deduplicator_window(mocker):
+    monotonic = mocker.patch('spylib.webhook.deduplication.monotonic', return_value=100.0)
+    deduplicator = MemoryWebhookDeduplicator(window=60)
+
+    assert not await deduplicator.seen('webhook-1')
+    monotonic.return_value = 130.0
+    assert not await deduplicator.seen('webhook-2')
+
+    monotonic.return_value = 160.0
+    assert not await deduplicator.seen('webhook-1')
+    assert await deduplicator.seen('webhook-2')
+    assert len(deduplicator) == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_deduplicator_capacity():
+    deduplicator = MemoryWebhookDeduplicator(capacity=2)
+
+    for webhook_id in ('webhook-1', 'webhook-2', 'webhook-3'):
+        assert not await deduplicator.seen(webhook_id)
+
+    assert len(deduplicator) == 2
+    assert await deduplicator.seen('webhook-3')
+    # The oldest id was evicted to make room
+    assert not await deduplicator.seen('webhook-1')
+
+
+@pytest.mark.asyncio
+async def test_memory_deduplicator_forget(mocker):
+    monotonic = mocker.patch('spylib.webhook.deduplication.monotonic', return_value=100.0)
+    deduplicator = MemoryWebhookDeduplicator(window=60)
+
+    assert not await deduplicator.seen('webhook-1')
+    await deduplicator.forget('webhook-1')
+
+    monotonic.return_value = 130.0
+    assert not await deduplicator.seen('webhook-1')
+
+    # The first slot expiring doesn't drop the id seen again later
+    monotonic.return_value = 170.0
+    assert await deduplicator.seen('webhook-1')
@@ -0,0 +1,183 @@
+from json import dumps
+from unittest.mock import AsyncMock
+
+import pytest
+
+from spylib.webhook import (
+    WebhookSubscription,
+    list_subscriptions,
+    plan_reconciliation,
+    reconcile,
+    reconcile_many,
+)
+
+from .token_classes import MockHTTPResponse, OfflineToken, test_information
+
+CALLBACK_URL = 'https://example.org/webhooks'
+
+
+def node(id: str, topic: str, callback_url: str = CALLBACK_URL, include_fields=None) -> dict:
+    return {
+        'id': id,
+        'topic': topic,
+        'includeFields': include_fields or [],
+        'metafieldNamespaces': [],
+        'filter': '',
+        'endpoint': {'__typename': 'WebhookHttpEndpoint', 'callbackUrl': callback_url},
+    }
+
+
+def list_response(nodes, has_next_page=False, end_cursor=None) -> MockHTTPResponse:
+    return MockHTTPResponse(
+        status_code=200,
+        jsondata={
+            'data': {
+                'webhookSubscriptions': {
+                    'edges': [{'node': n} for n in nodes],
+                    'pageInfo': {'hasNextPage': has_next_page, 'endCursor': end_cursor},
+                }
+            }
+        },
+    )
+
+
+def test_webhook_subscription_requires_one_endpoint():
+    with pytest.raises(ValueError):
+        WebhookSubscription(topic='ORDERS_CREATE')
+    with pytest.raises(ValueError):
+        WebhookSubscription(topic='ORDERS_CREATE', callback_url=CALLBACK_URL, arn='arn')
+
+
+def test_plan_reconciliation():
+    desired = [
+        WebhookSubscription(topic='ORDERS_CREATE', callback_url=CALLBACK_URL),
+        WebhookSubscription(
+            topic='ORDERS_UPDATED', callback_url=CALLBACK_URL, include_fields=['id', 'note']
+        ),
+        WebhookSubscription(topic='APP_UNINSTALLED', callback_url=CALLBACK_URL),
+    ]
+    existing = [
+        WebhookSubscription.from_node(node('1', 'ORDERS_CREATE')),
+        WebhookSubscription.from_node(node('2', 'ORDERS_UPDATED', include_fields=['id'])),
+        WebhookSubscription.from_node(node('3', 'ORDERS_CREATE')),
+        WebhookSubscription.from_node(node('4', 'PRODUCTS_UPDATE')),
+    ]
+
+    plan = plan_reconciliation(desired, existing)
+
+    assert [s.topic for s in plan.create] == ['APP_UNINSTALLED']
+    assert [(s.id, s.include_fields) for s in plan.update] == [('2', ['id', 'note'])]
+    assert [s.id for s in plan.delete] == ['3', '4']
+    assert [s.id for s in plan.unchanged] == ['1']
+
+    plan = plan_reconciliation(desired, existing, delete_extraneous=False)
+    assert plan.delete == []
+
+
+def test_plan_reconciliation_rejects_duplicates():
+    desired = [
+        WebhookSubscription(topic='ORDERS_CREATE', callback_url=CALLBACK_URL),
+        WebhookSubscription(
+            topic='ORDERS_CREATE', callback_url=CALLBACK_URL, include_fields=['id']
+        ),
+    ]
+    existing = [WebhookSubscription.from_node(node('1', 'ORDERS_CREATE'))]
+
+    with pytest.raises(ValueError, match='ORDERS_CREATE'):
+        plan_reconciliation(desired, existing)
+
+
+@pytest.mark.asyncio
+async def test_list_subscriptions_paginates(mocker):
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    shopify_request_mock = mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        side_effect=[
+            list_response([node('1', 'ORDERS_CREATE')], has_next_page=True, end_cursor='c1'),
+            list_response([node('2', 'ORDERS_UPDATED')]),
+        ],
+    )
+
+    subscriptions = await list_subscriptions(token)
+
+    assert [s.id for s in subscriptions] == ['1', '2']
+    variables = [call.kwargs['json']['variables'] for call in shopify_request_mock.mock_calls]
+    assert [v['after'] for v in variables] == [None, 'c1']
+
+
+@pytest.mark.asyncio
+async def test_reconcile_batches_mutations(mocker):
+    token = await OfflineToken.load(store_name=test_information.store_name)
+    desired = [
+        WebhookSubscription(topic='ORDERS_CREATE', callback_url=CALLBACK_URL),
+        WebhookSubscription(topic='APP_UNINSTALLED', callback_url=CALLBACK_URL),
+    ]
+    mutation_response = MockHTTPResponse(
+        status_code=200,
+        jsondata={
+            'data': {
+                'op0': {'deletedWebhookSubscriptionId': '4', 'userErrors': []},
+                'op1': {'webhookSubscription': None, 'userErrors': [{'message': 'Invalid'}]},
+            }
+        },
+    )
+    shopify_request_mock = mocker.patch(
+        'httpx.AsyncClient.request',
+        new_callable=AsyncMock,
+        side_effect=[
+            list_response([node('1', 'ORDERS_CREATE'), node('4', 'PRODUCTS_UPDATE')]),
+            mutation_response,
+        ],
+    )
+
+    report = await reconcile(token, desired)
+
+    assert report.store_name == test_information.store_name
+    assert (report.created, report.updated, report.deleted, report.unchanged) == (0, 0, 1, 1)
+    assert report.errors == ['Failed to create APP_UNINSTALLED: Invalid']
+
+    body = shopify_request_mock.mock_calls[1].kwargs['json']
+    assert body['operationName'] == 'reconcileWebhookSubscriptions'
+    assert 'op0: webhookSubscriptionDelete(id: $id0)' in body['query']
+    assert 'op1: webhookSubscriptionCreate(topic: $topic1' in body['query']
+    assert body['variables']['id0'] == '4'
+    assert body['variables']['topic1'] == 'APP_UNINSTALLED'
+    assert body['variables']['input1']['callbackUrl'] == CALLBACK_URL
+
+
+@pytest.mark.asyncio
+async def test_reconcile_many_reports_failed_stores(mocker):
+    tokens = [
+        OfflineToken(store_name=f'store-{i}', access_token='TOKEN', scope=[]) for i in range(3)
+    ]
+    desired = [WebhookSubscription(topic='ORDERS_CREATE', callback_url=CALLBACK_URL)]
+
+    async def respond(method, url, **kwargs):
+        if 'store-1' in url:
+            return MockHTTPResponse(status_code=400, jsondata={'errors': 'Bad request'})
+        return list_response([node('1', 'ORDERS_CREATE')])
+
+    mocker.patch('httpx.AsyncClient.request', new_callable=AsyncMock, side_effect=respond)
+
+    summary = await reconcile_many(tokens, desired, max_concurrency=2)
+
+    assert [report.store_name for report in summary.reports] == ['store-0', 'store-1', 'store-2']
+    assert [report.store_name for report in summary.failed] == ['store-1']
+    assert sum(report.unchanged for report in summary.reports) == 2
+    assert dumps(summary.model_dump())
+
+
+@pytest.mark.asyncio
+async def test_reconcile_many_rejects_duplicates_before_listing(mocker):
+    tokens = [
+        OfflineToken(store_name=f'store-{i}', access_token='TOKEN', scope=[]) for i in range(3)
+    ]
+    desired = [WebhookSubscription(topic='ORDERS_CREATE', callback_url=CALLBACK_URL)] * 2
+    request = mocker.patch('httpx.AsyncClient.request', new_callable=AsyncMock)
+
+    with pytest.raises(ValueError, match='ORDERS_CREATE'):
+        await reconcile_many(tokens, desired)
+    with pytest.raises(ValueError, match='ORDERS_CREATE'):
+        await reconcile(tokens[0], desired)
+    request.assert_not_called()
@@ -26,3 +26,16 @@ params = [
 def test_is_webhook_valid(api_secret, data, hmac_header, expected_is_valid):
     is_valid = webhook.validate(data=data, hmac_header=hmac_header, api_secret_key=api_secret)
     assert is_valid is expected_is_valid
+
+
+@pytest.mark.parametrize('api_secret', [[API_SECRET, 'old'], ['new', API_SECRET]])
+def test_is_webhook_valid_rotating_secrets(api_secret):
+    assert webhook.validate(
+        data=MESSAGE, hmac_header=VALID_HMAC, api_secret_key=api_secret, shop='test.myshopify.com'
+    )
+    assert not webhook.validate(
+        data=MESSAGE,
+        hmac_header=INVALID_HMAC,
+        api_secret_key=api_secret,
+        shop='test.myshopify.com',
+    )
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from json import loads
+from json import dumps, loads
 from typing import ClassVar, Optional
 
 from pydantic import BaseModel
@@ -42,6 +42,12 @@ class MockHTTPResponse(BaseModel):
             loads('Not a JSON')
         return self.jsondata  # type: ignore[return-value]
 
+    @property
+    def content(self) -> bytes:
+        if self.jsondata is None:
+            return b'Not a JSON'
+        return dumps(self.jsondata).encode('utf-8')
+
 
 class TestInformation(BaseModel):
     """
@@ -0,0 +1,71 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from spylib.utils.cost_ledger import COST_BUCKETS, OTHER, CostLedger
+
+
+def test_cost_ledger_record():
+    ledger = CostLedger()
+    ledger.record('store-a', 'getProducts', requested_cost=102, actual_cost=12)
+    ledger.record('store-a', 'getProducts', requested_cost=102, actual_cost=1500)
+    ledger.record('store-a', None, requested_cost=1, actual_cost=1)
+    ledger.record_throttle('store-a', 'getProducts', wait_time=3)
+
+    snapshot = ledger.snapshot()
+
+    stats = snapshot[('store-a', 'getProducts')]
+    assert stats.calls == 2
+    assert stats.requested_cost == 204
+    assert stats.actual_cost == 1512
+    assert stats.throttled == 1
+    assert stats.throttle_time == 3
+    assert stats.histogram[COST_BUCKETS.index(20)] == 1
+    assert stats.histogram[-1] == 1
+    assert snapshot[('store-a', None)].histogram[0] == 1
+
+    # The snapshot is a copy
+    stats.calls = 0
+    assert ledger.snapshot()[('store-a', 'getProducts')].calls == 2
+
+
+def test_cost_ledger_fixed_entries():
+    ledger = CostLedger(max_entries=2)
+    for i in range(10):
+        ledger.record(f'store-{i}', None, requested_cost=10, actual_cost=5)
+
+    snapshot = ledger.snapshot()
+
+    assert set(snapshot) == {('store-0', None), ('store-1', None), (OTHER, None)}
+    assert snapshot[(OTHER, None)].calls == 8
+
+
+@pytest.mark.asyncio
+async def test_cost_ledger_flush():
+    on_flush = Mock()
+    ledger = CostLedger(on_flush=on_flush)
+    await ledger.flush()
+    on_flush.assert_not_called()
+
+    ledger.record('store', 'query', requested_cost=10, actual_cost=5)
+    stats = await ledger.flush()
+
+    on_flush.assert_called_once_with(stats)
+    assert stats[('store', 'query')].calls == 1
+    assert ledger.snapshot() == {}
+
+
+@pytest.mark.asyncio
+async def test_cost_ledger_periodic_flush():
+    on_flush = AsyncMock()
+    ledger = CostLedger(on_flush=on_flush, flush_interval=0.01)
+    await ledger.start()
+
+    ledger.record('store', 'query', requested_cost=10, actual_cost=5)
+    await asyncio.sleep(0.05)
+    on_flush.assert_awaited_once()
+
+    ledger.record('store', 'query', requested_cost=10, actual_cost=5)
+    await ledger.stop()
+    assert on_flush.await_count == 2
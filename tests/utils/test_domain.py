@@ -0,0 +1,31 @@
+import pytest
+
+from spylib.utils import Shop, store_domain
+
+
+def test_shop_equality():
+    shop = Shop('test')
+
+    assert shop == Shop.from_storename('test')
+    assert hash(shop) == hash(Shop.from_storename('test'))
+    assert shop != Shop('other')
+
+
+@pytest.mark.parametrize('shop', ['test.example.com', 'https://test.myshopify.com/admin', ''])
+def test_store_domain_invalid(shop):
+    with pytest.raises(ValueError, match='is not a shopify shop'):
+        store_domain(shop)
+
+
+def test_shop_urls():
+    shop = Shop.from_storename('test-2')
+
+    assert shop.admin_url == 'https://test-2.myshopify.com/admin'
+    assert shop.oauth_url == 'https://test-2.myshopify.com/admin/oauth/access_token'
+    assert shop.api_url() == 'https://test-2.myshopify.com/admin'
+    assert shop.api_url('2024-01') == 'https://test-2.myshopify.com/admin/api/2024-01'
+    assert shop.api_url('2024-01') is shop.api_url('2024-01')
+    assert shop.graphql_url('2024-01') == (
+        'https://test-2.myshopify.com/admin/api/2024-01/graphql.json'
+    )
+    assert shop.graphql_url('2024-01') is shop.graphql_url('2024-01')
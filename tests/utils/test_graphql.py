@@ -0,0 +1,142 @@
+import pytest
+
+from spylib.utils.graphql import (
+    elide_nulls,
+    minify_document,
+    parse_definitions,
+    prune_document,
+    tokenize,
+)
+from spylib.webhook.graphql_queries import WEBHOOK_CREATE_GQL
+
+DOCUMENT = '''
+# Shared by both queries
+query first($filter: Filter = {nested: {value: 1}}) @cached(options: {ttl: 10}) {
+  products { ...Product }
+}
+
+query second {
+  shop { name description(format: "{ not a brace }") }
+}
+
+fragment Product on Product {
+  id
+  variants { ...Variant }
+  ... on Product { title }
+}
+
+fragment Variant on ProductVariant {
+  sku
+}
+
+fragment Unused on Order {
+  id
+}
+'''
+
+
+def test_parse_definitions():
+    definitions = parse_definitions(DOCUMENT)
+    assert definitions is not None
+    assert [(d.kind, d.name, set(d.spreads)) for d in definitions] == [
+        ('query', 'first', {'Product'}),
+        ('query', 'second', set()),
+        ('fragment', 'Product', {'Variant'}),
+        ('fragment', 'Variant', set()),
+        ('fragment', 'Unused', set()),
+    ]
+
+
+def test_prune_document_keeps_used_fragments():
+    pruned = prune_document(DOCUMENT, 'first')
+    assert pruned.startswith('query first(')
+    assert 'query second' not in pruned
+    assert 'fragment Product on Product' in pruned
+    assert 'fragment Variant on ProductVariant' in pruned
+    assert 'Unused' not in pruned
+
+
+def test_prune_document_without_fragments():
+    pruned = prune_document(DOCUMENT, 'second')
+    assert pruned == 'query second {\n  shop { name description(format: "{ not a brace }") }\n}'
+
+
+@pytest.mark.parametrize(
+    'operation_name',
+    [
+        'webhookSubscriptionCreate',
+        'pubSubWebhookSubscriptionCreate',
+        'eventBridgeWebhookSubscriptionCreate',
+    ],
+)
+def test_prune_webhook_create_document(operation_name):
+    pruned = prune_document(WEBHOOK_CREATE_GQL, operation_name)
+    definitions = parse_definitions(pruned)
+    assert definitions is not None
+    assert [d.name for d in definitions] == [operation_name, 'WebhookSubscription']
+
+
+@pytest.mark.parametrize(
+    'document,operation_name',
+    [
+        (DOCUMENT, 'unknown'),
+        ('query first { shop { name } }', 'first'),
+        ('query first { shop { name } } query second { shop { ~ } }', 'first'),
+        ('query first { shop { name }', 'first'),
+    ],
+    ids=['Unknown operation', 'Single operation', 'Invalid character', 'Unbalanced braces'],
+)
+def test_prune_document_unchanged(document, operation_name):
+    assert prune_document(document, operation_name) == document
+
+
+def test_tokenize_strings_and_comments():
+    tokens = tokenize('{ a(b: """block "quoted" string""", c: "esc\\"aped") # comment\n }')
+    assert tokens is not None
+    assert [token.value for token in tokens] == [
+        '{',
+        'a',
+        '(',
+        'b',
+        ':',
+        '"""block "quoted" string"""',
+        'c',
+        ':',
+        '"esc\\"aped"',
+        ')',
+        '}',
+    ]
+
+
+def test_minify_document():
+    document = '''
+    # Get the products
+    query products($first: Int = 10, $query: String) {
+      products(first: $first, query: $query) {
+        edges { node { ...Product } }
+      }
+    }
+    fragment Product on Product { id title(format: "a  ,  b") }
+    '''
+    assert minify_document(document) == (
+        'query products($first:Int=10$query:String){products(first:$first query:$query)'
+        '{edges{node{...Product}}}}fragment Product on Product{id title(format:"a  ,  b")}'
+    )
+
+
+def test_minify_document_invalid():
+    assert minify_document('query { ~ }') == 'query { ~ }'
+
+
+def test_elide_nulls():
+    variables = {
+        'topic': 'ORDERS_CREATE',
+        'webhookSubscription': {'callbackUrl': 'https://example.org', 'includeFields': None},
+        'ids': [1, None],
+        'after': None,
+    }
+    assert elide_nulls(variables) == {
+        'topic': 'ORDERS_CREATE',
+        'webhookSubscription': {'callbackUrl': 'https://example.org'},
+        'ids': [1, None],
+    }
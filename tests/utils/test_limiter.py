@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from spylib.utils.limiter import ConcurrencyLimiter
+
+
+async def run(limiter, store_name, running, peak, started=None, release=None):
+    async with limiter.acquire(store_name):
+        running[store_name] = running.get(store_name, 0) + 1
+        peak[store_name] = max(peak.get(store_name, 0), running[store_name])
+        if started is not None:
+            started.append(store_name)
+        await (release.wait() if release is not None else asyncio.sleep(0.001))
+        running[store_name] -= 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_bounds_calls_per_store():
+    limiter = ConcurrencyLimiter(max_concurrency=3)
+    running: dict = {}
+    peak: dict = {}
+
+    await asyncio.gather(
+        *(run(limiter, 'store-a', running, peak) for _ in range(20)),
+        *(run(limiter, 'store-b', running, peak) for _ in range(5)),
+    )
+
+    assert peak == {'store-a': 3, 'store-b': 3}
+    metrics = limiter.metrics('store-a')
+    assert metrics.in_flight == 0
+    assert metrics.waiting == 0
+    assert metrics.acquired == 20
+    assert metrics.queued == 17
+    assert metrics.max_waiting == 17
+    assert metrics.total_wait_time > 0
+    assert set(limiter.snapshot()) == {'store-a', 'store-b'}
+
+
+@pytest.mark.asyncio
+async def test_limiter_first_in_first_out():
+    limiter = ConcurrencyLimiter(max_concurrency=1)
+    order = []
+
+    async def call(i):
+        async with limiter.acquire('store'):
+            order.append(i)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(call(i) for i in range(10)))
+
+    assert order == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_limiter_cancelled_waiter():
+    limiter = ConcurrencyLimiter(max_concurrency=1)
+    release = asyncio.Event()
+    running: dict = {}
+    peak: dict = {}
+    started: list = []
+
+    first = asyncio.create_task(run(limiter, 'store', running, peak, started, release))
+    waiting = asyncio.create_task(run(limiter, 'store', running, peak, started, release))
+    last = asyncio.create_task(run(limiter, 'store', running, peak, started, release))
+    await asyncio.sleep(0)
+    assert limiter.metrics('store').waiting == 2
+
+    waiting.cancel()
+    await asyncio.sleep(0)
+    assert limiter.metrics('store').waiting == 1
+
+    release.set()
+    await asyncio.gather(first, last)
+    assert started == ['store', 'store']
+    assert limiter.metrics('store').in_flight == 0
+    assert limiter.metrics('store').waiting == 0
+
+
+def test_limiter_metrics_unknown_store():
+    assert ConcurrencyLimiter().metrics('unknown').acquired == 0
+
+
+def test_limiter_invalid_max_concurrency():
+    with pytest.raises(ValueError):
+        ConcurrencyLimiter(max_concurrency=0)
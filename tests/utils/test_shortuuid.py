@@ -1,8 +1,64 @@
 import pytest
 
 from spylib.utils.misc import get_unique_id
+from spylib.utils.shortuuid import (
+    ALPHABET,
+    RandomStringGenerator,
+    _reset_generators,
+    generate_many,
+)
 
 
 @pytest.mark.asyncio
 async def test_calculate_from_message():
     assert len(get_unique_id()) == 10
+
+
+def test_generate_alphabet_and_length():
+    generator = RandomStringGenerator(chunk_size=16)
+
+    values = [generator.generate(10) for _ in range(100)]
+
+    assert all(len(value) == 10 for value in values)
+    assert set(''.join(values)) <= set(ALPHABET)
+    assert len(set(values)) == 100
+
+
+def test_generate_longer_than_chunk():
+    generator = RandomStringGenerator(chunk_size=16)
+
+    assert len(generator.generate(1000)) == 1000
+
+
+def test_generate_many():
+    values = generate_many(500, 12)
+
+    assert len(values) == 500
+    assert all(len(value) == 12 for value in values)
+    assert len(set(values)) == 500
+
+
+def test_generate_uniform(mocker):
+    # Every byte value once, the ones above 227 must be dropped rather than wrapped around
+    mocker.patch('spylib.utils.shortuuid.os.urandom', return_value=bytes(range(256)))
+    generator = RandomStringGenerator()
+
+    value = generator.generate(228)
+
+    assert all(value.count(char) == 4 for char in ALPHABET)
+
+
+def test_generator_reset_after_fork():
+    generator = RandomStringGenerator()
+    generator.generate(10)
+
+    _reset_generators()
+
+    assert generator._buffer == ''
+
+
+def test_generator_invalid_alphabet():
+    with pytest.raises(ValueError):
+        RandomStringGenerator(alphabet='a')
+    with pytest.raises(ValueError):
+        RandomStringGenerator(alphabet='aé')